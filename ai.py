@@ -0,0 +1,271 @@
+import random
+from collections import OrderedDict
+from functools import lru_cache
+
+from engine import (
+    TETROMINOS, PIECE_BOTTOMS, build_piece_masks,
+    ACTION_LEFT, ACTION_RIGHT, ACTION_ROTATE,
+)
+
+
+# 評価関数の重み（特徴量名 -> 重み）
+DEFAULT_WEIGHTS = {
+    "height": -0.51,     # 列の高さの合計
+    "lines": 0.76,       # 消去ライン数
+    "holes": -0.36,      # ブロックの下にある空きマス
+    "bumpiness": -0.18,  # 隣り合う列の高さの差の合計
+}
+
+
+@lru_cache(maxsize=None)
+def zobrist_tables(width, height):
+    # Zobrist ハッシュ用の乱数表
+    # マスごとの乱数を8列ずつまとめて「行 y・バイト位置・バイト値」の表にしておき、
+    # 1行を数回の表引きと XOR でハッシュできるようにする
+    rng = random.Random(0x7E7015)
+    cells = [[rng.getrandbits(64) for _ in range(width)] for _ in range(height)]
+    byte_count = (width + 7) // 8
+    tables = []
+    for y in range(height):
+        row_tables = []
+        for b in range(byte_count):
+            table = [0] * 256
+            for value in range(1, 256):
+                h = 0
+                for bit in range(8):
+                    x = b * 8 + bit
+                    if value >> bit & 1 and x < width:
+                        h ^= cells[y][x]
+                table[value] = h
+            row_tables.append(table)
+        tables.append(row_tables)
+    pieces = [rng.getrandbits(64) for _ in range(len(TETROMINOS))]
+    return tables, pieces
+
+
+def zobrist_hash(rows, tables):
+    h = 0
+    for y, row in enumerate(rows):
+        if row:
+            b = 0
+            while row:
+                h ^= tables[y][b][row & 0xFF]
+                row >>= 8
+                b += 1
+    return h
+
+
+def column_tops(rows, width):
+    # 各列で一番上のブロックの y（空の列は len(rows)）
+    tops = [len(rows)] * width
+    remaining = (1 << width) - 1
+    for y, row in enumerate(rows):
+        hit = row & remaining
+        if hit:
+            remaining &= ~hit
+            while hit:
+                low = hit & -hit
+                tops[low.bit_length() - 1] = y
+                hit ^= low
+            if not remaining:
+                break
+    return tops
+
+
+def evaluate(rows, width, weights):
+    # 盤面の特徴量を1回の走査で数えて重み付き和を返す
+    height = len(rows)
+    heights = [0] * width
+    covered = 0
+    holes = 0
+    for y, row in enumerate(rows):
+        if not covered and not row:
+            continue
+        holes += (covered & ~row).bit_count()
+        new = row & ~covered
+        while new:
+            low = new & -new
+            heights[low.bit_length() - 1] = height - y
+            new ^= low
+        covered |= row
+
+    bumpiness = 0
+    for x in range(width - 1):
+        bumpiness += abs(heights[x] - heights[x + 1])
+
+    return (weights["height"] * sum(heights)
+            + weights["holes"] * holes
+            + weights["bumpiness"] * bumpiness)
+
+
+# 置き場所の候補（回転数・列・着地 y と、その結果の盤面）
+class Placement:
+    __slots__ = ("rotations", "x", "y", "rows", "lines", "score")
+
+    def __init__(self, rotations, x, y, rows, lines):
+        self.rotations = rotations
+        self.x = x
+        self.y = y
+        self.rows = rows
+        self.lines = lines
+        self.score = 0.0
+
+
+def collides(rows, masks, y):
+    if masks is None:
+        return True
+    height = len(rows)
+    for dy, mask in masks:
+        field_y = y + dy
+        if field_y >= height or (field_y >= 0 and rows[field_y] & mask):
+            return True
+    return False
+
+
+def placements(rows, piece_masks, tetromino_type, rotation, x, y, full_row):
+    # 現在位置から「回転 → 左右移動 → ハードドロップ」で届く最終配置をすべて列挙する
+    # 同じ盤面になる配置はハッシュで後から重複を除くので、ここでは全部返す
+    width = full_row.bit_length()
+    tops = None
+    result = []
+    rotation_count = len(TETROMINOS[tetromino_type])
+
+    for turns in range(rotation_count):
+        r = (rotation + turns) % rotation_count
+        by_x = piece_masks[tetromino_type][r]
+        if collides(rows, by_x.get(x), y):
+            # これ以上回転できない
+            break
+
+        for direction in (0, -1, 1):
+            column = x if direction == 0 else x + direction
+            while True:
+                masks = by_x.get(column)
+                if collides(rows, masks, y):
+                    break
+
+                # 列の表面から着地位置を求める（張り出しの下は1段ずつ）
+                if tops is None:
+                    tops = column_tops(rows, width)
+                landing = min(tops[column + dx] - 1 - bottom for dx, bottom in PIECE_BOTTOMS[tetromino_type][r])
+                if landing < y:
+                    landing = y
+                    while not collides(rows, masks, landing + 1):
+                        landing += 1
+
+                new_rows = rows[:]
+                touched_full = False
+                for dy, mask in masks:
+                    new_rows[landing + dy] |= mask
+                    if new_rows[landing + dy] == full_row:
+                        touched_full = True
+
+                lines = 0
+                if touched_full:
+                    kept = [row for row in new_rows if row != full_row]
+                    lines = len(new_rows) - len(kept)
+                    new_rows = [0] * lines + kept
+
+                result.append(Placement(turns, column, landing, new_rows, lines))
+
+                if direction == 0:
+                    break
+                column += direction
+
+    return result
+
+
+# 現在のテトリミノと次のテトリミノの2手先まで読んで置き場所を決める
+# 評価済みの盤面は Zobrist ハッシュをキーにした LRU 表に保存し、
+# 別の手順で同じ盤面になったときは再評価しない
+class PlacementSearch:
+    def __init__(self, weights=None, cache_size=200000, beam=8):
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self.cache_size = cache_size
+        self.beam = beam  # 2手目まで読む1手目の候補数（0 なら全部）
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def cached(self, key):
+        value = self.cache.get(key)
+        if value is not None:
+            self.cache.move_to_end(key)
+            self.hits += 1
+        else:
+            self.misses += 1
+        return value
+
+    def store(self, key, value):
+        self.cache[key] = value
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def expand(self, rows, piece_masks, tetromino_type, rotation, x, y, full_row, tables):
+        # 配置を列挙し、同じ盤面になるものを除いて評価値を付ける
+        width = full_row.bit_length()
+        unique = {}
+        for placement in placements(rows, piece_masks, tetromino_type, rotation, x, y, full_row):
+            key = zobrist_hash(placement.rows, tables)
+            if key in unique:
+                continue
+            value = self.cached(key)
+            if value is None:
+                value = evaluate(placement.rows, width, self.weights)
+                self.store(key, value)
+            placement.score = value + self.weights["lines"] * placement.lines
+            unique[key] = placement
+        return unique
+
+    def search(self, engine):
+        # 最善の Placement を返す（置ける場所がなければ None）
+        if engine.game_over:
+            return None
+
+        width = engine.width
+        full_row = engine.full_row
+        piece_masks = build_piece_masks(width)
+        tables, piece_keys = zobrist_tables(width, engine.height)
+
+        first = self.expand(
+            engine.rows, piece_masks, engine.tetromino_type, engine.tetromino_rotation,
+            engine.tetromino_x, engine.tetromino_y, full_row, tables,
+        )
+        if not first:
+            return None
+
+        candidates = sorted(first.items(), key=lambda item: item[1].score, reverse=True)
+        if self.beam:
+            candidates = candidates[:self.beam]
+
+        # 次のテトリミノの出現位置
+        next_type = engine.next_tetromino_type
+        spawn_x = width // 2 - len(TETROMINOS[next_type][0][0]) // 2
+
+        best = None
+        for key, placement in candidates:
+            lookahead_key = key ^ piece_keys[next_type]
+            value = self.cached(lookahead_key)
+            if value is None:
+                second = self.expand(placement.rows, piece_masks, next_type, 0, spawn_x, 0, full_row, tables)
+                value = max((p.score for p in second.values()), default=float("-inf"))
+                self.store(lookahead_key, value)
+
+            total = self.weights["lines"] * placement.lines + value
+            if best is None or total > best_total:
+                best = placement
+                best_total = total
+
+        return best
+
+    def actions(self, engine, placement):
+        # 配置に移動するためのアクション列（最後のハードドロップは含まない）
+        shift = placement.x - engine.tetromino_x
+        return [ACTION_ROTATE] * placement.rotations + [ACTION_LEFT if shift < 0 else ACTION_RIGHT] * abs(shift)
+
+    def __call__(self, engine, rng=None):
+        # selfplay のポリシーとしても使える
+        placement = self.search(engine)
+        if placement is None:
+            return []
+        return self.actions(engine, placement)
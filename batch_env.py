@@ -0,0 +1,184 @@
+import numpy as np
+
+from engine import (
+    TETROMINOS, PIECE_CELLS, FIELD_WIDTH, FIELD_HEIGHT, LINE_SCORES, MAX_LEVEL,
+    ACTION_LEFT, ACTION_RIGHT, ACTION_DOWN, ACTION_ROTATE, ACTION_HARD_DROP,
+)
+
+
+# 盤面の行は uint32 のビット列。左右に WALL ビットずつ壁（常に1）を置き、
+# フィールドの列 x はビット WALL + x に対応する。下には床として全ビット1の行を4行置く
+WALL = 4
+FLOOR_ROWS = 4
+
+# (種類, 回転, dy) ごとの行マスク（x=0 基準）。回転数が4未満のものは0で埋める
+PIECE_ROW_MASKS = np.zeros((7, 4, 4), dtype=np.uint32)
+for _t, _shapes in enumerate(PIECE_CELLS):
+    for _r, _cells in enumerate(_shapes):
+        for _dx, _dy in _cells:
+            PIECE_ROW_MASKS[_t, _r, _dy] |= 1 << _dx
+
+ROTATION_COUNTS = np.array([len(shapes) for shapes in TETROMINOS])
+SPAWN_WIDTHS = np.array([len(shapes[0][0]) for shapes in TETROMINOS])
+SCORE_TABLE = np.array(LINE_SCORES)
+PIECE_ROWS = np.arange(4)
+
+
+# N 個の盤面をまとめて1回の呼び出しで進めるバッチ環境
+# ルールは TetrisEngine の move / rotate_tetromino / hard_drop / clear_lines と同じ
+class BatchTetris:
+    def __init__(self, n, width=FIELD_WIDTH, height=FIELD_HEIGHT, seed=None, gravity=0):
+        if width + 2 * WALL > 32:
+            raise ValueError(f"width {width} does not fit in a uint32 row")
+
+        self.n = n
+        self.width = width
+        self.height = height
+        # gravity ステップごとに1段自然落下させる（0 なら自然落下なし）
+        self.gravity = gravity
+        self.rng = np.random.default_rng(seed)
+
+        wall_bits = (1 << WALL) - 1
+        self.empty_row = np.uint32(wall_bits | (wall_bits << (WALL + width)))
+        self.full_row = np.uint32((1 << (width + 2 * WALL)) - 1)
+
+        self.boards = np.empty((n, height + FLOOR_ROWS), dtype=np.uint32)
+        self.tetromino_type = np.zeros(n, dtype=np.int64)
+        self.tetromino_rotation = np.zeros(n, dtype=np.int64)
+        self.tetromino_x = np.zeros(n, dtype=np.int64)
+        self.tetromino_y = np.zeros(n, dtype=np.int64)
+        self.next_tetromino_type = np.zeros(n, dtype=np.int64)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.level = np.ones(n, dtype=np.int64)
+        self.lines_cleared = np.zeros(n, dtype=np.int64)
+        self.pieces_placed = np.zeros(n, dtype=np.int64)
+        self.game_over = np.zeros(n, dtype=bool)
+        self.steps_since_fall = np.zeros(n, dtype=np.int64)
+
+        self.reset()
+
+    def reset(self, mask=None):
+        # mask が True の盤面（省略時は全部）を新しいゲームにする
+        idx = np.arange(self.n) if mask is None else np.flatnonzero(mask)
+        if idx.size == 0:
+            return
+
+        self.boards[idx, :self.height] = self.empty_row
+        self.boards[idx, self.height:] = self.full_row
+        self.score[idx] = 0
+        self.level[idx] = 1
+        self.lines_cleared[idx] = 0
+        self.pieces_placed[idx] = 0
+        self.game_over[idx] = False
+        self.steps_since_fall[idx] = 0
+        self.next_tetromino_type[idx] = self.random_pieces(idx)
+        self.new_tetromino(idx)
+
+    def random_pieces(self, idx):
+        return self.rng.integers(0, 7, idx.size)
+
+    def new_tetromino(self, idx):
+        t = self.next_tetromino_type[idx]
+        self.tetromino_type[idx] = t
+        self.tetromino_rotation[idx] = 0
+        self.next_tetromino_type[idx] = self.random_pieces(idx)
+        self.tetromino_x[idx] = self.width // 2 - SPAWN_WIDTHS[t] // 2
+        self.tetromino_y[idx] = 0
+
+        # 生成時に衝突する場合はゲームオーバー
+        self.game_over[idx] |= self.collides(idx, t, 0, self.tetromino_x[idx], 0)
+
+    def collides(self, idx, t, r, x, y):
+        # idx の各盤面について、(t, r, x, y) に置いたテトリミノが衝突するか
+        masks = PIECE_ROW_MASKS[t, r] << (x + WALL).astype(np.uint32)[:, None]
+        rows = self.boards[idx[:, None], np.asarray(y)[..., None] + PIECE_ROWS]
+        return (rows & masks).any(axis=1)
+
+    def shift(self, idx, dx):
+        x = self.tetromino_x[idx] + dx
+        ok = ~self.collides(idx, self.tetromino_type[idx], self.tetromino_rotation[idx], x, self.tetromino_y[idx])
+        self.tetromino_x[idx[ok]] = x[ok]
+
+    def rotate(self, idx):
+        t = self.tetromino_type[idx]
+        r = (self.tetromino_rotation[idx] + 1) % ROTATION_COUNTS[t]
+        ok = ~self.collides(idx, t, r, self.tetromino_x[idx], self.tetromino_y[idx])
+        self.tetromino_rotation[idx[ok]] = r[ok]
+
+    def soft_drop(self, idx, cleared):
+        y = self.tetromino_y[idx] + 1
+        blocked = self.collides(idx, self.tetromino_type[idx], self.tetromino_rotation[idx], self.tetromino_x[idx], y)
+        self.tetromino_y[idx[~blocked]] = y[~blocked]
+        self.lock(idx[blocked], cleared)
+
+    def hard_drop(self, idx, cleared):
+        # 落下できる盤面だけを残しながら1段ずつまとめて落とす
+        active = idx
+        while active.size:
+            y = self.tetromino_y[active] + 1
+            blocked = self.collides(
+                active, self.tetromino_type[active], self.tetromino_rotation[active], self.tetromino_x[active], y
+            )
+            active = active[~blocked]
+            self.tetromino_y[active] += 1
+        self.lock(idx, cleared)
+
+    def lock(self, idx, cleared):
+        if idx.size == 0:
+            return
+
+        # テトリミノを盤面に固定
+        masks = PIECE_ROW_MASKS[self.tetromino_type[idx], self.tetromino_rotation[idx]]
+        masks = masks << (self.tetromino_x[idx] + WALL).astype(np.uint32)[:, None]
+        self.boards[idx[:, None], self.tetromino_y[idx][:, None] + PIECE_ROWS] |= masks
+        self.pieces_placed[idx] += 1
+
+        # 揃った行を上へ寄せ（安定ソート）、空行で置き換える
+        field = self.boards[idx, :self.height]
+        full = field == self.full_row
+        lines = full.sum(axis=1)
+        has_lines = lines > 0
+        if has_lines.any():
+            sub = idx[has_lines]
+            order = np.argsort(~full[has_lines], axis=1, kind="stable")
+            compacted = np.take_along_axis(field[has_lines], order, axis=1)
+            compacted[np.arange(self.height)[None, :] < lines[has_lines][:, None]] = self.empty_row
+            self.boards[sub, :self.height] = compacted
+
+            # スコア計算（レベル倍率は消去前のレベル）
+            self.score[idx] += SCORE_TABLE[lines] * self.level[idx]
+            self.lines_cleared[idx] += lines
+            self.level[idx] = np.minimum(MAX_LEVEL, 1 + self.lines_cleared[idx] // 10)
+            cleared[idx] += lines
+
+        self.new_tetromino(idx)
+
+    def step(self, actions):
+        # 盤面ごとに1アクションを適用する
+        # 戻り値は (このステップの消去ライン数, スコア, レベル, ゲームオーバー) の配列
+        # ゲームオーバーになった盤面は最終値を返したあと自動でリセットされる
+        actions = np.asarray(actions)
+        cleared = np.zeros(self.n, dtype=np.int64)
+
+        self.shift(np.flatnonzero(actions == ACTION_LEFT), -1)
+        self.shift(np.flatnonzero(actions == ACTION_RIGHT), 1)
+        self.rotate(np.flatnonzero(actions == ACTION_ROTATE))
+        self.soft_drop(np.flatnonzero(actions == ACTION_DOWN), cleared)
+        self.hard_drop(np.flatnonzero(actions == ACTION_HARD_DROP), cleared)
+
+        # 自然落下
+        if self.gravity:
+            self.steps_since_fall += 1
+            due = np.flatnonzero((self.steps_since_fall >= self.gravity) & ~self.game_over)
+            self.steps_since_fall[due] = 0
+            self.soft_drop(due, cleared)
+
+        done = self.game_over.copy()
+        result = (cleared, self.score.copy(), self.level.copy(), done)
+        self.reset(done)
+        return result
+
+    def fields(self):
+        # (N, height, width) の 0/1 配列として盤面を返す
+        columns = np.arange(self.width, dtype=np.uint32) + WALL
+        return ((self.boards[:, :self.height, None] >> columns) & 1).astype(np.uint8)
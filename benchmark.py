@@ -0,0 +1,437 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from engine import TetrisEngine, TETROMINOS, FIELD_WIDTH, FIELD_HEIGHT
+from state import GameState
+from selfplay import play_game, random_policy
+
+
+SEED = 12345
+LARGE_WIDTH = 100  # 大きな盤面のベンチマークの盤面の大きさ
+LARGE_HEIGHT = 2000
+DEFAULT_THRESHOLD = 0.15  # 基準より 15% 以上遅くなったら劣化とみなす
+
+
+# --- 盤面フィクスチャ ---
+
+def make_board(rng, width=FIELD_WIDTH, height=FIELD_HEIGHT, stack=0, full=0):
+    # 下から stack 行を積んだ盤面の行ビットマスク
+    # 一番下の full 行は揃った行、それより上は各行に1つずつ穴を空ける
+    rows = [0] * height
+    full_row = (1 << width) - 1
+    for i in range(stack):
+        y = height - 1 - i
+        rows[y] = full_row if i < full else full_row & ~(1 << rng.randrange(width))
+    return rows
+
+
+def load_board(engine, rows):
+    # 行ビットマスクから field・列の高さ・スタック上端をそろえてエンジンに読み込む
+    engine.rows = rows[:]
+    engine.field = [[1 if row >> x & 1 else 0 for x in range(engine.width)] for row in rows]
+    engine.heights = [0] * engine.width
+    engine.stack_top = engine.height
+    for y in range(engine.height - 1, -1, -1):
+        if rows[y]:
+            engine.stack_top = y
+            for x in range(engine.width):
+                if rows[y] >> x & 1:
+                    engine.heights[x] = engine.height - y
+    engine.touched_rows = []
+    engine.ghost_y = None
+
+
+def spawn(engine, rng):
+    # ランダムなテトリミノを盤面上の置ける位置に出す
+    engine.tetromino_type = rng.randrange(len(TETROMINOS))
+    engine.tetromino_rotation = rng.randrange(len(TETROMINOS[engine.tetromino_type]))
+    by_x = engine.piece_masks[engine.tetromino_type][engine.tetromino_rotation]
+    engine.tetromino_x = rng.choice(list(by_x))
+    engine.tetromino_y = 0
+    engine.ghost_y = None
+
+
+def new_engine(width=FIELD_WIDTH, height=FIELD_HEIGHT):
+    return TetrisEngine(clock=lambda: 0, width=width, height=height, seed=SEED)
+
+
+def board_reloader(engine, rows):
+    # load_board() は盤面の面積に比例して遅いので、大きな盤面では1回だけ読み込み、
+    # 計測の前ごとに行ビットマスク・列の高さ・スタック上端だけをスライスで書き戻す
+    # （field の色は計測する処理の結果に影響しないので戻さない）
+    load_board(engine, rows)
+    field = engine.field[:]
+    heights = engine.heights[:]
+    stack_top = engine.stack_top
+
+    def reload():
+        engine.rows[:] = rows
+        engine.field[:] = field
+        engine.heights[:] = heights
+        engine.stack_top = stack_top
+        engine.touched_rows = []
+        engine.ghost_y = None
+
+    return reload
+
+
+# --- 計測 ---
+
+def measure(op, setup=None, number=20000, repeat=5):
+    # setup()（計測しない）のあとに op() を1回ずつ計測し、1回あたりのナノ秒を返す
+    # 他のプロセスの影響を減らすため repeat 回に分けて計り、中央値が一番小さい回を採る
+    # （timeit と同じく計測中は GC を止める）
+    clock = time.perf_counter_ns
+    empty = []
+    for _ in range(1000):
+        start = clock()
+        empty.append(clock() - start)
+    overhead = statistics.median(empty)
+
+    rounds = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            samples = []
+            for _ in range(max(1, number // repeat)):
+                if setup is not None:
+                    setup()
+                start = clock()
+                op()
+                samples.append(clock() - start)
+            samples.sort()
+            rounds.append(samples)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    samples = min(rounds, key=statistics.median)
+    median = max(0.0, statistics.median(samples) - overhead)
+    return {
+        "ns": median,
+        "mean_ns": max(0.0, statistics.fmean(samples) - overhead),
+        "p95_ns": max(0.0, samples[int(len(samples) * 0.95)] - overhead),
+        "ops_per_s": 1e9 / median if median else None,
+    }
+
+
+def bench_check_collision(number):
+    # 途中まで積んだ盤面で、ランダムな位置・回転の衝突判定
+    rng = random.Random(SEED)
+    engine = new_engine()
+    load_board(engine, make_board(rng, stack=10))
+    positions = []
+    for _ in range(1024):
+        spawn(engine, rng)
+        positions.append((engine.tetromino_type, engine.tetromino_rotation,
+                          engine.tetromino_x, rng.randrange(engine.height)))
+    state = iter(positions * (number // len(positions) + 1))
+
+    def setup():
+        engine.tetromino_type, engine.tetromino_rotation, engine.tetromino_x, engine.tetromino_y = next(state)
+
+    return measure(engine.check_collision, setup, number)
+
+
+def bench_lock_tetromino(number):
+    rng = random.Random(SEED)
+    engine = new_engine()
+    board = make_board(rng, stack=8)
+
+    def setup():
+        load_board(engine, board)
+        spawn(engine, rng)
+        engine.tetromino_y = engine.get_ghost_y()
+
+    return measure(engine.lock_tetromino, setup, number)
+
+
+def bench_clear_lines(number, lines, stack):
+    # 下から lines 行が揃った状態で、直前のテトリミノが下4行に触れたとして消去する
+    rng = random.Random(SEED)
+    engine = new_engine()
+    board = make_board(rng, stack=stack, full=lines)
+    touched = list(range(engine.height - 4, engine.height))
+
+    def setup():
+        load_board(engine, board)
+        engine.touched_rows = touched
+
+    return measure(engine.clear_lines, setup, number)
+
+
+def bench_hard_drop(number):
+    # 落下・固定・ライン消去・次のテトリミノの生成まで
+    rng = random.Random(SEED)
+    engine = new_engine()
+    board = make_board(rng, stack=8)
+
+    def setup():
+        load_board(engine, board)
+        spawn(engine, rng)
+
+    return measure(engine.hard_drop, setup, number)
+
+
+def bench_large_hard_drop(number):
+    # 100×2000 の盤面に 1000 行積んだ状態でのハードドロップ（盤面の大きさに比例しないこと）
+    rng = random.Random(SEED)
+    engine = new_engine(LARGE_WIDTH, LARGE_HEIGHT)
+    reload = board_reloader(engine, make_board(rng, LARGE_WIDTH, LARGE_HEIGHT, stack=1000))
+
+    def setup():
+        reload()
+        spawn(engine, rng)
+
+    return measure(engine.hard_drop, setup, number)
+
+
+def bench_large_clear_lines(number):
+    # 100×2000 の盤面に 1000 行積み、下の4行が揃った状態でのライン消去
+    rng = random.Random(SEED)
+    engine = new_engine(LARGE_WIDTH, LARGE_HEIGHT)
+    reload = board_reloader(engine, make_board(rng, LARGE_WIDTH, LARGE_HEIGHT, stack=1000, full=4))
+    touched = list(range(engine.height - 4, engine.height))
+
+    def setup():
+        reload()
+        engine.touched_rows = touched
+
+    return measure(engine.clear_lines, setup, number)
+
+
+def bench_rotate_tetromino(number):
+    rng = random.Random(SEED)
+    engine = new_engine()
+    load_board(engine, make_board(rng, stack=8))
+    positions = []
+    for _ in range(1024):
+        spawn(engine, rng)
+        positions.append((engine.tetromino_type, engine.tetromino_rotation, engine.tetromino_x))
+    state = iter(positions * (number // len(positions) + 1))
+
+    def setup():
+        engine.tetromino_type, engine.tetromino_rotation, engine.tetromino_x = next(state)
+        engine.tetromino_y = 0
+
+    return measure(engine.rotate_tetromino, setup, number)
+
+
+def bench_slide(number):
+    # ARR 0 の壁までの移動（行マスクから距離を求める）
+    rng = random.Random(SEED)
+    engine = new_engine()
+    load_board(engine, make_board(rng, stack=8))
+    positions = []
+    for _ in range(1024):
+        spawn(engine, rng)
+        positions.append((engine.tetromino_type, engine.tetromino_rotation, engine.tetromino_x, rng.choice((-1, 1))))
+    state = iter(positions * (number // len(positions) + 1))
+    direction = [1]
+
+    def setup():
+        engine.tetromino_type, engine.tetromino_rotation, engine.tetromino_x, direction[0] = next(state)
+        engine.tetromino_y = 0
+
+    return measure(lambda: engine.slide(direction[0]), setup, number)
+
+
+def stacked_engine():
+    # 途中まで積んだ盤面のエンジン（状態の保存・復元の計測用）
+    engine = new_engine()
+    load_board(engine, make_board(random.Random(SEED), stack=8))
+    return engine
+
+
+def bench_state(number, op):
+    # snapshot: 状態の取り出し, restore: 状態への復元, pack/unpack: 固定長バイト列との変換, clone: 分岐用のコピー
+    engine = stacked_engine()
+    state = engine.snapshot()
+    data = state.pack()
+    ops = {
+        "snapshot": engine.snapshot,
+        "restore": lambda: engine.restore(state),
+        "pack": state.pack,
+        "unpack": lambda: GameState.unpack(data),
+        "clone": engine.clone,
+    }
+    return measure(ops[op], None, number)
+
+
+def bench_games(number):
+    # ランダムポリシーでゲームを最後まで遊ぶ（シードは 0 から連番）
+    engine = new_engine()
+    games = max(1, number // 1000)
+    pieces = 0
+    start = time.perf_counter_ns()
+    for seed in range(games):
+        pieces += play_game(engine, random_policy, seed)["pieces"]
+    elapsed = time.perf_counter_ns() - start
+    return {
+        "ns": elapsed / games,
+        "games_per_s": games * 1e9 / elapsed,
+        "pieces_per_s": pieces * 1e9 / elapsed,
+    }
+
+
+def bench_draw(number, full):
+    # オフスクリーンのサーフェスに Tetris.draw で描く
+    # full なら毎フレーム全体を描き直し、そうでなければオートプレイ中の差分描画
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    from main import Tetris
+    from rankings import RankingStore
+    from renderer import SCREEN_WIDTH, SCREEN_HEIGHT
+
+    pygame.init()
+    surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+    game = Tetris(surface, seed=SEED, record_dir=None,
+                  rankings_store=RankingStore(log_path=None, index_path=None))
+    game.autoplay = True
+    game.draw()
+
+    def setup():
+        if game.game_over:
+            game.reset(SEED)
+        if full:
+            game.renderer.invalidate()
+        else:
+            game.tick()
+
+    try:
+        return measure(game.draw, setup, max(1, number // 10))
+    finally:
+        game.close()
+
+
+def bench_startup(number):
+    # main.py を別プロセスで起動し、最初のフレームを表示するまでの時間（import を含む）を計る
+    env = dict(os.environ, SDL_VIDEODRIVER=os.environ.get("SDL_VIDEODRIVER", "dummy"))
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    times = []
+    for _ in range(max(3, number // 4000)):
+        output = subprocess.run(
+            [sys.executable, script, "--measure-startup", "--no-record"],
+            env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        line = next(line for line in output.splitlines() if line.startswith("startup:"))
+        times.append(float(line.split()[1]) * 1e6)
+    return {"ns": statistics.median(times), "min_ns": min(times)}
+
+
+BENCHMARKS = {
+    "check_collision": bench_check_collision,
+    "lock_tetromino": bench_lock_tetromino,
+    "hard_drop": bench_hard_drop,
+    "rotate_tetromino": bench_rotate_tetromino,
+    "slide": bench_slide,
+}
+for _op in ("snapshot", "restore", "pack", "unpack", "clone"):
+    BENCHMARKS[f"state_{_op}"] = lambda number, op=_op: bench_state(number, op)
+for _stack in (4, 10, 16):
+    for _lines in range(5):
+        BENCHMARKS[f"clear_lines_{_lines}_stack{_stack}"] = (
+            lambda number, lines=_lines, stack=_stack: bench_clear_lines(number, lines, stack)
+        )
+BENCHMARKS["large_hard_drop"] = bench_large_hard_drop
+BENCHMARKS["large_clear_lines_4"] = bench_large_clear_lines
+BENCHMARKS["games"] = bench_games
+BENCHMARKS["draw_frame"] = lambda number: bench_draw(number, full=False)
+BENCHMARKS["draw_full"] = lambda number: bench_draw(number, full=True)
+BENCHMARKS["startup"] = bench_startup
+
+
+def run(names, number):
+    results = {}
+    for name in names:
+        results[name] = BENCHMARKS[name](number)
+        print(f"{name:<28} {format_ns(results[name]['ns']):>12}", file=sys.stderr)
+    return results
+
+
+def format_ns(ns):
+    if ns >= 1e6:
+        return f"{ns / 1e6:.2f} ms"
+    if ns >= 1e3:
+        return f"{ns / 1e3:.2f} us"
+    return f"{ns:.0f} ns"
+
+
+def compare(results, baseline, threshold):
+    # 基準と比べて threshold を超えて遅くなったベンチマークを返す
+    regressions = []
+    print(f"\n{'benchmark':<28} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, result in results.items():
+        base = baseline["results"].get(name)
+        if base is None or not base["ns"]:
+            print(f"{name:<28} {'-':>12} {format_ns(result['ns']):>12}")
+            continue
+        change = result["ns"] / base["ns"] - 1
+        mark = ""
+        if change > threshold:
+            regressions.append(name)
+            mark = "  REGRESSION"
+        print(f"{name:<28} {format_ns(base['ns']):>12} {format_ns(result['ns']):>12} {change:>+8.1%}{mark}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="エンジンと描画のベンチマーク")
+    parser.add_argument("names", nargs="*", help="実行するベンチマーク（省略時はすべて。前方一致）")
+    parser.add_argument("--number", type=int, default=20000, help="1つのベンチマークで計測する回数")
+    parser.add_argument("--quick", action="store_true", help="回数を減らして素早く回す（--number 2000 相当）")
+    parser.add_argument("--output", help="結果を書き出す JSON ファイル")
+    parser.add_argument("--baseline", help="比較する基準の JSON ファイル（劣化があれば終了コード 1）")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="劣化とみなす遅くなり方の割合（既定 0.15 = 15%%）")
+    parser.add_argument("--list", action="store_true", help="ベンチマーク名の一覧を表示する")
+    args = parser.parse_args()
+
+    if args.list:
+        print("\n".join(BENCHMARKS))
+        return
+
+    names = [name for name in BENCHMARKS if not args.names or any(name.startswith(p) for p in args.names)]
+    if not names:
+        parser.error("no benchmark matches")
+    number = 2000 if args.quick else args.number
+
+    results = run(names, number)
+    report = {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "seed": SEED,
+            "number": number,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
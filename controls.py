@@ -0,0 +1,118 @@
+from collections import deque
+
+from engine import (TICK_MS, ACTION_LEFT, ACTION_RIGHT, ACTION_DOWN, ACTION_ROTATE, ACTION_HARD_DROP,
+                    ACTION_SLIDE_LEFT, ACTION_SLIDE_RIGHT)
+
+
+# 操作キー（pygame のキーコードとは別。対応付けは main.py で行う）
+KEY_LEFT = 0
+KEY_RIGHT = 1
+KEY_DOWN = 2
+KEY_ROTATE = 3
+KEY_HARD_DROP = 4
+
+DEFAULT_DAS = 70  # 押してからキーリピートが始まるまで（ミリ秒）
+DEFAULT_ARR = 70  # キーリピートの間隔（ミリ秒。0 なら壁まで一気に移動）
+DEFAULT_SOFT_DROP = 50  # 下キーのリピート間隔（ミリ秒）
+
+
+# キー入力を受け取った時刻つきでためておき、その時刻が属するティックで順番に適用する
+# DAS/ARR の判定もフレームではなくティックの論理時刻（ミリ秒）で行うので、
+# フレームレートや処理落ちに左右されず、リプレイでも同じ結果になる
+class Controls:
+    def __init__(self, das=DEFAULT_DAS, arr=DEFAULT_ARR, soft_drop=DEFAULT_SOFT_DROP):
+        self.das = das
+        self.arr = arr
+        self.soft_drop = soft_drop
+        self.queue = deque()  # (時刻, キー, 押したか)
+        self.clear()
+
+    def clear(self):
+        # ゲームのリセット時に呼ぶ（押しっぱなしのキーも忘れる）
+        self.queue.clear()
+        self.held = []  # 押している左右キー（最後に押したものが有効）
+        self.shift_time = 0  # 有効な左右キーを押した論理時刻
+        self.shift_repeats = 0  # そのキーでリピートした回数
+        self.down_time = None  # 下キーを押した論理時刻（押していなければ None）
+        self.down_repeats = 0
+
+    def push(self, time, key, pressed):
+        # time は入力を受け取った時計の時刻（ゲームの時計と同じミリ秒）
+        self.queue.append((time, key, pressed))
+
+    def apply(self, game, tick_time, until=None):
+        # until より前に受け取った入力を、今のティック（tick_time に始まる）の中の時刻として適用する
+        queue = self.queue
+        if game.game_over:
+            # ゲームオーバーのあとの入力は捨てる（終わった盤面に置いたり記録したりしない）
+            queue.clear()
+            return
+        base = game.ticks * TICK_MS
+        while queue and (until is None or queue[0][0] < until):
+            time, key, pressed = queue.popleft()
+            self.handle(game, key, pressed, base + max(0, time - tick_time))
+            if game.game_over:
+                # この入力でゲームが終わったら、残りの入力も捨てる
+                queue.clear()
+                break
+
+    def handle(self, game, key, pressed, now):
+        if key == KEY_LEFT or key == KEY_RIGHT:
+            if pressed:
+                if key in self.held:
+                    return
+                # 後から押した方向を優先し、押した瞬間に1マス動かす
+                self.held.append(key)
+                self.shift_time = now
+                self.shift_repeats = 0
+                game.input_action(ACTION_LEFT if key == KEY_LEFT else ACTION_RIGHT)
+            elif key in self.held:
+                active = self.held[-1] == key
+                self.held.remove(key)
+                if active and self.held:
+                    # まだ押している逆方向のキーに戻る（DAS は数え直す）
+                    self.shift_time = now
+                    self.shift_repeats = 0
+
+        elif key == KEY_DOWN:
+            if pressed:
+                self.down_time = now
+                self.down_repeats = 0
+                game.input_action(ACTION_DOWN)
+            else:
+                self.down_time = None
+
+        elif pressed and key == KEY_ROTATE:
+            game.input_action(ACTION_ROTATE)
+
+        elif pressed and key == KEY_HARD_DROP:
+            game.input_action(ACTION_HARD_DROP)
+
+    def repeat(self, game, now):
+        # 押し続けているキーのリピート。now はこれから処理するティックの論理時刻
+        if game.game_over:
+            return
+
+        if self.held:
+            elapsed = now - self.shift_time - self.das
+            if elapsed >= 0:
+                direction = -1 if self.held[-1] == KEY_LEFT else 1
+                if self.arr <= 0:
+                    # ARR 0：移動できる距離を行マスクから求めて一度に動かす
+                    if game.slide_distance(direction):
+                        game.input_action(ACTION_SLIDE_LEFT if direction < 0 else ACTION_SLIDE_RIGHT)
+                else:
+                    # 1ティックの間に何回リピートするか（ARR がティックより短ければ複数回）
+                    # 壁やブロックに当たってからの空振りは記録しない
+                    due = int(elapsed // self.arr) + 1
+                    count = min(due - self.shift_repeats, game.slide_distance(direction))
+                    self.shift_repeats = due
+                    for _ in range(count):
+                        game.input_action(ACTION_LEFT if direction < 0 else ACTION_RIGHT)
+
+        if self.down_time is not None:
+            due = int((now - self.down_time) // self.soft_drop)
+            count = min(due - self.down_repeats, game.height)
+            self.down_repeats = due
+            for _ in range(count):
+                game.input_action(ACTION_DOWN)
@@ -0,0 +1,742 @@
+import random
+import time
+from functools import lru_cache
+
+from state import GameState
+
+
+# ゲーム設定
+FIELD_WIDTH = 10  # フィールドの幅（ブロック数）
+FIELD_HEIGHT = 20  # フィールドの高さ（ブロック数）
+
+# 論理時間（ティック）。描画のフレームレートとは無関係に一定の間隔で進む
+TICK_RATE = 60  # 1秒あたりのティック数
+TICK_MS = 1000 / TICK_RATE  # 1ティックの長さ（ミリ秒）
+
+# 消去ライン数ごとの基本スコア（レベル倍率を掛ける）
+LINE_SCORES = [0, 100, 300, 500, 800]
+MAX_LEVEL = 10
+
+
+def fall_speed_for(level):
+    # レベルごとの落下速度（ミリ秒。レベルが上がると速くなる）
+    return max(100, 500 - (level - 1) * 40)
+
+# step() に渡すアクション
+ACTION_NONE = 0
+ACTION_LEFT = 1
+ACTION_RIGHT = 2
+ACTION_DOWN = 3
+ACTION_ROTATE = 4
+ACTION_HARD_DROP = 5
+ACTION_SLIDE_LEFT = 6  # 左の壁（またはブロック）まで一気に移動
+ACTION_SLIDE_RIGHT = 7  # 右の壁（またはブロック）まで一気に移動
+ACTIONS = [ACTION_NONE, ACTION_LEFT, ACTION_RIGHT, ACTION_DOWN, ACTION_ROTATE, ACTION_HARD_DROP,
+           ACTION_SLIDE_LEFT, ACTION_SLIDE_RIGHT]
+
+# テトリミノの形状定義
+TETROMINOS = [
+    # I
+    [
+        [[0, 0, 0, 0],
+         [1, 1, 1, 1],
+         [0, 0, 0, 0],
+         [0, 0, 0, 0]],
+
+        [[0, 1, 0, 0],
+         [0, 1, 0, 0],
+         [0, 1, 0, 0],
+         [0, 1, 0, 0]]
+    ],
+    # O
+    [
+        [[1, 1],
+         [1, 1]]
+    ],
+    # T
+    [
+        [[0, 1, 0],
+         [1, 1, 1],
+         [0, 0, 0]],
+
+        [[0, 1, 0],
+         [0, 1, 1],
+         [0, 1, 0]],
+
+        [[0, 0, 0],
+         [1, 1, 1],
+         [0, 1, 0]],
+
+        [[0, 1, 0],
+         [1, 1, 0],
+         [0, 1, 0]]
+    ],
+    # S
+    [
+        [[0, 1, 1],
+         [1, 1, 0],
+         [0, 0, 0]],
+
+        [[0, 1, 0],
+         [0, 1, 1],
+         [0, 0, 1]]
+    ],
+    # Z
+    [
+        [[1, 1, 0],
+         [0, 1, 1],
+         [0, 0, 0]],
+
+        [[0, 0, 1],
+         [0, 1, 1],
+         [0, 1, 0]]
+    ],
+    # J
+    [
+        [[1, 0, 0],
+         [1, 1, 1],
+         [0, 0, 0]],
+
+        [[0, 1, 1],
+         [0, 1, 0],
+         [0, 1, 0]],
+
+        [[0, 0, 0],
+         [1, 1, 1],
+         [0, 0, 1]],
+
+        [[0, 1, 0],
+         [0, 1, 0],
+         [1, 1, 0]]
+    ],
+    # L
+    [
+        [[0, 0, 1],
+         [1, 1, 1],
+         [0, 0, 0]],
+
+        [[0, 1, 0],
+         [0, 1, 0],
+         [0, 1, 1]],
+
+        [[0, 0, 0],
+         [1, 1, 1],
+         [1, 0, 0]],
+
+        [[1, 1, 0],
+         [0, 1, 0],
+         [0, 1, 0]]
+    ]
+]
+
+
+# 対戦で送られてくるおじゃまブロックの field の値（テトリミノの色 1〜7 の次）
+GARBAGE_CELL = len(TETROMINOS) + 1
+
+# 各テトリミノ・各回転で埋まっているマス (dx, dy) の一覧
+PIECE_CELLS = [
+    [[(x, y) for y, row in enumerate(shape) for x, v in enumerate(row) if v] for shape in shapes]
+    for shapes in TETROMINOS
+]
+
+# 各テトリミノ・各回転で、列 dx ごとの一番下のマス dy（落下距離の計算用）
+PIECE_BOTTOMS = [
+    [tuple(sorted({dx: max(y for x, y in cells if x == dx) for dx, _ in cells}.items())) for cells in shapes]
+    for shapes in PIECE_CELLS
+]
+
+
+@lru_cache(maxsize=None)
+def build_piece_masks(width):
+    # 各テトリミノ・各回転・各x座標ごとに (dy, 行ビットマスク) のタプルを前計算する
+    # ビット x がフィールドの列 x に対応する。壁にはみ出す x は辞書に含めない
+    table = []
+    for shapes in PIECE_CELLS:
+        rotations = []
+        for cells in shapes:
+            row_masks = {}
+            for x, y in cells:
+                row_masks[y] = row_masks.get(y, 0) | (1 << x)
+            min_x = min(x for x, _ in cells)
+            max_x = max(x for x, _ in cells)
+
+            by_x = {}
+            for offset in range(-min_x, width - max_x):
+                if offset >= 0:
+                    by_x[offset] = tuple((y, m << offset) for y, m in sorted(row_masks.items()))
+                else:
+                    by_x[offset] = tuple((y, m >> -offset) for y, m in sorted(row_masks.items()))
+            rotations.append(by_x)
+        table.append(rotations)
+    return table
+
+
+MASK64 = (1 << 64) - 1
+
+
+# テトリミノ選択用の小さな乱数生成器（xorshift64*）
+# シードが同じならどのプロセスでも同じ順番でテトリミノが出る
+class PieceRandom:
+    def __init__(self, seed=None):
+        self.seed(seed)
+
+    def seed(self, seed=None):
+        if seed is None:
+            seed = random.getrandbits(64)
+
+        # splitmix64 でシードをかき混ぜて初期状態にする（0 は使えない）
+        z = (seed + 0x9E3779B97F4A7C15) & MASK64
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+        self.state = (z ^ (z >> 31)) or 1
+
+    def next_piece(self):
+        # 0〜6 のテトリミノ番号を返す
+        x = self.state
+        x ^= x >> 12
+        x ^= (x << 25) & MASK64
+        x ^= x >> 27
+        self.state = x
+        return (((x * 0x2545F4914F6CDD1D) & MASK64) * 7) >> 64
+
+
+def default_clock():
+    # 単調増加するミリ秒カウンタ（pygame.time.get_ticks 相当）
+    return int(time.monotonic() * 1000)
+
+
+# 時計の経過時間を固定長のティック数に変換する
+# max_ticks を指定すると、処理落ちのあとに一度に進めるティック数を制限する
+class FixedTimestep:
+    def __init__(self, clock, tick_ms=TICK_MS, max_ticks=None):
+        self.clock = clock
+        self.tick_ms = tick_ms
+        self.max_ticks = max_ticks
+        self.reset()
+
+    def reset(self):
+        # それまでの経過時間を捨てて今の時刻から数え直す（一時停止からの復帰など）
+        self.last_time = self.clock()
+        self.accumulator = 0
+
+    def advance(self):
+        # 前回から進めるべきティック数を返す
+        now = self.clock()
+        self.accumulator += now - self.last_time
+        self.last_time = now
+
+        ticks = int(self.accumulator // self.tick_ms)
+        if self.max_ticks is not None and ticks > self.max_ticks:
+            ticks = self.max_ticks
+            self.accumulator = 0
+        else:
+            self.accumulator -= ticks * self.tick_ms
+        return ticks
+
+
+# pygame に依存しないゲームルール本体
+# 描画や入力は持たず、step() で1アクションずつ進める
+class TetrisEngine:
+    def __init__(self, clock=None, width=FIELD_WIDTH, height=FIELD_HEIGHT, seed=None, telemetry=None):
+        # clock はミリ秒を返す関数（テストやシミュレーション用に差し替え可能）
+        self.clock = clock or default_clock
+        # テトリミノが出現するたびに piece_spawned(engine) を呼ぶ記録係（telemetry.TelemetryWriter など）
+        self.telemetry = telemetry
+        self.timestep = FixedTimestep(self.clock)
+        self.width = width
+        self.height = height
+        self.full_row = (1 << width) - 1
+        self.piece_masks = build_piece_masks(width)
+        self.rng = PieceRandom()
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        # seed を省略すると新しいランダムなシードでゲームを始める
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.seed = seed
+        self.rng.seed(seed)
+
+        # 盤面は1行1整数のビットマスク。描画用の色は field に並行して持つ
+        self.rows = [0] * self.height
+        self.field = [[0 for _ in range(self.width)] for _ in range(self.height)]
+        self.empty_row = [0] * self.width
+        self.stack_top = self.height  # ブロックがある最も上の行（空なら height）
+        self.heights = [0] * self.width  # 各列の積み上がりの高さ
+        self.touched_rows = []  # 直前の固定で埋まったマスがある行
+        self.field_version = 0  # 盤面が変わるたびに増える（描画側の差分検出用）
+        self.score = 0
+        self.level = 1
+        self.lines_cleared = 0
+        self.pieces_placed = 0
+        self.game_over = False
+
+        # ゲームタイミング（ティック単位）
+        self.ticks = 0
+        self.last_fall_tick = 0
+        self.fall_speed = fall_speed_for(self.level)  # 落下速度（ミリ秒）
+        self.timestep.reset()
+
+        # プレビュー用の次のテトリミノ
+        self.next_tetromino_type = self.rng.next_piece()
+        self.next_tetromino_rotation = 0
+
+        # 新しいテトリミノを生成
+        self.new_tetromino()
+
+    def snapshot(self):
+        # 今のゲームの状態を GameState にする（盤面はタプルにコピーするので、このあと進めても変わらない）
+        return GameState(
+            self.width, self.height, tuple(self.rows), tuple(bytes(row) for row in self.field),
+            self.tetromino_type, self.tetromino_rotation, self.tetromino_x, self.tetromino_y,
+            self.next_tetromino_type, self.next_tetromino_rotation,
+            self.score, self.level, self.lines_cleared, self.pieces_placed,
+            self.ticks, self.last_fall_tick, self.game_over, self.seed, self.rng.state,
+        )
+
+    def restore(self, state):
+        # snapshot() や GameState.unpack() の状態に戻す。盤面の大きさは同じでなければならない
+        if (state.width, state.height) != (self.width, self.height):
+            raise ValueError(f"state is {state.width}x{state.height}, engine is {self.width}x{self.height}")
+        self.seed = state.seed
+        self.rng.state = state.rng_state
+
+        rows = list(state.rows)
+        self.rows = rows
+        if state.colors is not None:
+            self.field = [list(row) for row in state.colors]
+        else:
+            # 色を持たない状態（pack() したもの）は、埋まったマスをおじゃまブロックの色で塗る
+            self.field = [[GARBAGE_CELL if row >> x & 1 else 0 for x in range(self.width)] for row in rows]
+        self.empty_row = [0] * self.width
+
+        # 列の高さとスタック上端は行ビットマスクから求め直す
+        self.stack_top = self.height
+        heights = [0] * self.width
+        remaining = self.full_row
+        for y, row in enumerate(rows):
+            if row and self.stack_top == self.height:
+                self.stack_top = y
+            hit = row & remaining
+            if hit:
+                remaining &= ~hit
+                while hit:
+                    low = hit & -hit
+                    heights[low.bit_length() - 1] = self.height - y
+                    hit ^= low
+        self.heights = heights
+        self.touched_rows = []
+        self.field_version += 1
+
+        self.score = state.score
+        self.level = state.level
+        self.lines_cleared = state.lines_cleared
+        self.pieces_placed = state.pieces_placed
+        self.game_over = state.game_over
+        self.ticks = state.ticks
+        self.last_fall_tick = state.last_fall_tick
+        self.fall_speed = fall_speed_for(self.level)
+        self.timestep.reset()
+
+        self.tetromino_type = state.tetromino_type
+        self.tetromino_rotation = state.tetromino_rotation
+        self.tetromino_x = state.tetromino_x
+        self.tetromino_y = state.tetromino_y
+        self.next_tetromino_type = state.next_tetromino_type
+        self.next_tetromino_rotation = state.next_tetromino_rotation
+        self.ghost_y = None
+
+    def clone(self):
+        # 先読みや「もしも」の分岐用に、ルールの状態だけをコピーした TetrisEngine を作る
+        # reset() も restore() も通さず、盤面のリストだけをコピーする（時計と前計算の表は共有する）
+        # Tetris から呼んでも描画や入力の状態は持たない TetrisEngine が返る
+        other = TetrisEngine.__new__(TetrisEngine)
+        other.clock = self.clock
+        other.telemetry = None  # 分岐先の手は記録しない
+        other.timestep = FixedTimestep(self.clock)
+        other.width = self.width
+        other.height = self.height
+        other.full_row = self.full_row
+        other.piece_masks = self.piece_masks
+        other.rng = PieceRandom.__new__(PieceRandom)
+        other.rng.state = self.rng.state
+        other.seed = self.seed
+
+        other.rows = self.rows[:]
+        other.field = [row[:] for row in self.field]
+        other.empty_row = [0] * self.width
+        other.stack_top = self.stack_top
+        other.heights = self.heights[:]
+        other.touched_rows = self.touched_rows[:]
+        other.field_version = self.field_version
+        other.score = self.score
+        other.level = self.level
+        other.lines_cleared = self.lines_cleared
+        other.pieces_placed = self.pieces_placed
+        other.game_over = self.game_over
+        other.ticks = self.ticks
+        other.last_fall_tick = self.last_fall_tick
+        other.fall_speed = self.fall_speed
+
+        other.tetromino_type = self.tetromino_type
+        other.tetromino_rotation = self.tetromino_rotation
+        other.tetromino_x = self.tetromino_x
+        other.tetromino_y = self.tetromino_y
+        other.next_tetromino_type = self.next_tetromino_type
+        other.next_tetromino_rotation = self.next_tetromino_rotation
+        other.ghost_y = self.ghost_y
+        return other
+
+    def new_tetromino(self):
+        # 直前に固定したテトリミノの記録（tetromino_* はまだ固定したテトリミノを指している）
+        if self.telemetry is not None:
+            self.telemetry.piece_spawned(self)
+
+        # 次のテトリミノを現在のテトリミノにセット
+        self.tetromino_type = self.next_tetromino_type
+        self.tetromino_rotation = self.next_tetromino_rotation
+
+        # 次のテトリミノを新しく生成
+        self.next_tetromino_type = self.rng.next_piece()
+        self.next_tetromino_rotation = 0
+
+        # テトリミノの初期位置
+        self.tetromino_x = self.width // 2 - len(TETROMINOS[self.tetromino_type][self.tetromino_rotation][0]) // 2
+        self.tetromino_y = 0
+        self.ghost_y = None
+
+        # 生成時に衝突する場合はゲームオーバー
+        if self.check_collision():
+            self.game_over = True
+
+    def rotate_tetromino(self):
+        # 現在のローテーション状態を保存
+        old_rotation = self.tetromino_rotation
+
+        # ローテーションを次に進める
+        self.tetromino_rotation = (self.tetromino_rotation + 1) % len(TETROMINOS[self.tetromino_type])
+
+        # 衝突チェック
+        if self.check_collision():
+            # 衝突する場合は元に戻す
+            self.tetromino_rotation = old_rotation
+            return False
+
+        self.ghost_y = None
+        return True
+
+    def check_collision(self):
+        # 前計算済みの行マスクと盤面の AND で衝突判定
+        masks = self.piece_masks[self.tetromino_type][self.tetromino_rotation].get(self.tetromino_x)
+        if masks is None:
+            # 左右の壁にはみ出している
+            return True
+
+        rows = self.rows
+        height = self.height
+        y = self.tetromino_y
+        for dy, mask in masks:
+            field_y = y + dy
+            if field_y >= height:
+                return True
+
+            # 他のブロックとの衝突チェック (床より上の場合のみ)
+            if field_y >= 0 and rows[field_y] & mask:
+                return True
+
+        return False
+
+    def lock_tetromino(self):
+        # 現在のテトリミノをフィールドに固定
+        rows = self.rows
+        touched = []
+        for dy, mask in self.piece_masks[self.tetromino_type][self.tetromino_rotation][self.tetromino_x]:
+            field_y = self.tetromino_y + dy
+            if 0 <= field_y < self.height:
+                rows[field_y] |= mask
+                touched.append(field_y)
+        self.touched_rows = touched
+
+        if touched and touched[0] < self.stack_top:
+            self.stack_top = touched[0]
+
+        # 描画用の色情報と列の高さ
+        color = self.tetromino_type + 1
+        heights = self.heights
+        for dx, dy in PIECE_CELLS[self.tetromino_type][self.tetromino_rotation]:
+            field_y = self.tetromino_y + dy
+            if 0 <= field_y < self.height:
+                field_x = self.tetromino_x + dx
+                self.field[field_y][field_x] = color
+                if self.height - field_y > heights[field_x]:
+                    heights[field_x] = self.height - field_y
+
+        self.pieces_placed += 1
+        self.field_version += 1
+
+    def clear_lines(self):
+        # 行ビットマスクがそのまま埋まり具合を表すので、
+        # 揃った行の候補は直前に固定したテトリミノが触れた行だけ
+        rows = self.rows
+        full_row = self.full_row
+        full_rows = [y for y in self.touched_rows if rows[y] == full_row]
+        self.touched_rows = []
+
+        lines_to_clear = len(full_rows)
+        if lines_to_clear == 0:
+            return 0
+
+        # 消えた行をリストから抜き、同じ数の空行を先頭に入れる
+        # 行の移動はリストの中のずらしだけなので、Python の処理は盤面の高さではなく消去行数に比例する
+        # 消えた行の色のリストは空にして先頭で再利用する
+        field = self.field
+        freed = []
+        for y in reversed(full_rows):
+            del rows[y]
+            row = field.pop(y)
+            row[:] = self.empty_row
+            freed.append(row)
+        rows[0:0] = [0] * lines_to_clear
+        field[0:0] = freed
+
+        self.stack_top = min(self.height, self.stack_top + lines_to_clear)
+        self.update_heights(full_rows[0], lines_to_clear)
+
+        # スコア計算
+        self.add_score(lines_to_clear)
+
+        return lines_to_clear
+
+    def update_heights(self, top_cleared, lines):
+        # ライン消去後の列の高さを更新する
+        # 一番上の消去行より上にブロックがある列は消えた行数だけ低くなる
+        # 一番上のブロックが消去行にあった列だけ、下へたどって新しい表面を探す
+        heights = self.heights
+        surface = self.height - top_cleared
+        remaining = 0
+        for x in range(self.width):
+            if heights[x] > surface:
+                heights[x] -= lines
+            elif heights[x]:
+                heights[x] = 0
+                remaining |= 1 << x
+
+        rows = self.rows
+        for y in range(top_cleared + lines, self.height):
+            if not remaining:
+                break
+            hit = rows[y] & remaining
+            if hit:
+                remaining &= ~hit
+                while hit:
+                    low = hit & -hit
+                    heights[low.bit_length() - 1] = self.height - y
+                    hit ^= low
+
+    def add_garbage(self, lines, hole):
+        # 対戦のおじゃまライン：盤面を lines 行押し上げ、hole 列だけが空いた行を下から入れる
+        if lines <= 0 or self.game_over:
+            return
+        lines = min(lines, self.height)
+        # 押し上げで上端からブロックがはみ出したらゲームオーバー
+        if self.stack_top < lines:
+            self.game_over = True
+
+        garbage = self.full_row & ~(1 << hole)
+        del self.rows[:lines]
+        self.rows.extend([garbage] * lines)
+        del self.field[:lines]
+        self.field.extend([GARBAGE_CELL if x != hole else 0 for x in range(self.width)] for _ in range(lines))
+        self.stack_top = max(0, self.stack_top - lines)
+
+        heights = self.heights
+        for x in range(self.width):
+            if x != hole or heights[x]:
+                heights[x] = min(self.height, heights[x] + lines)
+        self.touched_rows = []
+        self.field_version += 1
+        self.ghost_y = None
+
+        # 落下中のテトリミノが押し上げたブロックに重なったら、重ならないところまで上にずらす
+        for _ in range(lines):
+            if not self.check_collision():
+                break
+            self.tetromino_y -= 1
+        else:
+            if self.check_collision():
+                self.game_over = True
+
+    def add_score(self, lines):
+        # スコア・レベル・落下速度の更新
+        self.lines_cleared += lines
+        self.score += LINE_SCORES[lines] * self.level
+
+        # レベルアップ判定
+        self.level = min(MAX_LEVEL, 1 + self.lines_cleared // 10)
+
+        # 速度調整
+        self.fall_speed = fall_speed_for(self.level)
+
+    def move(self, dx, dy):
+        # 移動前の位置を保存
+        old_x = self.tetromino_x
+        old_y = self.tetromino_y
+
+        # 移動
+        self.tetromino_x += dx
+        self.tetromino_y += dy
+
+        # 衝突チェック
+        if self.check_collision():
+            # 衝突した場合は元の位置に戻す
+            self.tetromino_x = old_x
+            self.tetromino_y = old_y
+
+            # 下方向への移動で衝突した場合は固定処理
+            if dy > 0:
+                self.lock_tetromino()
+                self.clear_lines()
+                self.new_tetromino()
+
+            return False
+
+        if dx:
+            self.ghost_y = None
+        return True
+
+    def slide_distance(self, direction):
+        # 左 (direction < 0) または右に何マス動けるかを、move() を繰り返さずに行マスクから求める
+        # テトリミノの各行のブロックは横に連続しているので、行ごとに一番近い障害物までの距離の最小値になる
+        rows = self.rows
+        y = self.tetromino_y
+        distance = self.width
+        for dy, mask in self.piece_masks[self.tetromino_type][self.tetromino_rotation][self.tetromino_x]:
+            field_y = y + dy
+            row = rows[field_y] if field_y >= 0 else 0
+            if direction < 0:
+                # 行の左端の列より左にあるブロックのうち一番右のもの
+                left = (mask & -mask).bit_length() - 1
+                free = left - (row & ((1 << left) - 1)).bit_length()
+            else:
+                # 行の右端の列より右にあるブロックのうち一番左のもの
+                right = mask.bit_length()
+                blocks = row >> right
+                free = (blocks & -blocks).bit_length() - 1 if blocks else self.width - right
+            if free < distance:
+                distance = free
+        return distance
+
+    def slide(self, direction):
+        # 壁かブロックに当たるまで横に移動する（ARR 0 のキーリピート）。動いたマス数を返す
+        distance = self.slide_distance(direction)
+        if distance:
+            self.tetromino_x += distance if direction > 0 else -distance
+            self.ghost_y = None
+        return distance
+
+    def drop_y(self):
+        # 列の高さから着地位置の y を直接求める
+        y = self.tetromino_y
+        heights = self.heights
+        landing = self.height
+        for dx, bottom in PIECE_BOTTOMS[self.tetromino_type][self.tetromino_rotation]:
+            column_landing = self.height - heights[self.tetromino_x + dx] - 1 - bottom
+            if column_landing < landing:
+                landing = column_landing
+
+        if landing >= y:
+            return landing
+
+        # 張り出しの下に潜り込んでいる場合は表面が使えないので1段ずつ調べる
+        while True:
+            self.tetromino_y += 1
+            if self.check_collision():
+                self.tetromino_y -= 1
+                break
+        landing = self.tetromino_y
+        self.tetromino_y = y
+        return landing
+
+    def get_ghost_y(self):
+        # ゴーストピースの y 座標（移動・回転・固定したときだけ再計算する）
+        if self.ghost_y is None:
+            self.ghost_y = self.drop_y()
+        return self.ghost_y
+
+    def hard_drop(self):
+        # テトリミノを一気に落下させる
+        self.tetromino_y = self.get_ghost_y()
+        self.lock_tetromino()
+        self.clear_lines()
+        self.new_tetromino()
+
+    def tick(self):
+        # 論理時間を1ティック進める
+        self.ticks += 1
+        if self.game_over:
+            return
+
+        # 自然落下
+        if (self.ticks - self.last_fall_tick) * TICK_MS > self.fall_speed:
+            self.move(0, 1)
+            self.last_fall_tick = self.ticks
+
+    def update(self):
+        # 時計に追いつくまで固定長のティックを進める
+        for _ in range(self.timestep.advance()):
+            self.tick()
+
+    def next_fall_tick(self):
+        # 次に自然落下が起きるティック（tick() と同じ比較で求める）
+        wait = int(self.fall_speed // TICK_MS)
+        while wait * TICK_MS <= self.fall_speed:
+            wait += 1
+        # 落下速度が上がった直後は次のティックですぐ落ちることがある
+        return max(self.last_fall_tick + wait, self.ticks + 1)
+
+    def advance_to(self, target_tick):
+        # target_tick まで tick() を繰り返したのと同じ状態にする
+        # 何も起きないティックは飛ばし、自然落下のあるティックだけを実行する
+        while self.ticks < target_tick:
+            if self.game_over:
+                self.ticks = target_tick
+                return
+
+            fall_tick = self.next_fall_tick()
+            if fall_tick > target_tick:
+                self.ticks = target_tick
+                return
+
+            self.ticks = fall_tick - 1
+            self.tick()
+
+    def step(self, action):
+        # 1アクションを適用して時間を進める
+        # 戻り値はこのステップで消去したライン数
+        if self.game_over:
+            return 0
+
+        lines_before = self.lines_cleared
+        self.apply_action(action)
+        self.update()
+
+        return self.lines_cleared - lines_before
+
+    def apply_action(self, action):
+        # 時間を進めずに1アクションだけ適用する（ゲームオーバーのあとは何もしない）
+        if self.game_over:
+            return
+        if action == ACTION_LEFT:
+            self.move(-1, 0)
+        elif action == ACTION_RIGHT:
+            self.move(1, 0)
+        elif action == ACTION_DOWN:
+            self.move(0, 1)
+        elif action == ACTION_ROTATE:
+            self.rotate_tetromino()
+        elif action == ACTION_HARD_DROP:
+            self.hard_drop()
+        elif action == ACTION_SLIDE_LEFT:
+            self.slide(-1)
+        elif action == ACTION_SLIDE_RIGHT:
+            self.slide(1)
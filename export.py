@@ -0,0 +1,244 @@
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from engine import TetrisEngine, TICK_RATE
+from rankings import RankingStore, RankingError
+from replay import InputLog, ReplayError, REPLAY_DIR, replay_paths
+
+
+DEFAULT_FPS = 30
+SEGMENT_FRAMES = 240  # ワーカーに1回で渡すフレーム数
+HOLD_SECONDS = 2.0  # 最後の画面（ゲームオーバー）を止めて映す秒数
+FRAME_FORMATS = ("png", "jpg", "bmp", "tga")
+FRAME_NAME = "frame_{:06d}.{}"
+
+
+def frame_count(log, fps, hold):
+    # 1ゲーム分のフレーム数（最後の画面を hold 秒止める分を含む）
+    return log.result[0] * fps // TICK_RATE + 1 + int(hold * fps)
+
+
+# ワーカープロセスごとに、盤面の大きさごとに1つだけ作って使い回す
+worker_games = {}
+
+
+def init_worker():
+    # ウィンドウは開かずにオフスクリーンのサーフェスへ描く
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    import pygame
+    pygame.display.init()
+    pygame.font.init()
+
+
+def worker_game(width, height):
+    game = worker_games.get((width, height))
+    if game is None:
+        import pygame
+        from main import Tetris
+        from renderer import SCREEN_WIDTH, SCREEN_HEIGHT
+        surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        game = Tetris(surface, seed=0, record_dir=None, width=width, height=height,
+                      rankings_store=RankingStore(log_path=None, index_path=None))
+        worker_games[(width, height)] = game
+    return game
+
+
+def frame_tick(frame, fps, end_tick):
+    # フレームに映すティック（ゲームの終わりより後は最後の画面のまま）
+    return min(frame * TICK_RATE // fps, end_tick)
+
+
+def segment_states(log, fps, first, total, size):
+    # クリップを size フレームずつの区間に分け、(先頭フレーム, フレーム数, 区間の始めの状態, 区間の入力) を返す
+    # 描画せずにエンジンだけで（入力のないティックは飛ばして）ゲームを1回だけ先頭から進め、区間の始めごとに
+    # snapshot() を取るので、ワーカーはゲームの途中から描き始められる
+    end_tick = log.result[0]
+    events = list(log.events())
+    engine = TetrisEngine(clock=lambda: 0, width=log.width, height=log.height, seed=log.seed)
+    i = 0
+    for start in range(first, total, size):
+        count = min(size, total - start)
+        start_tick = frame_tick(start, fps, end_tick)
+        while i < len(events) and events[i][0] <= start_tick:
+            engine.advance_to(events[i][0])
+            engine.apply_action(events[i][1])
+            i += 1
+        engine.advance_to(start_tick)
+
+        # 区間の始めのティックより後、区間の最後のフレームのティックまでの入力
+        last_tick = frame_tick(start + count - 1, fps, end_tick)
+        j = i
+        while j < len(events) and events[j][0] <= last_tick:
+            j += 1
+        yield start, count, engine.snapshot(), events[i:j]
+
+
+def render_segment(state, events, end_tick, first, count, clip_first, fps, frame_dir, fmt):
+    # 状態 state から、ゲームのフレーム first から count 枚を Tetris.draw と同じ描画で書き出し、書いた枚数を返す
+    # events はその区間の入力。ファイル名の番号はクリップの先頭 clip_first から数える
+    import pygame
+
+    game = worker_game(state.width, state.height)
+    game.reset(state.seed)
+    game.restore(state)
+
+    i = 0
+    for frame in range(first, first + count):
+        # そのフレームの時刻まで、入力を記録どおりのティックで適用しながら進める
+        target = frame_tick(frame, fps, end_tick)
+        while True:
+            while i < len(events) and events[i][0] == game.ticks:
+                game.apply_action(events[i][1])
+                i += 1
+            if game.ticks >= target:
+                break
+            TetrisEngine.tick(game)
+
+        game.draw()
+        pygame.image.save(game.renderer.surface, os.path.join(frame_dir, FRAME_NAME.format(frame - clip_first, fmt)))
+    return count
+
+
+def encode_video(frame_dir, fmt, fps, output):
+    # 連番のフレームを ffmpeg で H.264 の動画にまとめる
+    subprocess.run(
+        ["ffmpeg", "-loglevel", "error", "-y", "-framerate", str(fps),
+         "-i", os.path.join(frame_dir, FRAME_NAME.replace("{:06d}", "%06d").format(fmt)),
+         "-c:v", "libx264", "-pix_fmt", "yuv420p", "-movflags", "+faststart", output],
+        check=True,
+    )
+
+
+class Clip:
+    # 書き出す1ゲーム分の範囲（フレーム番号）と出力先
+    def __init__(self, path, log, fps, hold, last, output_dir):
+        self.path = path
+        self.log = log
+        self.fps = fps
+        self.total = frame_count(log, fps, hold)
+        self.first = max(0, self.total - int((last + hold) * fps)) if last else 0
+        self.frames = self.total - self.first
+        self.name = os.path.splitext(os.path.basename(path))[0]
+        self.frame_dir = os.path.join(output_dir, self.name)
+        self.pending = 0  # 書き出しが終わっていない区間の数
+
+    def segments(self, size):
+        return segment_states(self.log, self.fps, self.first, self.total, size)
+
+
+def top_replays(n):
+    # ランキング上位 n 件のうち、入力ログの場所が記録されているもの
+    store = RankingStore()
+    store.load()
+    return [record["replay"] for record in store.top(n) if record.get("replay")]
+
+
+def run(clips, fps, fmt, workers=None, segment=SEGMENT_FRAMES, on_clip=None, on_progress=None):
+    # すべてのクリップの区間をワーカーに配り、クリップが書き終わるたびに on_clip(clip) を呼ぶ
+    # 同時に投入する区間の数を抑えて、長いゲームをたくさん渡してもメモリを使いすぎないようにする
+    workers = workers or os.cpu_count() or 1
+    for clip in clips:
+        os.makedirs(clip.frame_dir, exist_ok=True)
+        clip.pending = len(range(clip.first, clip.total, segment))
+    # 区間の状態はクリップごとに1回の先読みで作り、投入するときに必要な分だけ進める
+    tasks = ((clip, segment_task) for clip in clips for segment_task in clip.segments(segment))
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+        pending = {}
+
+        def collect(done):
+            for future in done:
+                clip = pending.pop(future)
+                frames = future.result()
+                clip.pending -= 1
+                if on_progress:
+                    on_progress(frames)
+                if not clip.pending and on_clip:
+                    on_clip(clip)
+
+        for clip, (first, count, state, events) in tasks:
+            future = executor.submit(render_segment, state, events, clip.log.result[0], first, count, clip.first,
+                                     fps, clip.frame_dir, fmt)
+            pending[future] = clip
+            if len(pending) >= workers * 2:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            collect(done)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="入力ログをウィンドウなしで描画し、連番画像や動画に書き出す")
+    parser.add_argument("paths", nargs="*", help=f"リプレイファイルまたはディレクトリ（既定は {REPLAY_DIR}/）")
+    parser.add_argument("--top", type=int, help="ランキング上位 N 件のゲームを書き出す")
+    parser.add_argument("--output", default="exports", help="書き出し先のディレクトリ")
+    parser.add_argument("--fps", type=int, default=DEFAULT_FPS, help=f"フレームレート（既定 {DEFAULT_FPS}）")
+    parser.add_argument("--format", choices=FRAME_FORMATS, default="png", help="フレームの画像形式")
+    parser.add_argument("--last", type=float, help="最後の N 秒だけを書き出す（ハイライト用）")
+    parser.add_argument("--hold", type=float, default=HOLD_SECONDS, help="最後の画面を止めて映す秒数")
+    parser.add_argument("--video", action="store_true", help="ffmpeg で MP4 にまとめる（連番画像は消す）")
+    parser.add_argument("--keep-frames", action="store_true", help="--video のときも連番画像を残す")
+    parser.add_argument("--workers", type=int, default=None, help="ワーカープロセス数（既定は CPU コア数）")
+    parser.add_argument("--segment", type=int, default=SEGMENT_FRAMES, help="1回にワーカーへ渡すフレーム数")
+    args = parser.parse_args()
+    if not 1 <= args.fps <= TICK_RATE:
+        parser.error(f"--fps は 1〜{TICK_RATE} で指定してください")
+    if args.video and shutil.which("ffmpeg") is None:
+        parser.error("--video には ffmpeg が必要です")
+
+    paths = list(args.paths)
+    if args.top:
+        try:
+            paths += top_replays(args.top)
+        except (OSError, RankingError) as e:
+            parser.error(f"ランキングを読み込めませんでした: {e}")
+    if not paths and not args.top:
+        paths = [REPLAY_DIR]
+
+    clips = []
+    for path in replay_paths(paths):
+        try:
+            log = InputLog.load(path)
+        except (OSError, ReplayError) as e:
+            print(f"ERROR     {path}: {e}", file=sys.stderr)
+            continue
+        clips.append(Clip(path, log, args.fps, args.hold, args.last, args.output))
+    if not clips:
+        print("書き出すリプレイがありません", file=sys.stderr)
+        sys.exit(1)
+
+    total = sum(clip.frames for clip in clips)
+    done = [0]
+    start = time.perf_counter()
+
+    def on_progress(frames):
+        done[0] += frames
+        elapsed = time.perf_counter() - start
+        print(f"\r{done[0]}/{total} frames  {done[0] / elapsed:.0f} frames/s", end="", file=sys.stderr)
+
+    def on_clip(clip):
+        output = clip.frame_dir
+        if args.video:
+            output = f"{clip.frame_dir}.mp4"
+            encode_video(clip.frame_dir, args.format, args.fps, output)
+            if not args.keep_frames:
+                shutil.rmtree(clip.frame_dir)
+        print(f"\rOK        {clip.path} -> {output} ({clip.frames} frames)", file=sys.stderr)
+
+    run(clips, args.fps, args.format, args.workers, args.segment, on_clip, on_progress)
+
+    elapsed = time.perf_counter() - start
+    seconds = total / args.fps
+    print(f"{len(clips)} games  {total} frames  {elapsed:.1f}s  "
+          f"({seconds / max(elapsed, 1e-9):.1f}x real time at {args.fps} fps)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import deque
+
+from engine import FIELD_WIDTH, FIELD_HEIGHT, ACTION_LEFT, ACTION_RIGHT, ACTION_DOWN, ACTION_ROTATE, ACTION_HARD_DROP
+from profiler import percentile
+from server import (SERVER_MAGIC, PROTOCOL_VERSION, HELLO, HELLO_SEED, INPUT, STATE, STATS, MSG_STATE, MSG_STATS,
+                    STATE_GAME_OVER, STATE_ROWS, CMD_PAUSE, CMD_RESET, CMD_STATS, DEFAULT_PORT, row_bytes)
+
+
+# ボットが送るアクション（ハードドロップは8回に1回くらい）
+BOT_ACTIONS = [ACTION_LEFT, ACTION_RIGHT, ACTION_ROTATE, ACTION_DOWN] * 2 + [ACTION_HARD_DROP]
+
+
+async def read_message(reader, width, height):
+    # サーバーからのメッセージを1つ読み、アンパックしたタプルを返す（盤面の行は読み飛ばす）
+    kind = await reader.readexactly(1)
+    if kind[0] == MSG_STATE:
+        state = STATE.unpack(kind + await reader.readexactly(STATE.size - 1))
+        if state[1] & STATE_ROWS:
+            await reader.readexactly(row_bytes(width) * height)
+        return state
+    if kind[0] == MSG_STATS:
+        return STATS.unpack(kind + await reader.readexactly(STATS.size - 1))
+    raise ValueError(f"unknown message type {kind[0]}")
+
+
+class Connector:
+    def __init__(self, host, port, unix_path):
+        self.host = host
+        self.port = port
+        self.unix_path = unix_path
+
+    async def __call__(self, width=FIELD_WIDTH, height=FIELD_HEIGHT, seed=None):
+        # 接続して HELLO を送り、最初の状態を受け取るまで待つ
+        if self.unix_path:
+            reader, writer = await asyncio.open_unix_connection(self.unix_path)
+        else:
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+        writer.write(HELLO.pack(SERVER_MAGIC, PROTOCOL_VERSION, HELLO_SEED if seed is not None else 0,
+                                width, height, seed or 0))
+        await read_message(reader, width, height)
+        return reader, writer
+
+
+# 一定間隔でランダムなアクションを送り、その入力の通し番号が返ってくるまでの往復時間を測る
+class Bot:
+    def __init__(self, rng, interval, results):
+        self.rng = rng
+        self.interval = interval
+        self.results = results  # 計測区間の往復時間（ミリ秒）を入れるリスト（None なら測らない）
+        self.pending = deque()  # (通し番号, 送った時刻)
+        self.seq = 0
+        self.game_over = False
+        self.games = 0
+
+    async def run(self, connect, stop_time):
+        reader, writer = await connect(seed=self.rng.getrandbits(64))
+        receiver = asyncio.create_task(self.receive(reader))
+        # 全員が同じ瞬間に送らないように最初だけずらす
+        await asyncio.sleep(self.rng.random() * self.interval)
+        try:
+            while time.perf_counter() < stop_time:
+                action = CMD_RESET if self.game_over else self.rng.choice(BOT_ACTIONS)
+                if action == CMD_RESET:
+                    self.game_over = False
+                    self.games += 1
+                self.seq += 1
+                self.pending.append((self.seq, time.perf_counter()))
+                writer.write(INPUT.pack(self.seq, action))
+                await asyncio.sleep(self.interval)
+        finally:
+            receiver.cancel()
+            writer.close()
+
+    async def receive(self, reader):
+        while True:
+            state = await read_message(reader, FIELD_WIDTH, FIELD_HEIGHT)
+            now = time.perf_counter()
+            seq = state[2]
+            # 状態に付いた通し番号までの入力はすべて処理済み
+            while self.pending and self.pending[0][0] <= seq:
+                _, sent = self.pending.popleft()
+                if self.results is not None:
+                    self.results.append((now - sent) * 1000)
+            if state[1] & STATE_GAME_OVER:
+                self.game_over = True
+
+
+async def server_stats(reader, writer):
+    writer.write(INPUT.pack(0, CMD_STATS))
+    while True:
+        message = await read_message(reader, FIELD_WIDTH, FIELD_HEIGHT)
+        if message[0] == MSG_STATS:
+            return message
+
+
+async def run_load(connect, sessions, idle, rate, duration, warmup, seed):
+    rng = random.Random(seed)
+
+    # 統計を問い合わせる接続（一時停止してタイマーに載らないようにする）
+    control = await connect()
+    control[1].write(INPUT.pack(0, CMD_PAUSE))
+
+    # 何もしない接続（一時停止したまま置いておく）
+    idle_connections = []
+    for _ in range(idle):
+        reader, writer = await connect()
+        writer.write(INPUT.pack(0, CMD_PAUSE))
+        idle_connections.append(writer)
+
+    latencies = []
+    interval = 1 / rate
+    start = time.perf_counter()
+    stop_time = start + warmup + duration
+    bots = [Bot(random.Random(rng.getrandbits(64)), interval, None) for _ in range(sessions)]
+    tasks = [asyncio.create_task(bot.run(connect, stop_time)) for bot in bots]
+
+    # ウォームアップのあいだに全員が接続し終えてから計測を始める
+    await asyncio.sleep(max(0.0, start + warmup - time.perf_counter()))
+    for bot in bots:
+        bot.results = latencies
+    before = await server_stats(*control)
+    window_start = time.perf_counter()
+    await asyncio.gather(*tasks)
+    await asyncio.sleep(max(0.0, stop_time - time.perf_counter()))
+    after = await server_stats(*control)
+    elapsed = time.perf_counter() - window_start
+
+    for writer in idle_connections:
+        writer.close()
+    control[1].close()
+
+    connected = before[1]
+    actions, cpu = after[3], after[5]
+    cpu_share = (cpu - before[5]) / elapsed
+    latencies.sort()
+    return {
+        "sessions": sessions,
+        "idle": idle,
+        "connected": connected,
+        "elapsed": elapsed,
+        "actions_per_s": (actions - before[3]) / elapsed,
+        "server_cpu": cpu_share,
+        "sessions_per_core": sessions / cpu_share if sessions and cpu_share else None,
+        "rtt_p50": percentile(latencies, 0.50),
+        "rtt_p95": percentile(latencies, 0.95),
+        "rtt_p99": percentile(latencies, 0.99),
+        "samples": len(latencies),
+        "games": sum(bot.games for bot in bots),
+    }
+
+
+async def spawn_server(address_args):
+    # 計測用にサーバーを別プロセスで起動し、待ち受けを始めるまで待つ
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.py")
+    process = await asyncio.create_subprocess_exec(sys.executable, script, *address_args,
+                                                   stderr=asyncio.subprocess.PIPE)
+    line = await process.stderr.readline()
+    if not line.startswith(b"listening"):
+        raise RuntimeError(f"server did not start: {line.decode(errors='replace').strip()}")
+    return process
+
+
+async def main_async(args):
+    unix_path = args.unix
+    process = None
+    if args.spawn:
+        if unix_path is None and hasattr(asyncio, "open_unix_connection"):
+            unix_path = os.path.join(tempfile.mkdtemp(prefix="tetris-"), "server.sock")
+        address = ["--unix", unix_path] if unix_path else ["--host", args.host, "--port", str(args.port)]
+        process = await spawn_server(address)
+    try:
+        return await run_load(Connector(args.host, args.port, unix_path), args.sessions, args.idle,
+                              args.rate, args.duration, args.warmup, args.seed)
+    finally:
+        if process is not None:
+            process.terminate()
+            await process.wait()
+            if unix_path and unix_path != args.unix:
+                os.unlink(unix_path)
+                os.rmdir(os.path.dirname(unix_path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="server.py に多数のボットをつなぎ、処理能力と往復時間を測る")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", help="Unix ソケットのパス")
+    parser.add_argument("--spawn", action="store_true", help="サーバーを別プロセスで起動して計測する")
+    parser.add_argument("--sessions", type=int, default=200, help="アクションを送り続けるセッション数")
+    parser.add_argument("--idle", type=int, default=0, help="接続したまま一時停止しておくセッション数")
+    parser.add_argument("--rate", type=float, default=5.0, help="1セッションが1秒間に送るアクション数")
+    parser.add_argument("--duration", type=float, default=10.0, help="計測する秒数")
+    parser.add_argument("--warmup", type=float, default=2.0, help="接続してから計測を始めるまでの秒数")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    result = asyncio.run(main_async(args))
+    print(f"sessions         {result['sessions']} playing + {result['idle']} idle "
+          f"({result['connected']} connected)")
+    print(f"actions          {result['actions_per_s']:.0f}/s  ({result['games']} games restarted)")
+    print(f"rtt              p50 {result['rtt_p50']:.2f} ms  p95 {result['rtt_p95']:.2f} ms  "
+          f"p99 {result['rtt_p99']:.2f} ms  ({result['samples']} samples)")
+    print(f"server cpu       {result['server_cpu']:.1%}")
+    if result["sessions_per_core"] is not None:
+        print(f"sessions/core    {result['sessions_per_core']:.0f} (at {args.rate:g} actions/s each)")
+
+
+if __name__ == "__main__":
+    main()
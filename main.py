@@ -1,350 +1,305 @@
+import time
+
+# 起動時間の計測の起点（pygame の import より前に記録する）
+START_TIME = time.perf_counter()
+
 import pygame
-import random
+import argparse
+import math
 import sys
 import os
-import json
 from datetime import datetime
 
+from ai import PlacementSearch
+from controls import (Controls, KEY_LEFT, KEY_RIGHT, KEY_DOWN, KEY_ROTATE, KEY_HARD_DROP,
+                      DEFAULT_DAS, DEFAULT_ARR)
+from profiler import FrameProfiler
+from engine import TetrisEngine, TICK_MS, ACTION_HARD_DROP, FIELD_WIDTH, FIELD_HEIGHT
+from rankings import RankingStore, RankingWriter, RankingError
+from replay import InputLog, EVENT, REPLAY_DIR, REPLAY_SUFFIX
+from state import SAVE_FILE, StateError, save_game, load_game
+from telemetry import TelemetryWriter, TELEMETRY_DIR, session_path
+from renderer import Renderer, GAME_WIDTH, INFO_WIDTH, SCREEN_WIDTH, SCREEN_HEIGHT, CURSOR_BLINK, HUD_INTERVAL
 
+IMPORTED_TIME = time.perf_counter()
 
-# 初期化
-pygame.init()
-
-# 色の定義
-BLACK = (0, 0, 0)
-WHITE = (255, 255, 255)
-GRAY = (128, 128, 128)
-COLORS = [
-    (0, 255, 255),  # I: シアン
-    (255, 255, 0),  # O: 黄色
-    (128, 0, 128),  # T: 紫
-    (0, 255, 0),    # S: 緑
-    (255, 0, 0),    # Z: 赤
-    (0, 0, 255),    # J: 青
-    (255, 165, 0),  # L: オレンジ
-]
-
-# ゲーム設定
-TILE_SIZE = 30  # ブロック1つのサイズ（ピクセル）
-FIELD_WIDTH = 10  # フィールドの幅（ブロック数）
-FIELD_HEIGHT = 20  # フィールドの高さ（ブロック数）
-GAME_WIDTH = FIELD_WIDTH * TILE_SIZE  # ゲーム画面の幅（ピクセル）
-GAME_HEIGHT = FIELD_HEIGHT * TILE_SIZE  # ゲーム画面の高さ（ピクセル）
-INFO_WIDTH = 200  # 情報表示部分の幅（ピクセル）
-SCREEN_WIDTH = GAME_WIDTH + INFO_WIDTH
-SCREEN_HEIGHT = GAME_HEIGHT
-
-# ゲーム画面の設定
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Tetris")
-
-# テトリミノの形状定義
-TETROMINOS = [
-    # I
-    [
-        [[0, 0, 0, 0],
-         [1, 1, 1, 1],
-         [0, 0, 0, 0],
-         [0, 0, 0, 0]],
-        
-        [[0, 1, 0, 0],
-         [0, 1, 0, 0],
-         [0, 1, 0, 0],
-         [0, 1, 0, 0]]
-    ],
-    # O
-    [
-        [[1, 1],
-         [1, 1]]
-    ],
-    # T
-    [
-        [[0, 1, 0],
-         [1, 1, 1],
-         [0, 0, 0]],
-        
-        [[0, 1, 0],
-         [0, 1, 1],
-         [0, 1, 0]],
-        
-        [[0, 0, 0],
-         [1, 1, 1],
-         [0, 1, 0]],
-        
-        [[0, 1, 0],
-         [1, 1, 0],
-         [0, 1, 0]]
-    ],
-    # S
-    [
-        [[0, 1, 1],
-         [1, 1, 0],
-         [0, 0, 0]],
-        
-        [[0, 1, 0],
-         [0, 1, 1],
-         [0, 0, 1]]
-    ],
-    # Z
-    [
-        [[1, 1, 0],
-         [0, 1, 1],
-         [0, 0, 0]],
-        
-        [[0, 0, 1],
-         [0, 1, 1],
-         [0, 1, 0]]
-    ],
-    # J
-    [
-        [[1, 0, 0],
-         [1, 1, 1],
-         [0, 0, 0]],
-        
-        [[0, 1, 1],
-         [0, 1, 0],
-         [0, 1, 0]],
-        
-        [[0, 0, 0],
-         [1, 1, 1],
-         [0, 0, 1]],
-        
-        [[0, 1, 0],
-         [0, 1, 0],
-         [1, 1, 0]]
-    ],
-    # L
-    [
-        [[0, 0, 1],
-         [1, 1, 1],
-         [0, 0, 0]],
-        
-        [[0, 1, 0],
-         [0, 1, 0],
-         [0, 1, 1]],
-        
-        [[0, 0, 0],
-         [1, 1, 1],
-         [1, 0, 0]],
-        
-        [[1, 1, 0],
-         [0, 1, 0],
-         [0, 1, 0]]
-    ]
-]
-
-class Tetris:
-    def __init__(self):
-        self.field = [[0 for _ in range(FIELD_WIDTH)] for _ in range(FIELD_HEIGHT)]
-        self.score = 0
-        self.level = 1
-        self.lines_cleared = 0
-        self.game_over = False
+
+# ランキング画面に表示する件数
+RANKING_SIZE = 10
+
+# ターボモードで1フレームの間にティックを回す時間（秒）
+TURBO_BUDGET = 0.012
+
+# 1フレームの長さ（ミリ秒）
+FRAME_MS = 1000 / 60
+
+# 操作キーの割り当て
+KEY_BINDINGS = {
+    pygame.K_LEFT: KEY_LEFT,
+    pygame.K_RIGHT: KEY_RIGHT,
+    pygame.K_DOWN: KEY_DOWN,
+    pygame.K_UP: KEY_ROTATE,
+    pygame.K_SPACE: KEY_HARD_DROP,
+}
+
+# ゲーム画面（main() で初期化する。import しただけではウィンドウを開かない）
+screen = None
+
+
+def init_display():
+    # 使うのは画面とフォントだけなので、音声やジョイスティックは初期化しない
+    global screen
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("Tetris")
+    return screen
+
+
+# ルールは TetrisEngine に任せ、ここでは入力・描画・ランキングだけを扱う
+class Tetris(TetrisEngine):
+    def __init__(self, surface=None, seed=None, record_dir=REPLAY_DIR, rankings_store=None, save_path=None,
+                 width=FIELD_WIDTH, height=FIELD_HEIGHT, telemetry_dir=None):
+        # 描画先（省略時はウィンドウ）。変わったところだけを描き直す
+        self.renderer = Renderer(surface or screen)
+        # 省略時はカレントディレクトリのスコアログを使う
+        # 起動を速くするため、ランキング画面を初めて開くかスコアを登録するときに読み込む
+        self.rankings_store = rankings_store or RankingStore()
+        self.rankings_writer = None
+        self.top_rankings = []
+
+        # キー入力（DAS/ARR の設定を含む）
+        self.controls = Controls()
+
+        # オートプレイ（AI によるデモプレイ）
+        self.autoplay = False
+        self.search = PlacementSearch()
+        self.autoplay_interval = 3  # AI が1アクションごとに待つティック数
+        self.turbo = False
+
+        # プロファイラ（F3 で HUD を表示。計測していないときは何もしない）
+        self.profiler = FrameProfiler()
+
+        # 入力ログの保存先（None なら保存しない）
+        self.record_dir = record_dir
+        # 一時停止したまま終了したゲームの保存先（None なら保存しない）
+        self.save_path = save_path
+
+        # テトリミノごとの記録（telemetry_dir が None なら記録しない）
+        telemetry = TelemetryWriter(session_path(telemetry_dir)) if telemetry_dir is not None else None
+
+        # 盤面の大きさはゲームごとに選べる（画面に収まらない分は描画側でスクロールする）
+        super().__init__(clock=pygame.time.get_ticks, width=width, height=height, seed=seed, telemetry=telemetry)
+
+        # 処理落ちしたあとに一度に進めるティック数の上限
+        self.timestep.max_ticks = 10
+
+    def reset(self, seed=None):
+        # ランキングを保持しつつゲームをリセットする
+        super().reset(seed)
+        self.renderer.invalidate()
+        self.renderer.reset_view(self)
         self.paused = False
         self.show_ranking = False
-        self.font = pygame.font.SysFont('Arial', 24)
         self.player_name = ""
         self.name_input_active = False
-        self.rankings = self.load_rankings()
-        
-        # 新しいテトリミノを生成
-        self.new_tetromino()
-        
-        # キー設定
-        self.key_repeat_delay = 70  # キーリピートの遅延（ミリ秒）
-        self.down_key_delay = 50  # 下キーリピートの遅延（ミリ秒）
-        self.key_left_pressed = 0
-        self.key_right_pressed = 0
-        self.key_down_pressed = 0
-        
-        # ゲームタイミング
-        self.last_fall_time = pygame.time.get_ticks()
-        self.fall_speed = 500  # 落下速度（ミリ秒）
-        
-        # プレビュー用の次のテトリミノ
-        self.next_tetromino_type = random.randint(0, 6)
-        self.next_tetromino_rotation = 0
-    
-    def new_tetromino(self):
-        # 次のテトリミノを現在のテトリミノにセット
-        if hasattr(self, 'next_tetromino_type'):
-            self.tetromino_type = self.next_tetromino_type
-            self.tetromino_rotation = self.next_tetromino_rotation
-        else:
-            # 初回のみランダム生成
-            self.tetromino_type = random.randint(0, 6)
-            self.tetromino_rotation = 0
-        
-        # 次のテトリミノを新しく生成
-        self.next_tetromino_type = random.randint(0, 6)
-        self.next_tetromino_rotation = 0
-        
-        # テトリミノの初期位置
-        self.tetromino_x = FIELD_WIDTH // 2 - len(TETROMINOS[self.tetromino_type][self.tetromino_rotation][0]) // 2
-        self.tetromino_y = 0
-        
-        # 生成時に衝突する場合はゲームオーバー
-        if self.check_collision():
-            self.game_over = True
-    
-    def rotate_tetromino(self):
-        # 現在のローテーション状態を保存
-        old_rotation = self.tetromino_rotation
-        
-        # ローテーションを次に進める
-        self.tetromino_rotation = (self.tetromino_rotation + 1) % len(TETROMINOS[self.tetromino_type])
-        
-        # 衝突チェック
-        if self.check_collision():
-            # 衝突する場合は元に戻す
-            self.tetromino_rotation = old_rotation
-    
-    def check_collision(self):
-        # 現在のテトリミノの形状を取得
-        tetromino = TETROMINOS[self.tetromino_type][self.tetromino_rotation]
-        
-        for y in range(len(tetromino)):
-            for x in range(len(tetromino[y])):
-                if tetromino[y][x] == 0:
-                    # 空白マスは衝突チェック不要
-                    continue
-                
-                # フィールド上の座標
-                field_x = self.tetromino_x + x
-                field_y = self.tetromino_y + y
-                
-                # フィールド外への衝突チェック
-                if field_x < 0 or field_x >= FIELD_WIDTH or field_y >= FIELD_HEIGHT:
-                    return True
-                
-                # 他のブロックとの衝突チェック (床より上の場合のみ)
-                if field_y >= 0 and self.field[field_y][field_x] != 0:
-                    return True
-        
-        return False
-    
-    def lock_tetromino(self):
-        # 現在のテトリミノをフィールドに固定
-        tetromino = TETROMINOS[self.tetromino_type][self.tetromino_rotation]
-        
-        for y in range(len(tetromino)):
-            for x in range(len(tetromino[y])):
-                if tetromino[y][x] == 0:
-                    continue
-                
-                field_y = self.tetromino_y + y
-                field_x = self.tetromino_x + x
-                
-                # フィールド内に収まる場合のみ設定
-                if 0 <= field_y < FIELD_HEIGHT and 0 <= field_x < FIELD_WIDTH:
-                    self.field[field_y][field_x] = self.tetromino_type + 1
-    
-    def clear_lines(self):
-        # 消去する行をカウント
-        lines_to_clear = 0
-        
-        for y in range(FIELD_HEIGHT):
-            # 行が全て埋まっているかチェック
-            if all(self.field[y]):
-                lines_to_clear += 1
-                
-                # 上の行を下に移動
-                for y2 in range(y, 0, -1):
-                    self.field[y2] = self.field[y2 - 1][:]
-                
-                # 最上段を空にする
-                self.field[0] = [0 for _ in range(FIELD_WIDTH)]
-        
-        # スコア計算
-        if lines_to_clear > 0:
-            self.lines_cleared += lines_to_clear
-            self.score += [0, 100, 300, 500, 800][lines_to_clear] * self.level
-            
-            # レベルアップ判定
-            self.level = min(10, 1 + self.lines_cleared // 10)
-            
-            # 速度調整（レベルが上がると速くなる）
-            self.fall_speed = max(100, 500 - (self.level - 1) * 40)
-    
-    def move(self, dx, dy):
-        # 移動前の位置を保存
-        old_x = self.tetromino_x
-        old_y = self.tetromino_y
-        
-        # 移動
-        self.tetromino_x += dx
-        self.tetromino_y += dy
-        
-        # 衝突チェック
-        if self.check_collision():
-            # 衝突した場合は元の位置に戻す
-            self.tetromino_x = old_x
-            self.tetromino_y = old_y
-            
-            # 下方向への移動で衝突した場合は固定処理
-            if dy > 0:
-                self.lock_tetromino()
-                self.clear_lines()
-                self.new_tetromino()
-                
+        self.controls.clear()
+        self.autoplay_plan = None
+        self.autoplay_piece = -1
+        self.autoplay_tick = 0
+        # このゲームの入力ログ（シードと入力だけで同じゲームを再現できる）
+        self.recording = InputLog(self.seed, self.width, self.height)
+        self.recording_saved = False
+        self.recording_path = None  # 保存した入力ログのパス（ランキングの記録に残す）
+
+    def restore(self, state):
+        super().restore(state)
+        self.renderer.invalidate()
+        self.renderer.reset_view(self)
+        self.controls.clear()
+        self.autoplay_plan = None
+        self.autoplay_piece = -1
+
+    def input_action(self, action):
+        # プレイヤーや AI の操作は必ずここを通して入力ログに残す（ゲームオーバーのあとの操作は残さない）
+        if self.game_over:
+            return
+        self.recording.record(self.ticks, action)
+        self.apply_action(action)
+
+    def save_recording(self):
+        # 入力ログを結果付きでファイルに保存する（1ゲームにつき1回）
+        if self.recording_saved or self.record_dir is None or not self.recording.count:
+            return None
+        self.recording_saved = True
+        self.recording.finish(self)
+
+        os.makedirs(self.record_dir, exist_ok=True)
+        name = f"replay_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{self.seed:016x}{REPLAY_SUFFIX}"
+        path = os.path.join(self.record_dir, name)
+        self.recording.save(path)
+        self.recording_path = path
+        return path
+
+    def flush_telemetry(self):
+        # ゲームが終わったら、ためておいたテトリミノごとの記録をファイルに追記する
+        if self.telemetry is None or not self.telemetry.buffer:
+            return
+        try:
+            self.telemetry.flush()
+        except OSError as e:
+            print(f"テレメトリを書き出せませんでした（このセッションの記録は保存されません）: {e}", file=sys.stderr)
+            self.telemetry = None
+
+    def save_paused_game(self):
+        # 一時停止中のゲームを入力ログごと保存し、次の起動で続きから遊べるようにする
+        if self.save_path is None or not self.paused or self.game_over:
+            return False
+        try:
+            save_game(self.save_path, self.snapshot(), self.recording)
+        except OSError as e:
+            print(f"ゲームを保存できませんでした: {e}", file=sys.stderr)
             return False
-        
         return True
-    
-    def hard_drop(self):
-        # テトリミノを一気に落下させる
-        while self.move(0, 1):
+
+    def resume_saved_game(self):
+        # 保存したゲームがあれば一時停止した状態で再開し、保存ファイルを消す
+        if self.save_path is None or not os.path.exists(self.save_path):
+            return False
+        try:
+            state, count, last_tick, log_data = load_game(self.save_path)
+            if len(log_data) != count * EVENT.size:
+                raise StateError("saved input log does not match its count")
+            self.reset(state.seed)
+            self.restore(state)
+        except (OSError, StateError, ValueError) as e:
+            print(f"保存したゲームを読み込めませんでした: {e}", file=sys.stderr)
+            self.reset()
+            return False
+
+        # 入力ログはシードから続けて記録するので、保存前の入力も含めてリプレイできる
+        self.recording.data = bytearray(log_data)
+        self.recording.count = count
+        self.recording.last_tick = last_tick
+        self.paused = True
+        try:
+            os.remove(self.save_path)
+        except OSError:
             pass
-    
+        return True
+
+    def close(self):
+        # 終了時の後始末（一時停止中のゲームか入力ログの保存と、テレメトリや書きかけのランキングの書き出し）
+        if not self.save_paused_game():
+            self.save_recording()
+        if self.telemetry is not None:
+            try:
+                self.telemetry.close()
+            except OSError as e:
+                print(f"テレメトリを書き出せませんでした: {e}", file=sys.stderr)
+        self.profiler.close()
+        if self.rankings_writer is None:
+            return
+        try:
+            self.rankings_writer.close()
+        except OSError as e:
+            print(f"ランキングの索引を書き出せませんでした: {e}", file=sys.stderr)
+
     def update(self):
-        if self.game_over or self.paused:
+        # 一時停止中やメニュー表示中は論理時間を止める
+        if self.game_over or self.paused or self.name_input_active or self.show_ranking:
+            self.timestep.reset()
+            if self.game_over:
+                self.save_recording()
+                self.flush_telemetry()
             return
         
-        # キーリピート処理
-        current_time = pygame.time.get_ticks()
-        
-        # 左移動
-        if self.key_left_pressed and current_time - self.key_left_pressed > self.key_repeat_delay:
-            self.move(-1, 0)
-            self.key_left_pressed = current_time
+        # ターボモード：描画の合間に CPU が許す限りティックを進める
+        # （論理時間が時計と対応しないので、たまった入力は今のティックで適用する）
+        if self.turbo:
+            self.controls.apply(self, self.clock())
+            deadline = time.perf_counter() + TURBO_BUDGET
+            while not self.game_over and time.perf_counter() < deadline:
+                self.tick()
+            self.timestep.reset()
+            return
         
-        # 右移動
-        if self.key_right_pressed and current_time - self.key_right_pressed > self.key_repeat_delay:
-            self.move(1, 0)
-            self.key_right_pressed = current_time
+        # 通常：時計に合わせて一定間隔でティックを進める
+        # 入力は受け取った時刻の順に、その時刻が属するティックの前に適用する
+        timestep = self.timestep
+        ticks = timestep.advance()
+        tick_time = timestep.last_time - timestep.accumulator - ticks * TICK_MS
+        for _ in range(ticks):
+            tick_end = tick_time + TICK_MS
+            self.controls.apply(self, tick_time, tick_end)
+            self.tick()
+            if self.game_over:
+                return
+            tick_time = tick_end
+        # 最後のティックより後に来た入力は、次のティックを待たずにすぐ適用する
+        self.controls.apply(self, tick_time)
+    
+    def idle_timeout(self):
+        # 一時停止中やメニューなど動くものがない画面では、次に描き直しが必要になるまでの
+        # 待ち時間（ミリ秒。0 は入力があるまで）を返す。プレイ中は None
+        if not (self.game_over or self.paused or self.name_input_active or self.show_ranking):
+            return None
+        if self.profiler.visible:
+            return HUD_INTERVAL
+        if self.name_input_active:
+            # 次にカーソルの表示が切り替わるまで
+            return CURSOR_BLINK - pygame.time.get_ticks() % CURSOR_BLINK
+        return 0
+    
+    def tick(self):
+        # キーリピートもティックの論理時刻で処理するので、フレームレートに左右されない
+        self.controls.repeat(self, (self.ticks + 1) * TICK_MS)
+        if self.game_over:
+            # キーリピートのソフトドロップでゲームが終わった
+            return
         
-        # 下移動
-        if self.key_down_pressed and current_time - self.key_down_pressed > self.down_key_delay:
-            self.move(0, 1)
-            self.key_down_pressed = current_time
+        # オートプレイ
+        if self.autoplay:
+            self.update_autoplay()
         
         # 自然落下
-        if current_time - self.last_fall_time > self.fall_speed:
-            self.move(0, 1)
-            self.last_fall_time = current_time
+        super().tick()
     
-    def reset(self):
-        # ランキングを保持しつつゲームをリセットする
-        rankings = self.rankings
-        self.__init__()
-        self.rankings = rankings
+    def update_autoplay(self):
+        # テトリミノごとに1回だけ探索し、計画したアクションを少しずつ実行する
+        if self.game_over:
+            return
+        if self.autoplay_piece != self.pieces_placed:
+            self.autoplay_piece = self.pieces_placed
+            self.autoplay_plan = self.search(self)
         
-    def load_rankings(self):
-        # ランキングをファイルから読み込む
-        rankings_file = "tetris_rankings.json"
-        if os.path.exists(rankings_file):
-            try:
-                with open(rankings_file, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except:
-                return []
-        return []
+        if self.ticks - self.autoplay_tick < self.autoplay_interval:
+            return
+        self.autoplay_tick = self.ticks
+        
+        if self.autoplay_plan:
+            self.input_action(self.autoplay_plan.pop(0))
+        else:
+            self.input_action(ACTION_HARD_DROP)
     
-    def save_rankings(self):
-        # ランキングをファイルに保存
-        rankings_file = "tetris_rankings.json"
-        with open(rankings_file, "w", encoding="utf-8") as f:
-            json.dump(self.rankings, f, ensure_ascii=False)
+    @property
+    def rankings(self):
+        # 表示する上位の記録（初めて参照したときに読み込む）
+        if self.rankings_writer is None:
+            self.load_rankings()
+        return self.top_rankings
+    
+    def load_rankings(self):
+        # 索引と最近の追記分だけを読み、書き込みスレッドを用意する
+        try:
+            self.rankings_store.load()
+        except (OSError, RankingError) as e:
+            # 壊れたログは黙って捨てずに報告し、このセッションの記録はメモリ上だけで持つ
+            print(f"ランキングを読み込めませんでした（このセッションの記録は保存されません）: {e}", file=sys.stderr)
+            self.rankings_store = RankingStore(log_path=None, index_path=None)
+        # ファイルへの書き込みは別スレッドで行う（表示はメモリ上のランキングからすぐ更新する）
+        self.rankings_writer = RankingWriter(self.rankings_store)
+        self.top_rankings = self.rankings_store.top(RANKING_SIZE)
     
     def add_to_rankings(self, name):
         # スコアをランキングに追加
@@ -356,332 +311,97 @@ class Tetris:
             "level": self.level,
             "date": today
         }
+        # 入力ログを保存していれば、あとで export.py から書き出せるように場所を残す
+        if self.recording_path is not None:
+            new_record["replay"] = self.recording_path
         
-        # ランキングに追加して降順でソート
-        self.rankings.append(new_record)
-        self.rankings = sorted(self.rankings, key=lambda x: x["score"], reverse=True)
-        
-        # 最大10件まで保存
-        if len(self.rankings) > 10:
-            self.rankings = self.rankings[:10]
-        
-        # ランキングを保存
-        self.save_rankings()
+        # 表示する上位の記録はすぐ更新し、スコアログへの追記は書き込みスレッドに任せる
+        if self.rankings_writer is None:
+            self.load_rankings()
+        self.rankings_writer.add(new_record)
+        self.top_rankings = self.rankings_writer.top(RANKING_SIZE)
         
         # ランキング表示に切り替え
         self.show_ranking = True
     
     def draw(self):
-        # 背景を黒で塗りつぶす
-        screen.fill(BLACK)
-        
-        # ランキング表示画面
-        if self.show_ranking:
-            self.draw_rankings()
-            return
-            
-        # 名前入力画面
-        if self.name_input_active:
-            self.draw_name_input()
-            return
-        
-        # フィールドの枠線
-        pygame.draw.rect(screen, WHITE, (0, 0, GAME_WIDTH, GAME_HEIGHT), 1)
-        
-        # フィールド内のブロックを描画
-        for y in range(FIELD_HEIGHT):
-            for x in range(FIELD_WIDTH):
-                if self.field[y][x] != 0:
-                    # ブロックの色を取得
-                    color_index = self.field[y][x] - 1
-                    color = COLORS[color_index]
-                    
-                    # ブロックを描画
-                    pygame.draw.rect(
-                        screen, 
-                        color, 
-                        (x * TILE_SIZE, y * TILE_SIZE, TILE_SIZE, TILE_SIZE)
-                    )
-                    pygame.draw.rect(
-                        screen, 
-                        WHITE, 
-                        (x * TILE_SIZE, y * TILE_SIZE, TILE_SIZE, TILE_SIZE), 
-                        1
-                    )
-        
-        # 現在落下中のテトリミノを描画
-        if not self.game_over:
-            tetromino = TETROMINOS[self.tetromino_type][self.tetromino_rotation]
-            for y in range(len(tetromino)):
-                for x in range(len(tetromino[y])):
-                    if tetromino[y][x] != 0:
-                        # 画面内のブロックのみ描画
-                        field_x = self.tetromino_x + x
-                        field_y = self.tetromino_y + y
-                        
-                        if field_y >= 0:  # 画面上部の見えない部分は描画しない
-                            pygame.draw.rect(
-                                screen, 
-                                COLORS[self.tetromino_type], 
-                                (field_x * TILE_SIZE, field_y * TILE_SIZE, TILE_SIZE, TILE_SIZE)
-                            )
-                            pygame.draw.rect(
-                                screen, 
-                                WHITE, 
-                                (field_x * TILE_SIZE, field_y * TILE_SIZE, TILE_SIZE, TILE_SIZE), 
-                                1
-                            )
-        
-        # 情報表示エリア
-        info_area = pygame.Rect(GAME_WIDTH, 0, INFO_WIDTH, GAME_HEIGHT)
-        pygame.draw.rect(screen, BLACK, info_area)
-        pygame.draw.rect(screen, WHITE, info_area, 1)
-        
-        # スコア表示
-        score_text = self.font.render(f"Score: {self.score}", True, WHITE)
-        screen.blit(score_text, (GAME_WIDTH + 10, 10))
-        
-        # レベル表示
-        level_text = self.font.render(f"Level: {self.level}", True, WHITE)
-        screen.blit(level_text, (GAME_WIDTH + 10, 50))
-        
-        # 消去ライン数表示
-        lines_text = self.font.render(f"Lines: {self.lines_cleared}", True, WHITE)
-        screen.blit(lines_text, (GAME_WIDTH + 10, 90))
-        
-        # 次のテトリミノのプレビュー
-        next_text = self.font.render("Next:", True, WHITE)
-        screen.blit(next_text, (GAME_WIDTH + 10, 150))
-        
-        # 次のテトリミノを描画
-        next_tetromino = TETROMINOS[self.next_tetromino_type][self.next_tetromino_rotation]
-        
-        # プレビューの位置調整（中央に表示）
-        preview_size = TILE_SIZE * 0.8  # 少し小さめに表示
-        preview_width = len(next_tetromino[0]) * preview_size
-        preview_height = len(next_tetromino) * preview_size
-        preview_x = GAME_WIDTH + (INFO_WIDTH - preview_width) // 2
-        preview_y = 190
-        
-        for y in range(len(next_tetromino)):
-            for x in range(len(next_tetromino[y])):
-                if next_tetromino[y][x] != 0:
-                    pygame.draw.rect(
-                        screen, 
-                        COLORS[self.next_tetromino_type], 
-                        (preview_x + x * preview_size, preview_y + y * preview_size, 
-                         preview_size, preview_size)
-                    )
-                    pygame.draw.rect(
-                        screen, 
-                        WHITE, 
-                        (preview_x + x * preview_size, preview_y + y * preview_size, 
-                         preview_size, preview_size), 
-                        1
-                    )
-        
-        # ランキングボタン
-        rank_button = pygame.Rect(GAME_WIDTH + 20, SCREEN_HEIGHT - 80, INFO_WIDTH - 40, 30)
-        pygame.draw.rect(screen, GRAY, rank_button)
-        pygame.draw.rect(screen, WHITE, rank_button, 1)
-        rank_text = self.font.render("Ranking", True, WHITE)
-        rank_text_x = GAME_WIDTH + 20 + (INFO_WIDTH - 40 - rank_text.get_width()) // 2
-        rank_text_y = SCREEN_HEIGHT - 80 + (30 - rank_text.get_height()) // 2
-        screen.blit(rank_text, (rank_text_x, rank_text_y))
-        
-        # ゲームオーバー表示
-        if self.game_over:
-            # 半透明の黒いオーバーレイ
-            overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-            overlay.set_alpha(180)
-            overlay.fill(BLACK)
-            screen.blit(overlay, (0, 0))
-            
-            # ゲームオーバーテキスト
-            game_over_font = pygame.font.SysFont('Arial', 48)
-            game_over_text = game_over_font.render("GAME OVER", True, WHITE)
-            
-            # 画面中央に表示
-            text_x = (SCREEN_WIDTH - game_over_text.get_width()) // 2
-            text_y = (SCREEN_HEIGHT - game_over_text.get_height()) // 2 - 50
-            screen.blit(game_over_text, (text_x, text_y))
-            
-            # スコア表示
-            final_score_font = pygame.font.SysFont('Arial', 36)
-            final_score_text = final_score_font.render(f"Score: {self.score}", True, WHITE)
-            score_x = (SCREEN_WIDTH - final_score_text.get_width()) // 2
-            score_y = text_y + game_over_text.get_height() + 10
-            screen.blit(final_score_text, (score_x, score_y))
-            
-            # 名前入力案内
-            name_font = pygame.font.SysFont('Arial', 24)
-            name_text = name_font.render("Enter your name for ranking", True, WHITE)
-            name_x = (SCREEN_WIDTH - name_text.get_width()) // 2
-            name_y = score_y + final_score_text.get_height() + 20
-            screen.blit(name_text, (name_x, name_y))
-            
-            # 名前入力ボタン
-            input_button = pygame.Rect((SCREEN_WIDTH - 200) // 2, name_y + name_text.get_height() + 10, 200, 40)
-            pygame.draw.rect(screen, GRAY, input_button)
-            pygame.draw.rect(screen, WHITE, input_button, 1)
-            input_text = self.font.render("Enter Name", True, WHITE)
-            input_x = (SCREEN_WIDTH - input_text.get_width()) // 2
-            input_y = input_button.y + (input_button.height - input_text.get_height()) // 2
-            screen.blit(input_text, (input_x, input_y))
-            
-            # リトライボタン
-            retry_button = pygame.Rect((SCREEN_WIDTH - 200) // 2, input_button.y + input_button.height + 20, 200, 40)
-            pygame.draw.rect(screen, GRAY, retry_button)
-            pygame.draw.rect(screen, WHITE, retry_button, 1)
-            retry_text = self.font.render("Retry Without Saving", True, WHITE)
-            retry_x = (SCREEN_WIDTH - retry_text.get_width()) // 2
-            retry_y = retry_button.y + (retry_button.height - retry_text.get_height()) // 2
-            screen.blit(retry_text, (retry_x, retry_y))
-        
-        # 一時停止表示
-        if self.paused:
-            # 半透明の黒いオーバーレイ
-            overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-            overlay.set_alpha(180)
-            overlay.fill(BLACK)
-            screen.blit(overlay, (0, 0))
-            
-            # 一時停止テキスト
-            pause_font = pygame.font.SysFont('Arial', 48)
-            pause_text = pause_font.render("PAUSED", True, WHITE)
-            
-            # 画面中央に表示
-            text_x = (SCREEN_WIDTH - pause_text.get_width()) // 2
-            text_y = (SCREEN_HEIGHT - pause_text.get_height()) // 2
-            screen.blit(pause_text, (text_x, text_y))
-    
-    def draw_name_input(self):
-        # 名前入力画面を描画
-        screen.fill(BLACK)
-        
-        # タイトル
-        title_font = pygame.font.SysFont('Arial', 36)
-        title_text = title_font.render("Enter Your Name", True, WHITE)
-        title_x = (SCREEN_WIDTH - title_text.get_width()) // 2
-        title_y = 100
-        screen.blit(title_text, (title_x, title_y))
-        
-        # 名前入力フィールド
-        input_rect = pygame.Rect((SCREEN_WIDTH - 300) // 2, 180, 300, 40)
-        pygame.draw.rect(screen, GRAY, input_rect)
-        pygame.draw.rect(screen, WHITE, input_rect, 2)
-        
-        # 入力中の名前表示
-        name_text = self.font.render(self.player_name, True, WHITE)
-        name_x = input_rect.x + 10
-        name_y = input_rect.y + (input_rect.height - name_text.get_height()) // 2
-        screen.blit(name_text, (name_x, name_y))
-        
-        # カーソル点滅（0.5秒ごと）
-        if pygame.time.get_ticks() % 1000 < 500:
-            cursor_x = name_x + name_text.get_width() + 2
-            pygame.draw.line(screen, WHITE, (cursor_x, name_y), (cursor_x, name_y + name_text.get_height()), 2)
-        
-        # 決定ボタン
-        submit_rect = pygame.Rect((SCREEN_WIDTH - 200) // 2, 260, 200, 40)
-        pygame.draw.rect(screen, GRAY, submit_rect)
-        pygame.draw.rect(screen, WHITE, submit_rect, 1)
-        submit_text = self.font.render("Submit", True, WHITE)
-        submit_x = submit_rect.x + (submit_rect.width - submit_text.get_width()) // 2
-        submit_y = submit_rect.y + (submit_rect.height - submit_text.get_height()) // 2
-        screen.blit(submit_text, (submit_x, submit_y))
-        
-        # 説明
-        info_font = pygame.font.SysFont('Arial', 18)
-        info_text = info_font.render("Press ENTER to submit or ESC to cancel", True, WHITE)
-        info_x = (SCREEN_WIDTH - info_text.get_width()) // 2
-        info_y = 320
-        screen.blit(info_text, (info_x, info_y))
-    
-    def draw_rankings(self):
-        # ランキング画面の描画
-        screen.fill(BLACK)
-        
-        # タイトル
-        title_font = pygame.font.SysFont('Arial', 36)
-        title_text = title_font.render("Tetris Ranking", True, WHITE)
-        title_x = (SCREEN_WIDTH - title_text.get_width()) // 2
-        title_y = 30
-        screen.blit(title_text, (title_x, title_y))
-        
-        # ヘッダー
-        header_y = 90
-        header_font = pygame.font.SysFont('Arial', 20)
-        
-        rank_text = header_font.render("Rank", True, WHITE)
-        screen.blit(rank_text, (50, header_y))
-        
-        name_text = header_font.render("Name", True, WHITE)
-        screen.blit(name_text, (120, header_y))
-        
-        score_text = header_font.render("Score", True, WHITE)
-        screen.blit(score_text, (250, header_y))
-        
-        level_text = header_font.render("Level", True, WHITE)
-        screen.blit(level_text, (350, header_y))
-        
-        lines_text = header_font.render("Lines", True, WHITE)
-        screen.blit(lines_text, (420, header_y))
-        
-        date_text = header_font.render("Date", True, WHITE)
-        screen.blit(date_text, (490, header_y))
-        
-        # 区切り線
-        pygame.draw.line(screen, WHITE, (30, header_y + 30), (SCREEN_WIDTH - 30, header_y + 30), 1)
-        
-        # ランキングデータ
-        if not self.rankings:
-            no_data_text = self.font.render("No Records Yet", True, WHITE)
-            no_data_x = (SCREEN_WIDTH - no_data_text.get_width()) // 2
-            no_data_y = header_y + 70
-            screen.blit(no_data_text, (no_data_x, no_data_y))
-        else:
-            data_y = header_y + 50
-            for i, record in enumerate(self.rankings):
-                # 順位
-                rank_text = self.font.render(f"{i + 1}", True, WHITE)
-                screen.blit(rank_text, (50, data_y))
-                
-                # 名前
-                name_text = self.font.render(record["name"], True, WHITE)
-                screen.blit(name_text, (120, data_y))
-                
-                # スコア
-                score_text = self.font.render(f"{record['score']}", True, WHITE)
-                screen.blit(score_text, (250, data_y))
-                
-                # レベル
-                level_text = self.font.render(f"{record['level']}", True, WHITE)
-                screen.blit(level_text, (350, data_y))
-                
-                # ライン数
-                lines_text = self.font.render(f"{record['lines']}", True, WHITE)
-                screen.blit(lines_text, (420, data_y))
-                
-                # 日付
-                date_text = self.font.render(f"{record['date']}", True, WHITE)
-                screen.blit(date_text, (490, data_y))
-                
-                data_y += 30
-        
-        # 戻るボタン
-        back_rect = pygame.Rect((SCREEN_WIDTH - 200) // 2, SCREEN_HEIGHT - 80, 200, 40)
-        pygame.draw.rect(screen, GRAY, back_rect)
-        pygame.draw.rect(screen, WHITE, back_rect, 1)
-        back_text = self.font.render("Back to Game", True, WHITE)
-        back_x = back_rect.x + (back_rect.width - back_text.get_width()) // 2
-        back_y = back_rect.y + (back_rect.height - back_text.get_height()) // 2
-        screen.blit(back_text, (back_x, back_y))
+        # 描き直した矩形のリストを返す（何も変わっていなければ空）
+        rects = self.renderer.draw(self)
+        if self.profiler.visible:
+            rects = rects + self.renderer.update_hud(self.profiler, rects)
+        return rects
+
+    def toggle_profiler(self):
+        self.profiler.toggle(self)
+        if not self.profiler.visible:
+            # HUD を消すために全体を描き直す
+            self.renderer.invalidate()
+
+def stamp_events(events):
+    # 受け取った時刻をイベントに記録する（キー入力を正しいティックに割り当てるため）
+    now = pygame.time.get_ticks()
+    for event in events:
+        event.time = now
+    return events
+
+
+def wait_for_input(deadline):
+    # 次のフレームの時刻 deadline（get_ticks のミリ秒）まで眠って待つ
+    # キー入力が来たらその場で時刻を記録してすぐに戻り、次のフレームで処理する
+    events = []
+    while True:
+        remaining = math.ceil(deadline - pygame.time.get_ticks())
+        if remaining <= 0:
+            return events
+        event = pygame.event.wait(remaining)
+        if event.type == pygame.NOEVENT:
+            return events
+        event.time = pygame.time.get_ticks()
+        events.append(event)
+        if event.type in (pygame.KEYDOWN, pygame.KEYUP):
+            return events
+
 
 # メインゲームループ
 def main():
-    clock = pygame.time.Clock()
-    game = Tetris()
+    parser = argparse.ArgumentParser(description="テトリス")
+    parser.add_argument("--autoplay", action="store_true", help="AI のオートプレイで開始する")
+    parser.add_argument("--turbo", action="store_true", help="CPU が許す限り速く進めるターボモードで開始する")
+    parser.add_argument("--seed", type=int, help="最初のゲームのシード（同じシードなら同じ順番でテトリミノが出る）")
+    parser.add_argument("--no-record", action="store_true", help="入力ログ（リプレイ）を保存しない")
+    parser.add_argument("--width", type=int, default=FIELD_WIDTH, help=f"盤面の列数（既定 {FIELD_WIDTH}）")
+    parser.add_argument("--height", type=int, default=FIELD_HEIGHT, help=f"盤面の行数（既定 {FIELD_HEIGHT}）")
+    parser.add_argument("--no-telemetry", action="store_true",
+                        help=f"テトリミノごとの記録を {TELEMETRY_DIR}/ に保存しない")
+    parser.add_argument("--no-resume", action="store_true",
+                        help="一時停止したまま終了したゲームを再開せず、保存もしない")
+    parser.add_argument("--measure-startup", action="store_true", help="最初のフレームを表示するまでの時間を表示して終了する")
+    parser.add_argument("--profile-log", help="フレームごとの処理時間を書き出すファイル（.csv なら CSV、それ以外は JSONL）")
+    parser.add_argument("--das", type=int, default=DEFAULT_DAS, help=f"キーリピートが始まるまでのミリ秒（既定 {DEFAULT_DAS}）")
+    parser.add_argument("--arr", type=int, default=DEFAULT_ARR,
+                        help=f"キーリピートの間隔のミリ秒（既定 {DEFAULT_ARR}。0 なら壁まで一気に移動）")
+    args = parser.parse_args()
+    if args.seed is not None and not 0 <= args.seed < 2 ** 64:
+        parser.error("--seed は 0 以上 2**64 未満で指定してください")
+    if args.das < 0 or args.arr < 0:
+        parser.error("--das と --arr は 0 以上で指定してください")
+    if not (4 <= args.width <= 1000 and 4 <= args.height <= 10000):
+        parser.error("--width は 4〜1000、--height は 4〜10000 で指定してください")
+    
+    init_display()
+    game = Tetris(seed=args.seed, record_dir=None if args.no_record else REPLAY_DIR,
+                  save_path=None if args.no_resume else SAVE_FILE, width=args.width, height=args.height,
+                  telemetry_dir=None if args.no_telemetry else TELEMETRY_DIR)
+    # シードを指定したときは新しいゲームを始める（保存したゲームは残しておく）
+    if args.seed is None:
+        game.resume_saved_game()
+    game.controls.das = args.das
+    game.controls.arr = args.arr
+    game.autoplay = args.autoplay
+    game.turbo = args.turbo
+    if args.profile_log:
+        game.profiler.open_export(args.profile_log)
+        game.profiler.attach(game)
     
     # 操作説明
     print("=== テトリス操作方法 ===")
@@ -690,17 +410,44 @@ def main():
     print("下矢印キー: 下に移動（ソフトドロップ）")
     print("上矢印キー: 回転")
     print("スペース: ハードドロップ（一気に落下）")
-    print("P: 一時停止/再開")
+    print("P: 一時停止/再開（一時停止中に終了すると次の起動で続きから遊べる）")
     print("R: ランキング表示")
+    print("A: オートプレイ（AI）切り替え")
+    print("T: ターボモード切り替え")
+    print("F3: プロファイラ表示切り替え")
     print("ESC: 終了")
     
+    profiler = game.profiler
+    pending = []  # 前のフレームの終わりに待っているあいだに届いたイベント
+    frame_deadline = pygame.time.get_ticks()
     while True:
+        frame_start = time.perf_counter()
+        # 次のフレームの時刻（入力で早めに起きたフレームでは変えず、60fps の間隔を保つ）
+        now = pygame.time.get_ticks()
+        if now >= frame_deadline:
+            frame_deadline = max(frame_deadline + FRAME_MS, now)
+        
+        # 動くものがない画面では、入力か次のカーソル点滅まで眠って待つ
+        idle_timeout = game.idle_timeout()
+        if idle_timeout is None or pending:
+            events = pending + stamp_events(pygame.event.get())
+        else:
+            events = pending + stamp_events([pygame.event.wait(idle_timeout)] + pygame.event.get())
+            # 眠っていた時間はフレーム間隔に数えない
+            profiler.last_start = None
+            frame_start = time.perf_counter()
+        
         # イベント処理
-        for event in pygame.event.get():
+        for event in events:
             if event.type == pygame.QUIT:
+                game.close()
                 pygame.quit()
                 sys.exit()
             
+            # ウィンドウが隠れたあとなどは全体を描き直す
+            elif event.type == pygame.VIDEOEXPOSE:
+                game.renderer.invalidate()
+            
             # マウスクリックイベント
             elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:  # 左クリック
                 mouse_pos = pygame.mouse.get_pos()
@@ -742,6 +489,10 @@ def main():
                     if rank_button.collidepoint(mouse_pos):
                         game.show_ranking = True
             
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                # どの画面でもプロファイラの表示を切り替えられる
+                game.toggle_profiler()
+            
             elif event.type == pygame.KEYDOWN:
                 # 名前入力画面
                 if game.name_input_active:
@@ -769,6 +520,7 @@ def main():
                 # 通常画面
                 else:
                     if event.key == pygame.K_ESCAPE:
+                        game.close()
                         pygame.quit()
                         sys.exit()
                     
@@ -782,43 +534,48 @@ def main():
                     elif event.key == pygame.K_r:
                         game.show_ranking = True
                     
-                    elif not game.paused:
-                        if event.key == pygame.K_LEFT:
-                            game.move(-1, 0)
-                            game.key_left_pressed = pygame.time.get_ticks()
-                        
-                        elif event.key == pygame.K_RIGHT:
-                            game.move(1, 0)
-                            game.key_right_pressed = pygame.time.get_ticks()
-                        
-                        elif event.key == pygame.K_DOWN:
-                            game.move(0, 1)
-                            game.key_down_pressed = pygame.time.get_ticks()
-                        
-                        elif event.key == pygame.K_UP:
-                            game.rotate_tetromino()
-                        
-                        elif event.key == pygame.K_SPACE:
-                            game.hard_drop()
+                    elif event.key == pygame.K_a:
+                        game.autoplay = not game.autoplay
+                        game.autoplay_piece = -1
+                    
+                    elif event.key == pygame.K_t:
+                        game.turbo = not game.turbo
+                    
+                    elif not game.paused and event.key in KEY_BINDINGS:
+                        # 操作は受け取った時刻つきでためておき、update() で該当するティックに適用する
+                        game.controls.push(event.time, KEY_BINDINGS[event.key], True)
             
             elif event.type == pygame.KEYUP:
-                if event.key == pygame.K_LEFT:
-                    game.key_left_pressed = 0
-                elif event.key == pygame.K_RIGHT:
-                    game.key_right_pressed = 0
-                elif event.key == pygame.K_DOWN:
-                    game.key_down_pressed = 0
-        
-        # ゲーム状態の更新（名前入力中とランキング表示中は更新しない）
-        if not game.name_input_active and not game.show_ranking:
-            game.update()
+                if event.key in KEY_BINDINGS:
+                    game.controls.push(event.time, KEY_BINDINGS[event.key], False)
+        
+        event_end = time.perf_counter()
+        
+        # ゲーム状態の更新（固定ティック。描画は最新の状態を描くだけ）
+        game.update()
+        update_end = time.perf_counter()
+        
+        # 描画（変わった部分だけを画面に反映）
+        dirty_rects = game.draw()
+        draw_end = time.perf_counter()
+        if dirty_rects:
+            pygame.display.update(dirty_rects)
+        
+        if args.measure_startup:
+            now = time.perf_counter()
+            print(f"startup: {(now - START_TIME) * 1000:.1f} ms "
+                  f"(import {(IMPORTED_TIME - START_TIME) * 1000:.1f} ms, "
+                  f"init to first frame {(now - IMPORTED_TIME) * 1000:.1f} ms)")
+            game.close()
+            pygame.quit()
+            return
         
-        # 描画
-        game.draw()
-        pygame.display.flip()
+        if profiler.active:
+            profiler.end_frame(frame_start, (event_end - frame_start) * 1000, (update_end - event_end) * 1000,
+                               (draw_end - update_end) * 1000, (time.perf_counter() - draw_end) * 1000)
         
-        # フレームレート
-        clock.tick(60)
+        # フレームレート（待つあいだにキー入力が来たら、すぐに次のフレームで反映する）
+        pending = wait_for_input(frame_deadline)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
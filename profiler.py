@@ -0,0 +1,169 @@
+import csv
+import json
+import time
+from collections import deque
+
+
+# 1フレームの目標時間（60fps）
+FRAME_BUDGET_MS = 1000 / 60
+PHASES = ("event", "update", "draw", "flip")
+EXPORT_FIELDS = ("frame", "time", "frame_ms") + tuple(f"{phase}_ms" for phase in PHASES) + (
+    "dropped", "collisions", "lines")
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))]
+
+
+# フレームごとの処理時間（イベント処理・update・draw・画面反映）と
+# エンジンの衝突判定・ライン消去の回数を集計する。HUD の表示とファイルへの書き出しに使う
+class FrameProfiler:
+    def __init__(self, window=300, export_path=None):
+        self.visible = False
+        self.budget_ms = FRAME_BUDGET_MS
+        self.frames = deque(maxlen=window)  # 直近のフレーム間隔（ミリ秒）
+        self.phases = {phase: deque(maxlen=window) for phase in PHASES}
+        self.frame_count = 0
+        self.dropped = 0
+        self.last_start = None
+
+        # このフレームでの回数と、1秒ごとの回数
+        self.collisions = 0
+        self.lines = 0
+        self.window_collisions = 0
+        self.window_lines = 0
+        self.rate_start = time.perf_counter()
+        self.rates = (0.0, 0.0)
+        self.engine = None
+
+        self.export_file = None
+        self.writer = None
+        if export_path:
+            self.open_export(export_path)
+
+    @property
+    def active(self):
+        return self.visible or self.export_file is not None
+
+    # --- エンジンの計測 ---
+
+    def attach(self, engine):
+        # 計測しているあいだだけ check_collision と clear_lines を数える版に差し替える
+        # （インスタンス属性で上書きするので、計測していないときのコストはない）
+        if self.engine is engine:
+            return
+        self.detach()
+        self.engine = engine
+        check_collision = engine.check_collision
+        clear_lines = engine.clear_lines
+
+        def counting_check_collision():
+            self.collisions += 1
+            return check_collision()
+
+        def counting_clear_lines():
+            lines = clear_lines()
+            self.lines += lines
+            return lines
+
+        engine.check_collision = counting_check_collision
+        engine.clear_lines = counting_clear_lines
+
+    def detach(self):
+        if self.engine is not None:
+            del self.engine.check_collision
+            del self.engine.clear_lines
+            self.engine = None
+
+    def toggle(self, engine):
+        if not self.active:
+            # 止まっていたあいだをフレーム間隔に数えない
+            self.last_start = None
+        self.visible = not self.visible
+        if self.active:
+            self.attach(engine)
+        else:
+            self.detach()
+
+    # --- フレームの記録 ---
+
+    def end_frame(self, start, event_ms, update_ms, draw_ms, flip_ms):
+        # start はこのフレームの開始時刻（perf_counter）。フレーム間隔は前のフレームの開始から測る
+        if self.last_start is None:
+            self.last_start = start
+            return
+        frame_ms = (start - self.last_start) * 1000
+        self.last_start = start
+        self.frame_count += 1
+
+        # 60fps の間隔を何回分取りこぼしたか
+        dropped = max(0, round(frame_ms / self.budget_ms) - 1)
+        self.dropped += dropped
+
+        self.frames.append(frame_ms)
+        for phase, ms in zip(PHASES, (event_ms, update_ms, draw_ms, flip_ms)):
+            self.phases[phase].append(ms)
+
+        collisions = self.collisions
+        lines = self.lines
+        self.collisions = 0
+        self.lines = 0
+        self.window_collisions += collisions
+        self.window_lines += lines
+        now = time.perf_counter()
+        if now - self.rate_start >= 1.0:
+            elapsed = now - self.rate_start
+            self.rates = (self.window_collisions / elapsed, self.window_lines / elapsed)
+            self.window_collisions = 0
+            self.window_lines = 0
+            self.rate_start = now
+
+        if self.writer is not None:
+            self.writer((self.frame_count, round(start, 6), round(frame_ms, 3), round(event_ms, 3),
+                         round(update_ms, 3), round(draw_ms, 3), round(flip_ms, 3), dropped, collisions, lines))
+
+    def stats(self):
+        frames = sorted(self.frames)
+        return {
+            "p50": percentile(frames, 0.50),
+            "p95": percentile(frames, 0.95),
+            "p99": percentile(frames, 0.99),
+            "phases": {phase: sum(values) / len(values) if values else 0.0 for phase, values in self.phases.items()},
+            "dropped": self.dropped,
+            "collisions_per_s": self.rates[0],
+            "lines_per_s": self.rates[1],
+        }
+
+    def hud_lines(self):
+        stats = self.stats()
+        phases = stats["phases"]
+        return [
+            f"frame p50 {stats['p50']:.1f}  p95 {stats['p95']:.1f}",
+            f"p99 {stats['p99']:.1f} ms  dropped {stats['dropped']}",
+            f"event {phases['event']:.2f}  update {phases['update']:.2f}",
+            f"draw {phases['draw']:.2f}  flip {phases['flip']:.2f} ms",
+            f"collisions {stats['collisions_per_s']:.0f}/s",
+            f"lines {stats['lines_per_s']:.1f}/s",
+        ]
+
+    # --- 書き出し ---
+
+    def open_export(self, path):
+        # 拡張子が .csv なら CSV、それ以外は JSON Lines で1フレーム1行書き出す
+        self.export_file = open(path, "w", encoding="utf-8", newline="")
+        if path.endswith(".csv"):
+            writer = csv.writer(self.export_file)
+            writer.writerow(EXPORT_FIELDS)
+            self.writer = writer.writerow
+        else:
+            write = self.export_file.write
+            self.writer = lambda row: write(json.dumps(dict(zip(EXPORT_FIELDS, row))) + "\n")
+
+    def close(self):
+        self.detach()
+        if self.export_file is not None:
+            self.export_file.close()
+            self.export_file = None
+            self.writer = None
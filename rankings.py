@@ -0,0 +1,312 @@
+import heapq
+import json
+import os
+import sys
+import threading
+
+
+# スコアの記録は追記専用のログ（1行1件の JSON）にすべて残し、
+# 上位 K 件だけを索引ファイルに書き出しておく
+RANKING_LOG = "tetris_scores.log"
+RANKING_INDEX = "tetris_scores.idx"
+LEGACY_RANKINGS = "tetris_rankings.json"  # 以前の形式（上位10件だけの JSON）
+INDEX_VERSION = 1
+
+
+class RankingError(Exception):
+    pass
+
+
+def check_record(record):
+    # ランキングの記録として最低限必要な形になっているか
+    if not isinstance(record, dict) or not isinstance(record.get("score"), int):
+        raise ValueError(f"not a score record: {record!r}")
+    return record
+
+
+def warn(message):
+    print(f"rankings: {message}", file=sys.stderr)
+
+
+def write_atomic(path, data):
+    # 一時ファイルに書いて fsync してから置き換える（途中で落ちても古いファイルが残る）
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+# 全ゲームのスコアログと上位 K 件の索引
+# 上位 K 件は (スコア, -通し番号) の最小ヒープで持つので追加は O(log K)。
+# 同点なら先に登録した記録が上位になる。log_path が None ならファイルを使わずメモリ上だけで持つ
+class RankingStore:
+    def __init__(self, log_path=RANKING_LOG, index_path=RANKING_INDEX, legacy_path=LEGACY_RANKINGS,
+                 capacity=100, compact_interval=16):
+        self.log_path = log_path
+        self.index_path = index_path
+        self.legacy_path = legacy_path
+        self.capacity = capacity
+        # 索引に含まれていないログ末尾の件数がこれを超えたら索引を書き直す
+        self.compact_interval = compact_interval
+
+        self.heap = []  # (score, -seq, record)
+        self.count = 0  # ログに書かれた記録の総数（次の通し番号）
+        self.log_size = 0  # ログのバイト数
+        self.indexed_size = 0  # 索引に反映済みのログのバイト数
+        self.unindexed = 0  # 索引に反映されていない記録の数
+        self.sorted_cache = None
+
+    def clear(self):
+        self.heap = []
+        self.count = 0
+        self.log_size = 0
+        self.indexed_size = 0
+        self.unindexed = 0
+        self.sorted_cache = None
+
+    # --- 読み込み ---
+
+    def load(self):
+        # 索引（K 件）と、索引を書いたあとにログへ追記された分だけを読む
+        if self.log_path is None:
+            return self
+        if not os.path.exists(self.log_path) and self.legacy_path and os.path.exists(self.legacy_path):
+            self.migrate(self.legacy_path)
+            return self
+
+        self.clear()
+        log_size = os.path.getsize(self.log_path) if os.path.exists(self.log_path) else 0
+        rebuild = False
+        if os.path.exists(self.index_path):
+            try:
+                self.read_index(log_size)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                # 索引はログから作り直せるので、警告を出してログ全体から再構築する
+                warn(f"index {self.index_path} is unusable ({e}); rebuilding from {self.log_path}")
+                self.clear()
+                rebuild = True
+        else:
+            rebuild = log_size > 0
+
+        self.read_log(self.indexed_size)
+        if rebuild or self.unindexed >= self.compact_interval:
+            self.compact()
+        return self
+
+    def read_index(self, log_size):
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index["version"] != INDEX_VERSION:
+            raise ValueError(f"unsupported index version {index['version']}")
+        if index["log_size"] > log_size:
+            raise ValueError("the score log is shorter than the index expects")
+
+        self.indexed_size = index["log_size"]
+        self.count = index["count"]
+        for seq, record in index["top"]:
+            self.push(seq, check_record(record))
+
+    def read_log(self, offset):
+        # offset から末尾までの記録を読み込む
+        self.log_size = offset
+        if not os.path.exists(self.log_path):
+            return
+
+        with open(self.log_path, "rb") as f:
+            f.seek(offset)
+            tail = f.read()
+
+        end = tail.rfind(b"\n") + 1
+        if end < len(tail):
+            # 追記の途中で落ちた最後の1行は記録として扱えないので切り捨てる
+            warn(f"discarding an incomplete last line in {self.log_path} ({len(tail) - end} bytes)")
+            with open(self.log_path, "r+b") as f:
+                f.truncate(offset + end)
+
+        line_start = offset
+        for line in tail[:end].splitlines(keepends=True):
+            try:
+                record = check_record(json.loads(line))
+            except ValueError as e:
+                raise RankingError(f"{self.log_path}: corrupt record at byte {line_start}: {e}") from e
+            self.push(self.count, record)
+            self.count += 1
+            self.unindexed += 1
+            line_start += len(line)
+        self.log_size = offset + end
+
+    def migrate(self, legacy_path):
+        # 以前の tetris_rankings.json の記録をログに移し、元のファイルは .migrated として残す
+        # ログは一度に書き出すので、途中で落ちても移行前の状態か移行後の状態のどちらかになる
+        try:
+            with open(legacy_path, "r", encoding="utf-8") as f:
+                records = json.load(f)
+            lines = [json.dumps(check_record(record), ensure_ascii=False).encode("utf-8") + b"\n" for record in records]
+        except (OSError, ValueError, TypeError) as e:
+            raise RankingError(f"{legacy_path}: cannot read old rankings: {e}") from e
+
+        self.clear()
+        write_atomic(self.log_path, b"".join(lines))
+        for record in records:
+            self.push(self.count, record)
+            self.count += 1
+        self.log_size = sum(len(line) for line in lines)
+        self.compact()
+        os.replace(legacy_path, f"{legacy_path}.migrated")
+
+    # --- 更新 ---
+
+    def push(self, seq, record):
+        entry = (record["score"], -seq, record)
+        if len(self.heap) < self.capacity:
+            heapq.heappush(self.heap, entry)
+        elif entry[:2] > self.heap[0][:2]:
+            heapq.heapreplace(self.heap, entry)
+        else:
+            return
+        self.sorted_cache = None
+
+    def add(self, record):
+        # ログに追記して fsync してから上位 K 件に反映する
+        self.append([check_record(record)])
+        self.insert(record)
+        if self.unindexed >= self.compact_interval:
+            self.compact()
+
+    def insert(self, record):
+        # メモリ上の上位 K 件にだけ反映する（ログへの追記は append() で同じ順番に行う）
+        self.push(self.count, record)
+        self.count += 1
+
+    def append(self, records):
+        # 複数の記録を1回の書き込みと fsync でログに追記する
+        if self.log_path is None:
+            return
+        data = b"".join(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n" for record in records)
+        with open(self.log_path, "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        self.log_size += len(data)
+        self.unindexed += len(records)
+
+    def index_data(self):
+        # 現在の上位 K 件とログの位置（ログに書き終えた記録だけが入っているときに呼ぶ）
+        index = {
+            "version": INDEX_VERSION,
+            "log_size": self.log_size,
+            "count": self.count,
+            "top": [[-neg_seq, record] for _, neg_seq, record in self.ranked()],
+        }
+        return json.dumps(index, ensure_ascii=False).encode("utf-8"), self.log_size
+
+    def write_index(self, data, log_size):
+        write_atomic(self.index_path, data)
+        self.indexed_size = log_size
+        self.unindexed = 0
+
+    def compact(self):
+        # 索引ファイルを原子的に書き直す
+        self.write_index(*self.index_data())
+
+    def close(self):
+        if self.unindexed:
+            self.compact()
+
+    # --- 問い合わせ ---
+
+    def ranked(self):
+        if self.sorted_cache is None:
+            self.sorted_cache = sorted(self.heap, reverse=True, key=lambda entry: entry[:2])
+        return self.sorted_cache
+
+    def top(self, n=10):
+        # 上位 n 件の記録（n は capacity 以下）
+        return [record for _, _, record in self.ranked()[:n]]
+
+
+# ランキングの書き込みを別スレッドで行い、ゲームループをディスクの遅さで止めない
+# 記録はメモリ上のランキングにすぐ反映し、ファイルへの追記はまとめて後から行う
+class RankingWriter:
+    def __init__(self, store, delay=0.05):
+        self.store = store
+        self.delay = delay  # 続けて届いた記録を1回の書き込みにまとめるための待ち時間（秒）
+        self.pending = []
+        self.writing = False
+        self.failed = False  # 直前の書き込みに失敗した（次の記録か close() で再試行する）
+        self.closed = False
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.run, name="ranking-writer", daemon=True)
+        self.thread.start()
+
+    def add(self, record):
+        check_record(record)
+        with self.condition:
+            self.store.insert(record)
+            self.pending.append(record)
+            self.failed = False
+            self.condition.notify_all()
+
+    def top(self, n=10):
+        with self.condition:
+            return self.store.top(n)
+
+    def run(self):
+        while True:
+            with self.condition:
+                while (not self.pending or self.failed) and not self.closed:
+                    self.condition.wait()
+                if self.closed and (not self.pending or self.failed):
+                    return
+                if not self.closed:
+                    self.condition.wait(self.delay)
+                records = self.pending
+                self.pending = []
+                self.writing = True
+
+            try:
+                self.store.append(records)
+                error = None
+            except OSError as e:
+                error = e
+
+            with self.condition:
+                index = None
+                if error is not None:
+                    warn(f"cannot write {len(records)} record(s) to {self.store.log_path}: {error}")
+                    self.pending[:0] = records
+                    self.failed = True
+                elif not self.pending and self.store.unindexed >= self.store.compact_interval:
+                    index = self.store.index_data()
+
+            if index is not None:
+                try:
+                    self.store.write_index(*index)
+                except OSError as e:
+                    warn(f"cannot write {self.store.index_path}: {e}")
+
+            with self.condition:
+                self.writing = False
+                self.condition.notify_all()
+
+    def flush(self):
+        # 待っている記録をすべて書き終えるまで待つ（書き込みに失敗していれば諦めて戻る）
+        with self.condition:
+            self.condition.notify_all()
+            while (self.pending and not self.failed) or self.writing:
+                self.condition.wait()
+
+    def close(self):
+        # 残りを書き出してスレッドを止め、索引を書き直す
+        with self.condition:
+            self.closed = True
+            self.failed = False  # 最後にもう1回だけ書き込みを試す
+            self.condition.notify_all()
+        self.thread.join()
+
+        if self.pending:
+            warn(f"{len(self.pending)} record(s) could not be saved")
+        elif self.store.unindexed:
+            self.store.compact()
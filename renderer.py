@@ -0,0 +1,658 @@
+import os
+from collections import OrderedDict
+
+import pygame
+
+from engine import TETROMINOS, PIECE_CELLS, FIELD_WIDTH, FIELD_HEIGHT
+
+
+# 色の定義
+BLACK = (0, 0, 0)
+WHITE = (255, 255, 255)
+GRAY = (128, 128, 128)
+COLORS = [
+    (0, 255, 255),  # I: シアン
+    (255, 255, 0),  # O: 黄色
+    (128, 0, 128),  # T: 紫
+    (0, 255, 0),    # S: 緑
+    (255, 0, 0),    # Z: 赤
+    (0, 0, 255),    # J: 青
+    (255, 165, 0),  # L: オレンジ
+    (128, 128, 128),  # おじゃまブロック（対戦モード）
+]
+
+# ゲーム設定
+TILE_SIZE = 30  # ブロック1つのサイズ（ピクセル）
+MIN_TILE_SIZE = 8  # 幅の広い盤面でタイルを縮めるときの下限（ピクセル）
+GAME_WIDTH = FIELD_WIDTH * TILE_SIZE  # ゲーム画面の幅（ピクセル）
+GAME_HEIGHT = FIELD_HEIGHT * TILE_SIZE  # ゲーム画面の高さ（ピクセル）
+VIEW_MARGIN = 2  # 盤面が画面に収まらないとき、落下中のテトリミノと視界の端のあいだに空けるマス数
+INFO_WIDTH = 200  # 情報表示部分の幅（ピクセル）
+SCREEN_WIDTH = GAME_WIDTH + INFO_WIDTH
+SCREEN_HEIGHT = GAME_HEIGHT
+
+# 情報表示エリアの各項目の y 座標
+SCORE_Y = 10
+LEVEL_Y = 50
+LINES_Y = 90
+NEXT_Y = 150
+PREVIEW_Y = 190  # 次のテトリミノはタイルの 0.8 倍の大きさで表示
+
+# プロファイラ HUD（情報表示エリアの空いているところに重ねる）
+HUD_RECT = (GAME_WIDTH + 1, 300, INFO_WIDTH - 2, 210)
+HUD_INTERVAL = 250  # HUD の数値を描き直す間隔（ミリ秒）
+
+CURSOR_BLINK = 500  # 名前入力のカーソルが点滅する間隔（ミリ秒）
+
+# 落下中のテトリミノとゴーストの足跡に入れる印
+PIECE = 1
+GHOST = 2
+
+
+# assets/font.ttf を置くとそのフォントを使う（なければ pygame に同梱のフォント）
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+FONT_FILE = "font.ttf"
+
+
+def scroll_to(start, size, total, low, high, margin=VIEW_MARGIN):
+    # 長さ size の視界 [start, start + size) に [low, high) が余白つきで入るように start を動かす
+    # 入っていれば動かさず、はみ出したら範囲が視界の真ん中に来るところまでまとめて動かす
+    margin = max(0, min(margin, (size - (high - low)) // 2))
+    if low - margin < start or high + margin > start + size:
+        start = (low + high - size) // 2
+    return max(0, min(start, total - size))
+
+
+def default_font_path():
+    path = os.path.join(ASSETS_DIR, FONT_FILE)
+    if os.path.exists(path):
+        return path
+    return os.path.join(os.path.dirname(pygame.__file__), pygame.font.get_default_font())
+
+
+# フォントはサイズごとに1回だけ作る
+# システムのフォント一覧を調べる SysFont は起動が遅いので、フォントファイルを直接読み込む
+class FontRegistry:
+    def __init__(self, path=None):
+        self.path = path or default_font_path()
+        self.fonts = {}
+
+    def get(self, size):
+        font = self.fonts.get(size)
+        if font is None:
+            font = pygame.font.Font(self.path, size)
+            self.fonts[size] = font
+        return font
+
+
+# 描画済みの文字列サーフェスを (フォントサイズ, 文字列, 色) で引ける LRU キャッシュ
+class TextCache:
+    def __init__(self, fonts, max_items=256):
+        self.fonts = fonts
+        self.max_items = max_items
+        self.surfaces = OrderedDict()
+
+    def render(self, text, size, color):
+        key = (size, text, color)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+
+        surface = self.fonts.get(size).render(text, True, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_items:
+            self.surfaces.popitem(last=False)
+        return surface
+
+
+# ブロック画像をタイルサイズごとに1回だけ描いておくスプライトアトラス
+# 1枚のサーフェスに [ブロック×7, ゴースト×7, 空きマス] を横に並べる
+class TileAtlas:
+    EMPTY = 2 * len(COLORS)
+
+    def __init__(self, size):
+        self.size = None
+        self.surface = None
+        self.areas = []
+        self.resize(size)
+
+    def resize(self, size):
+        # タイルサイズが変わったときだけ作り直す
+        size = int(size)
+        if size == self.size:
+            return
+        self.size = size
+
+        surface = pygame.Surface((size * (self.EMPTY + 1), size))
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert()
+        surface.fill(BLACK)
+
+        self.areas = [pygame.Rect(i * size, 0, size, size) for i in range(self.EMPTY + 1)]
+        for i, color in enumerate(COLORS):
+            # ブロック（塗りつぶし＋白い枠線）
+            pygame.draw.rect(surface, color, self.areas[i])
+            pygame.draw.rect(surface, WHITE, self.areas[i], 1)
+            # ゴーストピース（枠線だけ）
+            pygame.draw.rect(surface, color, self.areas[len(COLORS) + i], 1)
+        self.surface = surface
+
+    def block(self, color_index):
+        return self.areas[color_index]
+
+    def ghost(self, color_index):
+        return self.areas[len(COLORS) + color_index]
+
+    def empty(self):
+        return self.areas[self.EMPTY]
+
+
+# 前回描いた内容を覚えておき、変わったところだけを描き直して矩形のリストを返す
+# 画面の種類（プレイ中・一時停止・ゲームオーバー・名前入力・ランキング）が変わったときだけ全体を描く
+# 盤面が画面に収まらないときは落下中のテトリミノのまわりの視界だけを描き、
+# テトリミノが視界の端に近づいたらスクロールする（描く量は盤面ではなく画面の大きさで決まる）
+class Renderer:
+    def __init__(self, surface):
+        self.surface = surface
+        self.fonts = FontRegistry()
+        self.text_cache = TextCache(self.fonts)
+        self.overlay = None
+        self.tile_size = TILE_SIZE
+        self.tiles = TileAtlas(self.tile_size)
+        self.preview_tiles = TileAtlas(TILE_SIZE * 0.8)
+        # 視界（盤面のマス単位）。layout() で盤面の大きさに合わせる
+        self.view_x = 0
+        self.view_y = 0
+        self.view_cols = FIELD_WIDTH
+        self.view_rows = FIELD_HEIGHT
+        self.hud_time = None
+        self.invalidate()
+
+    def invalidate(self):
+        # 次の draw() で画面全体を描き直す
+        self.mode = None
+        self.field_version = None
+        self.drawn_field = None
+        self.footprint = {}
+        self.info = {}
+        self.name_state = None
+
+    def draw(self, game):
+        if game.show_ranking:
+            mode = "ranking"
+        elif game.name_input_active:
+            mode = "name"
+        elif game.game_over:
+            mode = "game_over"
+        elif game.paused:
+            mode = "paused"
+        else:
+            mode = "play"
+
+        if mode != self.mode:
+            self.mode = mode
+            self.draw_full(game)
+            return [self.surface.get_rect()]
+
+        if mode == "play":
+            return self.update_play(game)
+        if mode == "name":
+            return self.update_name_input(game)
+
+        # ランキング・一時停止・ゲームオーバーは静止画面
+        return []
+
+    def layout(self, game):
+        # 盤面の幅が画面に収まるようにタイルを縮め（MIN_TILE_SIZE まで）、収まらない分はスクロールする
+        self.tile_size = max(MIN_TILE_SIZE, min(TILE_SIZE, GAME_WIDTH // game.width))
+        self.view_cols = min(game.width, GAME_WIDTH // self.tile_size)
+        self.view_rows = min(game.height, GAME_HEIGHT // self.tile_size)
+        self.view_x = max(0, min(self.view_x, game.width - self.view_cols))
+        self.view_y = max(0, min(self.view_y, game.height - self.view_rows))
+
+    def reset_view(self, game):
+        # 視界を左上に戻してから落下中のテトリミノに合わせる（新しいゲームや restore() したとき）
+        # 前のゲームの視界を引き継がないので、同じ状態からは必ず同じ絵になる
+        self.view_x = 0
+        self.view_y = 0
+        self.layout(game)
+        self.follow(game)
+
+    def follow(self, game):
+        # 落下中のテトリミノ（視界に入るならゴーストまで）が見えるように視界を動かし、動いたら True を返す
+        if game.game_over or (self.view_cols == game.width and self.view_rows == game.height):
+            return False
+        cells = PIECE_CELLS[game.tetromino_type][game.tetromino_rotation]
+        left = game.tetromino_x + min(dx for dx, _ in cells)
+        right = game.tetromino_x + max(dx for dx, _ in cells) + 1
+        top = max(0, game.tetromino_y + min(dy for _, dy in cells))
+        bottom = max(top + 1, game.tetromino_y + max(dy for _, dy in cells) + 1)
+        ghost_bottom = game.get_ghost_y() + max(dy for _, dy in cells) + 1
+        if ghost_bottom - top <= self.view_rows:
+            bottom = ghost_bottom
+
+        view_x = scroll_to(self.view_x, self.view_cols, game.width, left, right)
+        view_y = scroll_to(self.view_y, self.view_rows, game.height, top, bottom)
+        if (view_x, view_y) == (self.view_x, self.view_y):
+            return False
+        self.view_x = view_x
+        self.view_y = view_y
+        return True
+
+    def in_view(self, x, y):
+        return 0 <= x - self.view_x < self.view_cols and 0 <= y - self.view_y < self.view_rows
+
+    def draw_full(self, game):
+        # タイルサイズが変わっていればアトラスを作り直す
+        self.layout(game)
+        self.tiles.resize(self.tile_size)
+        self.preview_tiles.resize(TILE_SIZE * 0.8)
+
+        # 背景を黒で塗りつぶす
+        self.surface.fill(BLACK)
+
+        if self.mode == "ranking":
+            self.draw_rankings(game)
+        elif self.mode == "name":
+            self.name_state = None
+            self.draw_name_input(game)
+            self.update_name_input(game)
+        else:
+            self.draw_game(game)
+            if self.mode == "game_over":
+                self.draw_game_over(game)
+            elif self.mode == "paused":
+                self.draw_paused()
+
+    def text(self, content, size=24, color=WHITE):
+        return self.text_cache.render(content, size, color)
+
+    def draw_overlay(self):
+        # オーバーレイ用のサーフェスは画面サイズごとに1回だけ作って使い回す
+        size = self.surface.get_size()
+        if self.overlay is None or self.overlay.get_size() != size:
+            self.overlay = pygame.Surface(size)
+            self.overlay.set_alpha(180)
+            self.overlay.fill(BLACK)
+        self.surface.blit(self.overlay, (0, 0))
+
+    # --- プレイ画面 ---
+
+    def piece_footprint(self, game):
+        # 落下中のテトリミノとゴーストが占めるマス {(x, y): (印, 種類)}
+        footprint = {}
+        if game.game_over:
+            return footprint
+
+        # 画面上部の見えない部分や視界の外は描画しない
+        cells = PIECE_CELLS[game.tetromino_type][game.tetromino_rotation]
+        ghost_y = game.get_ghost_y()
+        for dx, dy in cells:
+            cell = (game.tetromino_x + dx, ghost_y + dy)
+            if ghost_y + dy >= 0 and self.in_view(*cell):
+                footprint[cell] = (GHOST, game.tetromino_type)
+        for dx, dy in cells:
+            cell = (game.tetromino_x + dx, game.tetromino_y + dy)
+            if game.tetromino_y + dy >= 0 and self.in_view(*cell):
+                footprint[cell] = (PIECE, game.tetromino_type)
+        return footprint
+
+    def cell_blit(self, game, x, y, mark):
+        # 1マス分の (アトラス, 描画先, 切り出し範囲) を返す
+        value = game.field[y][x]
+        if mark is not None and mark[0] == PIECE:
+            area = self.tiles.block(mark[1])
+        elif value != 0:
+            area = self.tiles.block(value - 1)
+        elif mark is not None:
+            area = self.tiles.ghost(mark[1])
+        else:
+            area = self.tiles.empty()
+        return (self.tiles.surface, self.cell_pos(x, y), area)
+
+    def cell_pos(self, x, y):
+        # 盤面のマス (x, y) の画面上の左上の座標
+        return ((x - self.view_x) * self.tile_size, (y - self.view_y) * self.tile_size)
+
+    def field_rect(self):
+        return pygame.Rect(0, 0, self.view_cols * self.tile_size, self.view_rows * self.tile_size)
+
+    def draw_field_border(self):
+        pygame.draw.rect(self.surface, WHITE, self.field_rect(), 1)
+
+    def info_values(self, game):
+        return {
+            "score": (SCORE_Y, f"Score: {game.score}"),
+            "level": (LEVEL_Y, f"Level: {game.level}"),
+            "lines": (LINES_Y, f"Lines: {game.lines_cleared}"),
+            "next": (PREVIEW_Y, (game.next_tetromino_type, game.next_tetromino_rotation)),
+        }
+
+    def draw_info_item(self, key, value):
+        # 情報表示エリアの1項目を描き直し、その矩形を返す
+        y, content = value
+        if key == "next":
+            rect = pygame.Rect(GAME_WIDTH + 1, y, INFO_WIDTH - 2, self.preview_tiles.size * 4 + 2)
+            pygame.draw.rect(self.surface, BLACK, rect)
+            self.draw_preview(*content)
+        else:
+            rect = pygame.Rect(GAME_WIDTH + 1, y, INFO_WIDTH - 2, self.fonts.get(24).get_linesize())
+            pygame.draw.rect(self.surface, BLACK, rect)
+            text = self.text(content)
+            self.surface.blit(text, (GAME_WIDTH + 10, y))
+        return rect
+
+    def draw_preview(self, tetromino_type, rotation):
+        # 次のテトリミノを描画
+        next_tetromino = TETROMINOS[tetromino_type][rotation]
+
+        # プレビューの位置調整（中央に表示）
+        size = self.preview_tiles.size
+        preview_x = GAME_WIDTH + (INFO_WIDTH - len(next_tetromino[0]) * size) // 2
+
+        area = self.preview_tiles.block(tetromino_type)
+        self.surface.blits(
+            [(self.preview_tiles.surface, (preview_x + x * size, PREVIEW_Y + y * size), area)
+             for x, y in PIECE_CELLS[tetromino_type][rotation]],
+            doreturn=False,
+        )
+
+    def draw_field(self, game):
+        # 視界の中のブロックと落下中のテトリミノ・ゴーストを1回の blits でまとめて描画
+        self.follow(game)
+        self.footprint = self.piece_footprint(game)
+        left = self.view_x
+        right = left + self.view_cols
+        blits = []
+        for y in range(self.view_y, self.view_y + self.view_rows):
+            row = game.field[y]
+            for x in range(left, right):
+                mark = self.footprint.get((x, y))
+                if row[x] != 0 or mark is not None:
+                    blits.append(self.cell_blit(game, x, y, mark))
+        self.surface.blits(blits, doreturn=False)
+
+        # フィールドの枠線（ブロックの上に描く）
+        self.draw_field_border()
+        self.field_version = game.field_version
+        self.drawn_field = [row[left:right] for row in game.field[self.view_y:self.view_y + self.view_rows]]
+
+    def draw_game(self, game):
+        self.draw_field(game)
+
+        # 情報表示エリア
+        info_area = pygame.Rect(GAME_WIDTH, 0, INFO_WIDTH, GAME_HEIGHT)
+        pygame.draw.rect(self.surface, BLACK, info_area)
+        pygame.draw.rect(self.surface, WHITE, info_area, 1)
+
+        self.info = self.info_values(game)
+        for key, value in self.info.items():
+            self.draw_info_item(key, value)
+
+        # 次のテトリミノのプレビュー
+        next_text = self.text("Next:")
+        self.surface.blit(next_text, (GAME_WIDTH + 10, NEXT_Y))
+
+        # ランキングボタン
+        rank_button = pygame.Rect(GAME_WIDTH + 20, SCREEN_HEIGHT - 80, INFO_WIDTH - 40, 30)
+        pygame.draw.rect(self.surface, GRAY, rank_button)
+        pygame.draw.rect(self.surface, WHITE, rank_button, 1)
+        rank_text = self.text("Ranking")
+        rank_text_x = GAME_WIDTH + 20 + (INFO_WIDTH - 40 - rank_text.get_width()) // 2
+        rank_text_y = SCREEN_HEIGHT - 80 + (30 - rank_text.get_height()) // 2
+        self.surface.blit(rank_text, (rank_text_x, rank_text_y))
+
+    def update_play(self, game):
+        # 視界がスクロールしたらフィールドだけ全体を描き直す
+        if self.follow(game):
+            rect = self.field_rect()
+            pygame.draw.rect(self.surface, BLACK, rect)
+            self.draw_field(game)
+            return [rect] + self.update_info(game)
+
+        dirty = set()
+
+        # 固定やライン消去があったときだけ、前回描いた視界の中の盤面と行ごとに比べる
+        if game.field_version != self.field_version:
+            self.field_version = game.field_version
+            left = self.view_x
+            right = left + self.view_cols
+            for i, drawn in enumerate(self.drawn_field):
+                y = self.view_y + i
+                row = game.field[y][left:right]
+                if row != drawn:
+                    for x in range(self.view_cols):
+                        if row[x] != drawn[x]:
+                            dirty.add((left + x, y))
+                    drawn[:] = row
+
+        # 落下中のテトリミノとゴーストの、前回と今回の足跡
+        footprint = self.piece_footprint(game)
+        for cell, mark in footprint.items():
+            if self.footprint.get(cell) != mark:
+                dirty.add(cell)
+        for cell in self.footprint:
+            if cell not in footprint:
+                dirty.add(cell)
+        self.footprint = footprint
+
+        rects = []
+        if dirty:
+            blits = [self.cell_blit(game, x, y, footprint.get((x, y))) for x, y in dirty]
+            self.surface.blits(blits, doreturn=False)
+            size = self.tile_size
+            rects = [pygame.Rect(*self.cell_pos(x, y), size, size) for x, y in dirty]
+
+            # 端のマスを描き直したら枠線を描き戻す（枠線はいつも白なので他のマスは変わらない）
+            right = self.view_x + self.view_cols - 1
+            bottom = self.view_y + self.view_rows - 1
+            if any(x == self.view_x or y == self.view_y or x == right or y == bottom for x, y in dirty):
+                self.draw_field_border()
+
+        return rects + self.update_info(game)
+
+    def update_info(self, game):
+        # 情報表示エリアは値が変わった項目だけ
+        rects = []
+        info = self.info_values(game)
+        for key, value in info.items():
+            if self.info.get(key) != value:
+                rects.append(self.draw_info_item(key, value))
+        self.info = info
+        return rects
+
+    def draw_game_over(self, game):
+        # 半透明の黒いオーバーレイ
+        self.draw_overlay()
+
+        # ゲームオーバーテキスト
+        game_over_text = self.text("GAME OVER", 48)
+
+        # 画面中央に表示
+        text_x = (SCREEN_WIDTH - game_over_text.get_width()) // 2
+        text_y = (SCREEN_HEIGHT - game_over_text.get_height()) // 2 - 50
+        self.surface.blit(game_over_text, (text_x, text_y))
+
+        # スコア表示
+        final_score_text = self.text(f"Score: {game.score}", 36)
+        score_x = (SCREEN_WIDTH - final_score_text.get_width()) // 2
+        score_y = text_y + game_over_text.get_height() + 10
+        self.surface.blit(final_score_text, (score_x, score_y))
+
+        # 名前入力案内
+        name_text = self.text("Enter your name for ranking")
+        name_x = (SCREEN_WIDTH - name_text.get_width()) // 2
+        name_y = score_y + final_score_text.get_height() + 20
+        self.surface.blit(name_text, (name_x, name_y))
+
+        # 名前入力ボタン
+        input_button = pygame.Rect((SCREEN_WIDTH - 200) // 2, name_y + name_text.get_height() + 10, 200, 40)
+        pygame.draw.rect(self.surface, GRAY, input_button)
+        pygame.draw.rect(self.surface, WHITE, input_button, 1)
+        input_text = self.text("Enter Name")
+        input_x = (SCREEN_WIDTH - input_text.get_width()) // 2
+        input_y = input_button.y + (input_button.height - input_text.get_height()) // 2
+        self.surface.blit(input_text, (input_x, input_y))
+
+        # リトライボタン
+        retry_button = pygame.Rect((SCREEN_WIDTH - 200) // 2, input_button.y + input_button.height + 20, 200, 40)
+        pygame.draw.rect(self.surface, GRAY, retry_button)
+        pygame.draw.rect(self.surface, WHITE, retry_button, 1)
+        retry_text = self.text("Retry Without Saving")
+        retry_x = (SCREEN_WIDTH - retry_text.get_width()) // 2
+        retry_y = retry_button.y + (retry_button.height - retry_text.get_height()) // 2
+        self.surface.blit(retry_text, (retry_x, retry_y))
+
+    def draw_paused(self):
+        # 半透明の黒いオーバーレイ
+        self.draw_overlay()
+
+        # 一時停止テキスト
+        pause_text = self.text("PAUSED", 48)
+
+        # 画面中央に表示
+        text_x = (SCREEN_WIDTH - pause_text.get_width()) // 2
+        text_y = (SCREEN_HEIGHT - pause_text.get_height()) // 2
+        self.surface.blit(pause_text, (text_x, text_y))
+
+    # --- 名前入力画面 ---
+
+    def draw_name_input(self, game):
+        # タイトル
+        title_text = self.text("Enter Your Name", 36)
+        title_x = (SCREEN_WIDTH - title_text.get_width()) // 2
+        title_y = 100
+        self.surface.blit(title_text, (title_x, title_y))
+
+        # 決定ボタン
+        submit_rect = pygame.Rect((SCREEN_WIDTH - 200) // 2, 260, 200, 40)
+        pygame.draw.rect(self.surface, GRAY, submit_rect)
+        pygame.draw.rect(self.surface, WHITE, submit_rect, 1)
+        submit_text = self.text("Submit")
+        submit_x = submit_rect.x + (submit_rect.width - submit_text.get_width()) // 2
+        submit_y = submit_rect.y + (submit_rect.height - submit_text.get_height()) // 2
+        self.surface.blit(submit_text, (submit_x, submit_y))
+
+        # 説明
+        info_text = self.text("Press ENTER to submit or ESC to cancel", 18)
+        info_x = (SCREEN_WIDTH - info_text.get_width()) // 2
+        info_y = 320
+        self.surface.blit(info_text, (info_x, info_y))
+
+    def update_name_input(self, game):
+        # 入力中の名前とカーソル点滅（0.5秒ごと）が変わったときだけ入力欄を描き直す
+        cursor_visible = pygame.time.get_ticks() % (CURSOR_BLINK * 2) < CURSOR_BLINK
+        state = (game.player_name, cursor_visible)
+        if state == self.name_state:
+            return []
+        self.name_state = state
+
+        # 名前入力フィールド
+        input_rect = pygame.Rect((SCREEN_WIDTH - 300) // 2, 180, 300, 40)
+        pygame.draw.rect(self.surface, GRAY, input_rect)
+        pygame.draw.rect(self.surface, WHITE, input_rect, 2)
+
+        # 入力中の名前表示
+        name_text = self.text(game.player_name)
+        name_x = input_rect.x + 10
+        name_y = input_rect.y + (input_rect.height - name_text.get_height()) // 2
+        self.surface.blit(name_text, (name_x, name_y))
+
+        if cursor_visible:
+            cursor_x = name_x + name_text.get_width() + 2
+            pygame.draw.line(self.surface, WHITE, (cursor_x, name_y), (cursor_x, name_y + name_text.get_height()), 2)
+
+        return [input_rect]
+
+    # --- ランキング画面 ---
+
+    def draw_rankings(self, game):
+        # タイトル
+        title_text = self.text("Tetris Ranking", 36)
+        title_x = (SCREEN_WIDTH - title_text.get_width()) // 2
+        title_y = 30
+        self.surface.blit(title_text, (title_x, title_y))
+
+        # ヘッダー
+        header_y = 90
+
+        for label, x in (("Rank", 50), ("Name", 120), ("Score", 250), ("Level", 350), ("Lines", 420), ("Date", 490)):
+            header_text = self.text(label, 20)
+            self.surface.blit(header_text, (x, header_y))
+
+        # 区切り線
+        pygame.draw.line(self.surface, WHITE, (30, header_y + 30), (SCREEN_WIDTH - 30, header_y + 30), 1)
+
+        # ランキングデータ
+        if not game.rankings:
+            no_data_text = self.text("No Records Yet")
+            no_data_x = (SCREEN_WIDTH - no_data_text.get_width()) // 2
+            no_data_y = header_y + 70
+            self.surface.blit(no_data_text, (no_data_x, no_data_y))
+        else:
+            data_y = header_y + 50
+            for i, record in enumerate(game.rankings):
+                # 順位・名前・スコア・レベル・ライン数・日付
+                columns = (
+                    (f"{i + 1}", 50),
+                    (record["name"], 120),
+                    (f"{record['score']}", 250),
+                    (f"{record['level']}", 350),
+                    (f"{record['lines']}", 420),
+                    (f"{record['date']}", 490),
+                )
+                for value, x in columns:
+                    value_text = self.text(value)
+                    self.surface.blit(value_text, (x, data_y))
+
+                data_y += 30
+
+        # 戻るボタン
+        back_rect = pygame.Rect((SCREEN_WIDTH - 200) // 2, SCREEN_HEIGHT - 80, 200, 40)
+        pygame.draw.rect(self.surface, GRAY, back_rect)
+        pygame.draw.rect(self.surface, WHITE, back_rect, 1)
+        back_text = self.text("Back to Game")
+        back_x = back_rect.x + (back_rect.width - back_text.get_width()) // 2
+        back_y = back_rect.y + (back_rect.height - back_text.get_height()) // 2
+        self.surface.blit(back_text, (back_x, back_y))
+
+    # --- プロファイラ HUD ---
+
+    def draw_panel(self, rect, lines, color=WHITE):
+        # 黒地に灰色の枠で数行の小さな文字を描き、最後の行の下端の y を返す
+        pygame.draw.rect(self.surface, BLACK, rect)
+        pygame.draw.rect(self.surface, GRAY, rect, 1)
+
+        # 数値は毎回変わるので文字列キャッシュには入れない
+        font = self.fonts.get(14)
+        y = rect.y + 4
+        for line in lines:
+            self.surface.blit(font.render(line, True, color), (rect.x + 6, y))
+            y += font.get_linesize()
+        return y
+
+    def update_hud(self, profiler, rects):
+        # 一定間隔で、または下の画面が描き直されて HUD が消えたときだけ描く
+        hud_rect = pygame.Rect(HUD_RECT)
+        now = pygame.time.get_ticks()
+        if (self.hud_time is not None and now - self.hud_time < HUD_INTERVAL
+                and hud_rect.collidelist(rects) == -1):
+            return []
+        self.hud_time = now
+
+        y = self.draw_panel(hud_rect, profiler.hud_lines())
+
+        # 直近のフレーム間隔の棒グラフ（赤い線が 60fps の目標、上端がその2倍）
+        graph = pygame.Rect(hud_rect.x + 6, y + 4, hud_rect.width - 12, hud_rect.bottom - y - 10)
+        if graph.height > 0:
+            budget = profiler.budget_ms
+            frames = list(profiler.frames)[-(graph.width // 2):]
+            for i, ms in enumerate(frames):
+                bar = min(graph.height, int(ms / (budget * 2) * graph.height))
+                color = COLORS[3] if ms <= budget * 1.5 else COLORS[4]
+                pygame.draw.line(self.surface, color, (graph.x + i * 2, graph.bottom - 1),
+                                 (graph.x + i * 2, graph.bottom - bar))
+            budget_y = graph.bottom - graph.height // 2
+            pygame.draw.line(self.surface, COLORS[4], (graph.x, budget_y), (graph.right - 1, budget_y))
+        return [hud_rect]
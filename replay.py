@@ -0,0 +1,174 @@
+import argparse
+import os
+import struct
+import sys
+import time
+
+from engine import TetrisEngine, FIELD_WIDTH, FIELD_HEIGHT, TICK_RATE, ACTION_NONE
+
+
+# 入力ログのファイル形式（リトルエンディアン）
+# ヘッダ: マジック, バージョン, 幅, 高さ, シード, 最終ティック, スコア, ライン数, レベル, 設置数, 入力数
+# 入力: (前の入力からのティック差 uint16, アクション uint8) の3バイトずつ
+REPLAY_MAGIC = b"TTRP"
+REPLAY_VERSION = 1
+HEADER = struct.Struct("<4sBxHHQIIIIII")
+EVENT = struct.Struct("<HB")
+MAX_DELTA = 0xFFFF
+
+REPLAY_DIR = "replays"
+REPLAY_SUFFIX = ".ttr"
+
+
+class ReplayError(Exception):
+    pass
+
+
+# 1ゲーム分の入力ログ（シード + ティックごとのアクション + 最終結果）
+class InputLog:
+    def __init__(self, seed, width=FIELD_WIDTH, height=FIELD_HEIGHT):
+        self.seed = seed
+        self.width = width
+        self.height = height
+        self.data = bytearray()
+        self.count = 0
+        self.last_tick = 0
+        # (最終ティック, スコア, ライン数, レベル, 設置数)。finish() するまでは None
+        self.result = None
+
+    def record(self, tick, action):
+        # ティック tick（そのティックの処理が終わったあと）にアクションを適用したことを記録する
+        delta = tick - self.last_tick
+        # 間隔が uint16 に収まらないときは何もしないアクションでつなぐ
+        while delta > MAX_DELTA:
+            self.data += EVENT.pack(MAX_DELTA, ACTION_NONE)
+            self.count += 1
+            delta -= MAX_DELTA
+        self.data += EVENT.pack(delta, action)
+        self.count += 1
+        self.last_tick = tick
+
+    def finish(self, engine):
+        self.result = (engine.ticks, engine.score, engine.lines_cleared, engine.level, engine.pieces_placed)
+
+    def events(self):
+        # (ティック, アクション) を記録順に返す
+        tick = 0
+        for delta, action in EVENT.iter_unpack(self.data):
+            tick += delta
+            yield tick, action
+
+    def to_bytes(self):
+        if self.result is None:
+            raise ReplayError("input log has no result; call finish() first")
+        return HEADER.pack(
+            REPLAY_MAGIC, REPLAY_VERSION, self.width, self.height, self.seed, *self.result, self.count
+        ) + self.data
+
+    @classmethod
+    def from_bytes(cls, data):
+        if len(data) < HEADER.size:
+            raise ReplayError("file is too short for a replay header")
+        magic, version, width, height, seed, *result, count = HEADER.unpack_from(data)
+        if magic != REPLAY_MAGIC:
+            raise ReplayError("not a replay file")
+        if version != REPLAY_VERSION:
+            raise ReplayError(f"unsupported replay version {version}")
+        if len(data) != HEADER.size + count * EVENT.size:
+            raise ReplayError(f"expected {count} inputs but the file size does not match")
+
+        log = cls(seed, width, height)
+        log.data = bytearray(data[HEADER.size:])
+        log.count = count
+        log.result = tuple(result)
+        return log
+
+    def save(self, path):
+        data = self.to_bytes()
+        with open(path, "wb") as f:
+            f.write(data)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+
+def replay(log, engine=None):
+    # ログを描画なしで最後まで再生し、エンジンを返す
+    # 入力のないティックは advance_to() でまとめて飛ばす
+    if engine is None or (engine.width, engine.height) != (log.width, log.height):
+        engine = TetrisEngine(clock=lambda: 0, width=log.width, height=log.height, seed=log.seed)
+    else:
+        engine.reset(log.seed)
+
+    for tick, action in log.events():
+        engine.advance_to(tick)
+        engine.apply_action(action)
+
+    if log.result is not None:
+        engine.advance_to(log.result[0])
+    return engine
+
+
+def verify(log, engine=None):
+    # 再生結果と記録された結果の食い違いを (項目, 記録, 再生) のリストで返す（一致すれば空）
+    engine = replay(log, engine)
+    replayed = (engine.ticks, engine.score, engine.lines_cleared, engine.level, engine.pieces_placed)
+    names = ("ticks", "score", "lines", "level", "pieces")
+    return [(name, expected, actual)
+            for name, expected, actual in zip(names, log.result, replayed)
+            if expected != actual]
+
+
+def replay_paths(paths):
+    # ディレクトリが指定されたら中のリプレイファイルをすべて対象にする
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(REPLAY_SUFFIX):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="入力ログを描画なしで最大速度で再生し、記録された結果と照合する")
+    parser.add_argument("paths", nargs="*", default=[REPLAY_DIR], help="リプレイファイルまたはディレクトリ")
+    args = parser.parse_args()
+
+    checked = 0
+    failed = 0
+    total_ticks = 0
+    start = time.perf_counter()
+
+    for path in replay_paths(args.paths):
+        try:
+            log = InputLog.load(path)
+        except (OSError, ReplayError) as e:
+            print(f"ERROR     {path}: {e}")
+            failed += 1
+            continue
+
+        mismatches = verify(log)
+        checked += 1
+        total_ticks += log.result[0]
+        if mismatches:
+            failed += 1
+            details = ", ".join(f"{name} {expected} != {actual}" for name, expected, actual in mismatches)
+            print(f"MISMATCH  {path}: {details}")
+        else:
+            ticks, score, lines, level, pieces = log.result
+            print(f"OK        {path}: score {score}  lines {lines}  level {level}  pieces {pieces}")
+
+    elapsed = time.perf_counter() - start
+    if checked:
+        game_seconds = total_ticks / TICK_RATE
+        print(f"{checked} replays  {elapsed:.3f}s  ({game_seconds / max(elapsed, 1e-9):.0f}x real time)")
+    if failed:
+        print(f"{failed} failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
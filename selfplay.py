@@ -0,0 +1,160 @@
+import argparse
+import importlib
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from ai import PlacementSearch
+from engine import TetrisEngine, TETROMINOS, FIELD_WIDTH, FIELD_HEIGHT, ACTION_LEFT, ACTION_RIGHT, ACTION_ROTATE
+from telemetry import TelemetryWriter, session_path
+
+
+# ポリシーは policy(engine, rng) -> 現在のテトリミノに適用するアクションの列
+# 最後のハードドロップはランナーが行う。rng はゲームごとにシードから作った random.Random
+def random_policy(engine, rng):
+    actions = [ACTION_ROTATE] * rng.randrange(len(TETROMINOS[engine.tetromino_type]))
+    shift = rng.randint(-engine.width // 2, engine.width // 2)
+    actions += [ACTION_LEFT if shift < 0 else ACTION_RIGHT] * abs(shift)
+    return actions
+
+
+POLICIES = {
+    "random": random_policy,
+    "search": PlacementSearch(),
+}
+
+
+def load_policy(name):
+    # 登録済みの名前か "モジュール:関数" 形式で指定する
+    if name in POLICIES:
+        return POLICIES[name]
+    if ":" not in name:
+        raise ValueError(f"unknown policy: {name}")
+    module_name, func_name = name.split(":", 1)
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+def play_game(engine, policy, seed, max_pieces=0):
+    # 1ゲームを最後まで遊んで結果を返す（エンジンは使い回す）
+    start = time.perf_counter()
+    engine.reset(seed)
+    rng = random.Random(seed)
+
+    while not engine.game_over:
+        if max_pieces and engine.pieces_placed >= max_pieces:
+            break
+        placed = engine.pieces_placed
+        for action in policy(engine, rng):
+            engine.step(action)
+            if engine.pieces_placed != placed:
+                break
+        else:
+            engine.hard_drop()
+
+    return {
+        "seed": seed,
+        "score": engine.score,
+        "lines": engine.lines_cleared,
+        "level": engine.level,
+        "pieces": engine.pieces_placed,
+        "time": time.perf_counter() - start,
+    }
+
+
+# ワーカープロセスごとに1つだけ作って使い回す
+worker_engine = None
+worker_policy = None
+worker_max_pieces = 0
+
+
+def init_worker(policy_name, width, height, max_pieces, telemetry_dir=None):
+    global worker_engine, worker_policy, worker_max_pieces
+    # 落下はすべてポリシーのハードドロップで行うので時計は止めておく
+    # テレメトリはワーカーごとに別のファイルに書く
+    telemetry = TelemetryWriter(session_path(telemetry_dir)) if telemetry_dir is not None else None
+    worker_engine = TetrisEngine(clock=lambda: 0, width=width, height=height, seed=0, telemetry=telemetry)
+    worker_policy = load_policy(policy_name)
+    worker_max_pieces = max_pieces
+
+
+def play_chunk(seeds):
+    results = [play_game(worker_engine, worker_policy, seed, worker_max_pieces) for seed in seeds]
+    if worker_engine.telemetry is not None:
+        worker_engine.telemetry.flush()
+    return results
+
+
+def run(games, first_seed=0, workers=None, chunk_size=64, policy="random",
+        width=FIELD_WIDTH, height=FIELD_HEIGHT, max_pieces=0, telemetry_dir=None):
+    # ゲーム結果をチャンク単位で到着順に返すジェネレータ
+    # 同時に投入するチャンク数を抑えて、数百万ゲームでもメモリを使いすぎないようにする
+    workers = workers or os.cpu_count() or 1
+    seeds = range(first_seed, first_seed + games)
+    chunks = (seeds[i:i + chunk_size] for i in range(0, games, chunk_size))
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=init_worker,
+        initargs=(policy, width, height, max_pieces, telemetry_dir),
+    ) as executor:
+        pending = set()
+        for chunk in chunks:
+            pending.add(executor.submit(play_chunk, chunk))
+            if len(pending) >= workers * 4:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ヘッドレスのテトリスを大量に自動プレイする")
+    parser.add_argument("--games", type=int, default=1000, help="プレイするゲーム数")
+    parser.add_argument("--seed", type=int, default=0, help="最初のゲームのシード（以降は連番）")
+    parser.add_argument("--workers", type=int, default=None, help="ワーカープロセス数（既定は CPU コア数）")
+    parser.add_argument("--chunk", type=int, default=64, help="1回にワーカーへ渡すゲーム数")
+    parser.add_argument("--policy", default="random", help="ポリシー名または モジュール:関数")
+    parser.add_argument("--width", type=int, default=FIELD_WIDTH)
+    parser.add_argument("--height", type=int, default=FIELD_HEIGHT)
+    parser.add_argument("--max-pieces", type=int, default=0, help="1ゲームのテトリミノ数の上限（0 は無制限）")
+    parser.add_argument("--output", help="ゲームごとの結果を書き出す JSONL ファイル")
+    parser.add_argument("--telemetry", metavar="DIR", help="テトリミノごとの記録をこのディレクトリに書き出す")
+    args = parser.parse_args()
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else None
+    start = time.perf_counter()
+    count = 0
+    total_score = 0
+    best = None
+
+    try:
+        for results in run(args.games, args.seed, args.workers, args.chunk, args.policy,
+                           args.width, args.height, args.max_pieces, args.telemetry):
+            for result in results:
+                count += 1
+                total_score += result["score"]
+                if best is None or result["score"] > best["score"]:
+                    best = result
+                if out:
+                    out.write(json.dumps(result) + "\n")
+            elapsed = time.perf_counter() - start
+            print(f"\r{count}/{args.games} games  {count / elapsed:.1f} games/s", end="", file=sys.stderr)
+    finally:
+        if out:
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    print(file=sys.stderr)
+    print(f"games: {count}  time: {elapsed:.1f}s  games/s: {count / elapsed:.1f}")
+    if count:
+        print(f"mean score: {total_score / count:.1f}  best: {best['score']} (seed {best['seed']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+import argparse
+import asyncio
+import os
+import struct
+import sys
+import time
+
+from engine import TetrisEngine, TICK_MS, ACTIONS
+
+
+# 通信形式（リトルエンディアン、固定長）
+# クライアント → サーバー: 最初に HELLO を1回、そのあとは INPUT を繰り返す
+# サーバー → クライアント: 1バイト目が種類の STATE または STATS
+#   STATE のあとには、flags に STATE_ROWS が立っているときだけ盤面の行ビットマスクが続く
+#   （1行 (width + 7) // 8 バイト × height 行。自然落下だけのときは盤面を送らない）
+SERVER_MAGIC = b"TTSV"
+PROTOCOL_VERSION = 1
+HELLO = struct.Struct("<4sBBHHQ")  # マジック, バージョン, フラグ, 幅, 高さ, シード
+HELLO_SEED = 1  # HELLO のフラグ：シードを指定する
+INPUT = struct.Struct("<IB")  # 通し番号, アクションまたはコマンド
+STATE = struct.Struct("<BBIIIIIBBBBhh")  # 種類, フラグ, 通し番号, ティック, スコア, ライン数, 設置数, レベル, 種類, 回転, 次の種類, x, y
+STATS = struct.Struct("<BxxxIIQQd")  # 種類, セッション数, 自然落下待ちのセッション数, 処理したアクション数, ティック, CPU 時間（秒）
+
+MSG_STATE = 1
+MSG_STATS = 2
+
+STATE_GAME_OVER = 1
+STATE_PAUSED = 2
+STATE_ROWS = 4
+
+# INPUT で送れるアクション以外のコマンド
+CMD_PAUSE = 0x80  # 一時停止の切り替え（止めているあいだはタイマーに載らない）
+CMD_RESET = 0x81  # 同じ盤面サイズで新しいゲームを始める
+CMD_STATS = 0x82  # サーバー全体の統計を STATS で返す
+COMMANDS = (CMD_PAUSE, CMD_RESET, CMD_STATS)
+
+DEFAULT_PORT = 7460
+MAX_WIDTH = 64
+MAX_HEIGHT = 1024
+
+
+def row_bytes(width):
+    return (width + 7) // 8
+
+
+def state_size(flags, width, height):
+    # STATE メッセージ全体のバイト数
+    return STATE.size + (row_bytes(width) * height if flags & STATE_ROWS else 0)
+
+
+def unpack_rows(data, width, height, offset=0):
+    # STATE に続く行ビットマスクを整数のリストに戻す
+    size = row_bytes(width)
+    return [int.from_bytes(data[offset + y * size:offset + (y + 1) * size], "little") for y in range(height)]
+
+
+# 全セッションの自然落下をまとめて管理するタイマーホイール
+# ティック番号を slots の数で割った余りの位置に (ティック, 項目) を入れておき、1ティックに1スロットだけ見る
+# 予定を変えたときは古い予定を消さずに残し、取り出したときに呼び出し側で読み捨てる
+class TimerWheel:
+    def __init__(self, size=64):
+        self.slots = [[] for _ in range(size)]
+        self.tick = 0
+        self.count = 0  # 入っている予定の数（読み捨てるものを含む）
+
+    def schedule(self, tick, item):
+        # tick に item を呼び出す予定を入れる（過ぎたティックなら次のティック）
+        if tick <= self.tick:
+            tick = self.tick + 1
+        self.slots[tick % len(self.slots)].append((tick, item))
+        self.count += 1
+        return tick
+
+    def advance(self):
+        # 1ティック進め、期限が来た (ティック, 項目) のリストを返す
+        self.tick += 1
+        slot = self.slots[self.tick % len(self.slots)]
+        if not slot:
+            return slot
+        # スロットより先の周回の予定は残す
+        due = [entry for entry in slot if entry[0] <= self.tick]
+        if len(due) == len(slot):
+            slot.clear()
+        else:
+            slot[:] = [entry for entry in slot if entry[0] > self.tick]
+        self.count -= len(due)
+        return due
+
+
+# 1接続につき1ゲーム。ルールは TetrisEngine そのもので、論理時間はサーバーのティックから求める
+# 自然落下の時刻だけタイマーホイールに載せるので、入力がなく落下を待っているあいだは何も実行しない
+class Session(asyncio.Protocol):
+    def __init__(self, server):
+        self.server = server
+        self.transport = None
+        self.buffer = bytearray()
+        self.engine = None
+        self.start_tick = 0  # engine.ticks == 0 に当たるサーバーのティック
+        self.wake_tick = None  # 次に自然落下させるサーバーのティック（載っていなければ None）
+        self.paused = False
+        self.seq = 0  # 最後に処理した入力の通し番号
+        self.sent_version = -1  # 最後に送った盤面の field_version
+        self.writable = True
+
+    # --- 接続 ---
+
+    def connection_made(self, transport):
+        self.transport = transport
+        if len(self.server.sessions) >= self.server.max_sessions:
+            transport.close()
+
+    def connection_lost(self, exc):
+        self.server.sessions.discard(self)
+        self.wake_tick = None
+        self.transport = None
+
+    def pause_writing(self):
+        # 相手が読まずに送信バッファがたまったら、読めるようになるまで落下の通知を止める
+        self.writable = False
+
+    def resume_writing(self):
+        self.writable = True
+        if self.engine is not None:
+            self.send_state()
+
+    def data_received(self, data):
+        self.buffer += data
+        started = False
+        if self.engine is None:
+            if len(self.buffer) < HELLO.size:
+                return
+            if not self.hello(HELLO.unpack_from(self.buffer)):
+                self.transport.close()
+                return
+            del self.buffer[:HELLO.size]
+            started = True
+
+        # 届いた入力をまとめて処理し、最後の通し番号を付けた状態を1回だけ返す
+        count = len(self.buffer) // INPUT.size
+        for seq, action in INPUT.iter_unpack(self.buffer[:count * INPUT.size]):
+            if not self.handle(seq, action):
+                self.transport.close()
+                return
+        del self.buffer[:count * INPUT.size]
+        if count or started:
+            self.send_state()
+
+    def hello(self, message):
+        magic, version, flags, width, height, seed = message
+        if magic != SERVER_MAGIC or version != PROTOCOL_VERSION:
+            return False
+        if not (4 <= width <= MAX_WIDTH and 4 <= height <= MAX_HEIGHT):
+            return False
+        self.engine = TetrisEngine(width=width, height=height, seed=seed if flags & HELLO_SEED else None)
+        self.start_tick = self.server.wheel.tick
+        self.server.sessions.add(self)
+        self.schedule()
+        return True
+
+    # --- ゲーム ---
+
+    def catch_up(self):
+        # サーバーの今のティックまで論理時間を進める（一時停止中は start_tick をずらして止める）
+        if self.paused:
+            self.start_tick = self.server.wheel.tick - self.engine.ticks
+        else:
+            self.engine.advance_to(self.server.wheel.tick - self.start_tick)
+
+    def handle(self, seq, action):
+        # 受け取った入力を1つ処理する。不正な入力なら False
+        if action in COMMANDS:
+            self.seq = seq
+            if action == CMD_PAUSE:
+                self.catch_up()
+                self.paused = not self.paused
+            elif action == CMD_RESET:
+                self.engine.reset()
+                self.start_tick = self.server.wheel.tick
+                self.sent_version = -1
+            else:
+                self.transport.write(self.server.stats())
+            self.schedule()
+            return True
+        if action not in ACTIONS:
+            return False
+
+        self.seq = seq
+        self.server.actions += 1
+        if self.paused or self.engine.game_over:
+            return True
+        self.catch_up()
+        self.engine.apply_action(action)
+        self.schedule()
+        return True
+
+    def schedule(self):
+        # 次の自然落下をタイマーホイールに載せ直す（ゲームオーバーや一時停止中は載せない）
+        engine = self.engine
+        if self.transport is None or self.paused or engine.game_over:
+            self.wake_tick = None
+            return
+        tick = self.start_tick + engine.next_fall_tick()
+        if tick != self.wake_tick:
+            self.wake_tick = self.server.wheel.schedule(tick, self)
+            self.server.wakeup.set()
+
+    def wake(self):
+        # タイマーホイールから自然落下の時刻に呼ばれる
+        self.wake_tick = None
+        self.catch_up()
+        if self.writable:
+            self.send_state()
+        self.schedule()
+
+    def send_state(self):
+        engine = self.engine
+        flags = 0
+        if engine.game_over:
+            flags |= STATE_GAME_OVER
+        if self.paused:
+            flags |= STATE_PAUSED
+        rows = b""
+        if engine.field_version != self.sent_version:
+            flags |= STATE_ROWS
+            size = row_bytes(engine.width)
+            rows = b"".join(row.to_bytes(size, "little") for row in engine.rows)
+            self.sent_version = engine.field_version
+        self.transport.write(STATE.pack(
+            MSG_STATE, flags, self.seq, engine.ticks, engine.score, engine.lines_cleared, engine.pieces_placed,
+            engine.level, engine.tetromino_type, engine.tetromino_rotation, engine.next_tetromino_type,
+            engine.tetromino_x, engine.tetromino_y,
+        ) + rows)
+
+
+# 多数のセッションを1プロセスで動かすサーバー
+# 自然落下は1つのタスクがタイマーホイールを60Hzで回して行う（ゲームごとのタスクは作らない）
+class GameServer:
+    def __init__(self, max_sessions=10000, wheel_size=64):
+        self.max_sessions = max_sessions
+        self.sessions = set()
+        self.wheel = TimerWheel(wheel_size)
+        self.wakeup = asyncio.Event()
+        self.actions = 0
+        self.server = None
+
+    def protocol(self):
+        return Session(self)
+
+    async def start(self, host="127.0.0.1", port=DEFAULT_PORT, unix_path=None):
+        loop = asyncio.get_running_loop()
+        if unix_path is not None:
+            if os.path.exists(unix_path):
+                os.unlink(unix_path)
+            self.server = await loop.create_unix_server(self.protocol, unix_path, backlog=1024)
+        else:
+            self.server = await loop.create_server(self.protocol, host, port, backlog=1024)
+        return self.server
+
+    async def run_ticks(self):
+        # 予定がないあいだは眠り、予定があれば60Hzでタイマーホイールを回す
+        # 遅れたときは遅れた分のティックをまとめて処理して、論理時間を時計に合わせる
+        loop = asyncio.get_running_loop()
+        interval = TICK_MS / 1000
+        next_time = loop.time()
+        while True:
+            if not self.wheel.count:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                next_time = loop.time()
+            next_time += interval
+            delay = next_time - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            while True:
+                for tick, session in self.wheel.advance():
+                    # 予定を入れ直したセッションの古い予定は読み捨てる
+                    if session.wake_tick == tick:
+                        session.wake()
+                if loop.time() < next_time + interval:
+                    break
+                next_time += interval
+
+    def stats(self):
+        playing = sum(1 for session in self.sessions if session.wake_tick is not None)
+        return STATS.pack(MSG_STATS, len(self.sessions), playing, self.actions, self.wheel.tick, time.process_time())
+
+    async def serve(self, host="127.0.0.1", port=DEFAULT_PORT, unix_path=None):
+        server = await self.start(host, port, unix_path)
+        address = unix_path or f"{host}:{port}"
+        print(f"listening on {address}", file=sys.stderr, flush=True)
+        async with server:
+            await self.run_ticks()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多数のゲームを1プロセスで動かす TCP / Unix ソケットのサーバー")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", help="TCP の代わりに使う Unix ソケットのパス")
+    parser.add_argument("--max-sessions", type=int, default=10000, help="同時に接続できるセッション数の上限")
+    args = parser.parse_args()
+
+    server = GameServer(max_sessions=args.max_sessions)
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"{server.actions} actions, {time.process_time():.2f}s CPU", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import os
+import struct
+
+
+# ゲームの状態の固定長バイナリ形式（リトルエンディアン）
+# ヘッダ: マジック, バージョン, フラグ, 幅, 高さ, シード, 乱数の状態,
+#         ティック, 最後に自然落下したティック, スコア, ライン数, 設置数,
+#         x, y, レベル, 種類, 回転, 次の種類, 次の回転
+# そのあとに行ビットマスクが height 個（幅 16 以下なら uint16、32 以下なら uint32、64 以下なら uint64、
+# それより広い盤面は1行 (width + 7) // 8 バイト）
+STATE_MAGIC = b"TTGS"
+STATE_VERSION = 1
+STATE_HEADER = struct.Struct("<4sBBHHQQIIIIIhhBBBBB")
+STATE_GAME_OVER = 1
+
+# 一時停止したまま終了したゲームの保存ファイル
+# ヘッダ（マジック, バージョン, 入力数, 最後の入力のティック）+ 状態 + マスの色（4ビットずつ）+ 入力ログ
+SAVE_FILE = "tetris_save.bin"
+SAVE_MAGIC = b"TTSG"
+SAVE_VERSION = 1
+SAVE_HEADER = struct.Struct("<4sBxxxII")
+
+
+class StateError(Exception):
+    pass
+
+
+def row_format(width):
+    # 行ビットマスクを整数型で詰めるときの struct の型（幅 64 を超える盤面は None）
+    for limit, code in ((16, "H"), (32, "I"), (64, "Q")):
+        if width <= limit:
+            return code
+    return None
+
+
+def rows_size(width, height):
+    code = row_format(width)
+    if code is None:
+        return (width + 7) // 8 * height
+    return struct.calcsize(f"<{height}{code}")
+
+
+def pack_rows(rows, width):
+    code = row_format(width)
+    if code is None:
+        size = (width + 7) // 8
+        return b"".join(row.to_bytes(size, "little") for row in rows)
+    return struct.pack(f"<{len(rows)}{code}", *rows)
+
+
+def unpack_rows(data, offset, width, height):
+    code = row_format(width)
+    if code is None:
+        size = (width + 7) // 8
+        return tuple(int.from_bytes(data[offset + y * size:offset + (y + 1) * size], "little")
+                     for y in range(height))
+    return struct.unpack_from(f"<{height}{code}", data, offset)
+
+
+# 先読みや保存のためのゲームの状態（盤面・テトリミノ・スコア・乱数の状態）
+# 描画や入力の状態は含まない。rows と colors はタプルで持つので、状態どうしでコピーせずに共有できる
+class GameState:
+    __slots__ = (
+        "width", "height", "rows", "colors",
+        "tetromino_type", "tetromino_rotation", "tetromino_x", "tetromino_y",
+        "next_tetromino_type", "next_tetromino_rotation",
+        "score", "level", "lines_cleared", "pieces_placed",
+        "ticks", "last_fall_tick", "game_over", "seed", "rng_state",
+    )
+
+    def __init__(self, width, height, rows, colors, tetromino_type, tetromino_rotation, tetromino_x, tetromino_y,
+                 next_tetromino_type, next_tetromino_rotation, score, level, lines_cleared, pieces_placed,
+                 ticks, last_fall_tick, game_over, seed, rng_state):
+        self.width = width
+        self.height = height
+        self.rows = rows  # 行ビットマスクのタプル
+        self.colors = colors  # 行ごとのマスの色（bytes のタプル）。pack() には含まれないので unpack() では None
+        self.tetromino_type = tetromino_type
+        self.tetromino_rotation = tetromino_rotation
+        self.tetromino_x = tetromino_x
+        self.tetromino_y = tetromino_y
+        self.next_tetromino_type = next_tetromino_type
+        self.next_tetromino_rotation = next_tetromino_rotation
+        self.score = score
+        self.level = level
+        self.lines_cleared = lines_cleared
+        self.pieces_placed = pieces_placed
+        self.ticks = ticks
+        self.last_fall_tick = last_fall_tick
+        self.game_over = game_over
+        self.seed = seed
+        self.rng_state = rng_state
+
+    @staticmethod
+    def size(width, height):
+        # pack() したときのバイト数（盤面の大きさだけで決まる）
+        return STATE_HEADER.size + rows_size(width, height)
+
+    def pack(self):
+        return STATE_HEADER.pack(
+            STATE_MAGIC, STATE_VERSION, STATE_GAME_OVER if self.game_over else 0, self.width, self.height,
+            self.seed, self.rng_state, self.ticks, self.last_fall_tick, self.score, self.lines_cleared,
+            self.pieces_placed, self.tetromino_x, self.tetromino_y, self.level, self.tetromino_type,
+            self.tetromino_rotation, self.next_tetromino_type, self.next_tetromino_rotation,
+        ) + pack_rows(self.rows, self.width)
+
+    @classmethod
+    def unpack(cls, data, offset=0):
+        if len(data) - offset < STATE_HEADER.size:
+            raise StateError("data is too short for a game state")
+        (magic, version, flags, width, height, seed, rng_state, ticks, last_fall_tick, score, lines, pieces,
+         x, y, level, tetromino_type, rotation, next_type, next_rotation) = STATE_HEADER.unpack_from(data, offset)
+        if magic != STATE_MAGIC:
+            raise StateError("not a game state")
+        if version != STATE_VERSION:
+            raise StateError(f"unsupported game state version {version}")
+        if len(data) - offset < STATE_HEADER.size + rows_size(width, height):
+            raise StateError("game state is truncated")
+        return cls(width, height, unpack_rows(data, offset + STATE_HEADER.size, width, height), None,
+                   tetromino_type, rotation, x, y, next_type, next_rotation, score, level, lines, pieces,
+                   ticks, last_fall_tick, bool(flags & STATE_GAME_OVER), seed, rng_state)
+
+
+def pack_colors(colors):
+    # マスの色（0〜15）を2マスで1バイトに詰める
+    cells = b"".join(colors)
+    if len(cells) % 2:
+        cells += b"\0"
+    return bytes(cells[i] | cells[i + 1] << 4 for i in range(0, len(cells), 2))
+
+
+def unpack_colors(data, width, height):
+    cells = bytearray()
+    for byte in data:
+        cells.append(byte & 0x0F)
+        cells.append(byte >> 4)
+    return tuple(bytes(cells[y * width:(y + 1) * width]) for y in range(height))
+
+
+def save_game(path, state, log):
+    # 状態・マスの色・それまでの入力ログ（replay.InputLog）を1つのファイルに書く
+    # 一時ファイルに書いてから置き換えるので、途中で落ちても前のファイルが残る
+    data = (SAVE_HEADER.pack(SAVE_MAGIC, SAVE_VERSION, log.count, log.last_tick)
+            + state.pack() + pack_colors(state.colors) + bytes(log.data))
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+def load_game(path):
+    # save_game() で書いたファイルを読み、(状態, 入力数, 最後の入力のティック, 入力ログ) を返す
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < SAVE_HEADER.size:
+        raise StateError("file is too short for a saved game")
+    magic, version, count, last_tick = SAVE_HEADER.unpack_from(data)
+    if magic != SAVE_MAGIC:
+        raise StateError("not a saved game")
+    if version != SAVE_VERSION:
+        raise StateError(f"unsupported saved game version {version}")
+
+    state = GameState.unpack(data, SAVE_HEADER.size)
+    offset = SAVE_HEADER.size + GameState.size(state.width, state.height)
+    color_size = (state.width * state.height + 1) // 2
+    if len(data) < offset + color_size:
+        raise StateError("saved game is truncated")
+    state.colors = unpack_colors(data[offset:offset + color_size], state.width, state.height)
+    return state, count, last_tick, data[offset + color_size:]
@@ -0,0 +1,243 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+from datetime import datetime
+
+from engine import TETROMINOS, TICK_MS, MAX_LEVEL, LINE_SCORES
+
+
+TELEMETRY_DIR = "telemetry"
+TELEMETRY_SUFFIX = ".tlm"
+
+# テレメトリファイル（1セッション1ファイル、追記のみ、リトルエンディアン）
+# ヘッダ: マジック, バージョン, 1件のバイト数, 作成時刻（UNIX 秒）
+# そのあとに固定長の記録が設置したテトリミノ1個につき1件ずつ続く
+TELEMETRY_MAGIC = b"TTLM"
+TELEMETRY_VERSION = 1
+HEADER = struct.Struct("<4sBxHQ")
+
+# 記録の項目（名前, struct の型）。struct と NumPy の dtype の両方をここから作る
+FIELDS = [
+    ("game", "I"),  # セッション内のゲームの通し番号（0 から）
+    ("seed", "Q"),  # ゲームのシード
+    ("tick", "I"),  # 固定したティック
+    ("place_ticks", "I"),  # 出現してから固定するまでのティック数
+    ("x", "h"),  # 固定した列（テトリミノの左上）
+    ("y", "h"),  # 固定した行
+    ("drop", "H"),  # 出現位置から落ちた行数
+    ("stack", "H"),  # 固定・ライン消去のあとのスタックの高さ
+    ("type", "B"),  # テトリミノの種類
+    ("rotation", "B"),
+    ("lines", "B"),  # このテトリミノで消えたライン数
+    ("level", "B"),  # 固定したあとのレベル
+]
+RECORD = struct.Struct("<" + "".join(code for _, code in FIELDS))
+
+# 設置時間の集計に使うヒストグラムの幅（ティック）。これ以上は最後のビンにまとめる
+PLACE_BINS = 60 * 60
+
+
+class TelemetryError(Exception):
+    pass
+
+
+def session_path(directory):
+    # このセッション（プロセス）用の新しいファイルのパス
+    name = f"telemetry_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}{TELEMETRY_SUFFIX}"
+    return os.path.join(directory, name)
+
+
+# エンジンの telemetry に渡すと、テトリミノが出現するたびに直前に固定したテトリミノを1件記録する
+# 記録はメモリにためて、ゲームの終わりかバッファがいっぱいになったときにまとめて追記する
+# ファイルは最初に書くときに作るので、1個も置かずに終わったセッションはファイルを残さない
+class TelemetryWriter:
+    def __init__(self, path, buffer_size=64 * 1024):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.buffer = bytearray()
+        self.file = None
+        self.game = -1
+        self.placed = 0  # 最後に出現したときの設置数
+        self.spawn_tick = 0
+        self.lines = 0  # 最後に出現したときのライン数
+        self.count = 0  # 書いた記録の数
+
+    def piece_spawned(self, engine):
+        # TetrisEngine.new_tetromino() の最初に呼ばれる（落下中のテトリミノはまだ固定したもの）
+        if engine.pieces_placed == 0:
+            # 新しいゲーム
+            self.game += 1
+        elif engine.pieces_placed == self.placed + 1:
+            self.buffer += RECORD.pack(
+                self.game, engine.seed, engine.ticks, engine.ticks - self.spawn_tick,
+                engine.tetromino_x, engine.tetromino_y, max(0, engine.tetromino_y),
+                engine.height - engine.stack_top, engine.tetromino_type, engine.tetromino_rotation,
+                engine.lines_cleared - self.lines, engine.level,
+            )
+            self.count += 1
+            if len(self.buffer) >= self.buffer_size:
+                self.flush()
+        # それ以外（restore() で途中から始めたなど）は出現時の値がわからないので記録せずに合わせ直す
+        self.placed = engine.pieces_placed
+        self.spawn_tick = engine.ticks
+        self.lines = engine.lines_cleared
+
+    def flush(self):
+        if not self.buffer:
+            return
+        if self.file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.file = open(self.path, "ab")
+            if self.file.tell() == 0:
+                self.file.write(HEADER.pack(TELEMETRY_MAGIC, TELEMETRY_VERSION, RECORD.size, int(time.time())))
+        self.file.write(self.buffer)
+        self.file.flush()
+        self.buffer.clear()
+
+    def close(self):
+        self.flush()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+# --- 読み出しと集計（NumPy が必要） ---
+
+def record_dtype():
+    import numpy as np
+    return np.dtype([(name, "<" + code) for name, code in FIELDS])
+
+
+def read_records(path):
+    # ファイルを mmap して記録の構造化配列として返す（中身はアクセスしたページだけが読まれる）
+    # 書き込み途中の最後の1件が欠けていても、そろっている記録だけを返す
+    import numpy as np
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < HEADER.size:
+            raise TelemetryError(f"{path}: file is too short for a telemetry header")
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, record_size, _ = HEADER.unpack_from(data)
+    if magic != TELEMETRY_MAGIC:
+        raise TelemetryError(f"{path}: not a telemetry file")
+    if version != TELEMETRY_VERSION or record_size != RECORD.size:
+        raise TelemetryError(f"{path}: unsupported telemetry version {version} ({record_size}-byte records)")
+    count = (size - HEADER.size) // RECORD.size
+    return np.frombuffer(data, dtype=record_dtype(), count=count, offset=HEADER.size)
+
+
+def telemetry_paths(paths):
+    # ディレクトリが指定されたら中のテレメトリファイルをすべて対象にする
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(TELEMETRY_SUFFIX):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+
+# 記録を一定件数ずつ読み、件数表とヒストグラムだけを足し合わせていく
+# 全件をメモリに載せないので、何百万ゲーム分のファイルでも使うメモリは chunk 件分で済む
+class TelemetryStats:
+    def __init__(self):
+        import numpy as np
+        self.files = 0
+        self.games = 0
+        self.pieces = 0
+        self.piece_counts = np.zeros(len(TETROMINOS), dtype=np.int64)
+        self.line_counts = np.zeros(len(LINE_SCORES), dtype=np.int64)
+        # [レベル, 設置時間（ティック）] の件数
+        self.place_hist = np.zeros((MAX_LEVEL + 1, PLACE_BINS), dtype=np.int64)
+        self.stack_sums = np.zeros(MAX_LEVEL + 1, dtype=np.float64)
+
+    def add_file(self, path, chunk=1 << 20):
+        records = read_records(path)
+        self.files += 1
+        last_game = None
+        for start in range(0, len(records), chunk):
+            last_game = self.add(records[start:start + chunk], last_game)
+
+    def add(self, records, last_game=None):
+        # 記録の一部を集計に加え、最後のゲーム番号を返す（ゲーム数を区切りをまたいで数えるため）
+        import numpy as np
+        if not len(records):
+            return last_game
+        games = records["game"]
+        self.games += int(np.count_nonzero(games[1:] != games[:-1])) + (games[0] != last_game)
+        self.pieces += len(records)
+        self.piece_counts += np.bincount(records["type"], minlength=len(TETROMINOS))[:len(TETROMINOS)]
+        self.line_counts += np.bincount(records["lines"], minlength=len(LINE_SCORES))[:len(LINE_SCORES)]
+
+        level = np.minimum(records["level"], MAX_LEVEL).astype(np.int64)
+        place = np.minimum(records["place_ticks"], PLACE_BINS - 1).astype(np.int64)
+        self.place_hist += np.bincount(level * PLACE_BINS + place,
+                                       minlength=self.place_hist.size).reshape(self.place_hist.shape)
+        self.stack_sums += np.bincount(level, weights=records["stack"], minlength=MAX_LEVEL + 1)
+        return games[-1]
+
+    def place_percentiles(self, level, ps=(0.5, 0.9, 0.99)):
+        # レベルごとの設置時間の百分位数（ミリ秒）。ヒストグラムはティック単位なので正確な値になる
+        import numpy as np
+        cumulative = np.cumsum(self.place_hist[level])
+        total = cumulative[-1]
+        if not total:
+            return None
+        return [float(np.searchsorted(cumulative, p * total)) * TICK_MS for p in ps]
+
+
+def aggregate(paths, chunk=1 << 20):
+    stats = TelemetryStats()
+    for path in telemetry_paths(paths):
+        stats.add_file(path, chunk)
+    return stats
+
+
+def print_report(stats):
+    print(f"{stats.files} files  {stats.games} games  {stats.pieces} pieces")
+    if not stats.pieces:
+        return
+
+    print("\npieces")
+    for name, count in zip("IOTSZJL", stats.piece_counts):
+        print(f"  {name}  {count:>12}  {count / stats.pieces:6.1%}")
+
+    print("\nline clears (per piece)")
+    for lines, count in enumerate(stats.line_counts):
+        print(f"  {lines}  {count:>12}  {count / stats.pieces:6.1%}")
+
+    print("\nplacement time by level (ms)        p50      p90      p99   mean stack")
+    for level in range(1, MAX_LEVEL + 1):
+        percentiles = stats.place_percentiles(level)
+        if percentiles is None:
+            continue
+        count = int(stats.place_hist[level].sum())
+        p50, p90, p99 = percentiles
+        print(f"  level {level:>2}  {count:>12} pieces  {p50:7.0f}  {p90:7.0f}  {p99:7.0f}  "
+              f"{stats.stack_sums[level] / count:8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="テレメトリファイルを mmap で読み、テトリミノごとの記録を集計する")
+    parser.add_argument("paths", nargs="*", default=[TELEMETRY_DIR], help="テレメトリファイルまたはディレクトリ")
+    parser.add_argument("--chunk", type=int, default=1 << 20, help="一度に集計する記録の数")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        stats = aggregate(args.paths, args.chunk)
+    except (OSError, TelemetryError) as e:
+        print(f"ERROR     {e}", file=sys.stderr)
+        sys.exit(1)
+    print_report(stats)
+    elapsed = time.perf_counter() - start
+    print(f"\n{elapsed:.3f}s  ({stats.pieces / max(elapsed, 1e-9):,.0f} pieces/s)")
+
+
+if __name__ == "__main__":
+    main()
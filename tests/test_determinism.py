@@ -0,0 +1,71 @@
+import random
+import unittest
+
+from engine import TetrisEngine, ACTION_LEFT, ACTION_RIGHT, ACTION_DOWN, ACTION_ROTATE, ACTION_HARD_DROP
+from replay import InputLog, verify
+from state import GameState
+from versus import loopback_check, DEFAULT_DELAY
+
+
+# シードと入力だけで同じゲームになること（リプレイ・対戦・状態の保存が頼っている性質）を確かめる
+
+ACTIONS = (ACTION_LEFT, ACTION_RIGHT, ACTION_DOWN, ACTION_ROTATE, ACTION_HARD_DROP)
+
+
+def play_recorded(seed, width=10, height=20, max_ticks=60 * 60):
+    # ランダムな入力でヘッドレスのゲームを進め、入力ログと最後のエンジンを返す
+    rng = random.Random(seed)
+    engine = TetrisEngine(clock=lambda: 0, width=width, height=height, seed=seed)
+    log = InputLog(seed, width, height)
+    while not engine.game_over and engine.ticks < max_ticks:
+        if rng.random() < 0.3:
+            action = rng.choice(ACTIONS)
+            log.record(engine.ticks, action)
+            engine.apply_action(action)
+        engine.tick()
+    log.finish(engine)
+    return log, engine
+
+
+class ReplayTest(unittest.TestCase):
+    def test_recording_replays_to_same_result(self):
+        for seed in range(5):
+            log, _ = play_recorded(seed)
+            self.assertEqual(verify(InputLog.from_bytes(log.to_bytes())), [], f"seed {seed}")
+
+    def test_large_board_replays_to_same_result(self):
+        log, _ = play_recorded(7, width=30, height=200)
+        self.assertEqual(verify(log), [])
+
+
+class GameStateTest(unittest.TestCase):
+    def test_pack_unpack_continues_identically(self):
+        for width, height in ((10, 20), (30, 200), (100, 50)):
+            log, engine = play_recorded(3, width, height, max_ticks=600)
+            state = GameState.unpack(engine.snapshot().pack())
+            other = TetrisEngine(clock=lambda: 0, width=width, height=height)
+            other.restore(state)
+            self.assertEqual(other.snapshot().pack(), engine.snapshot().pack())
+
+            # 同じ入力を続けると同じ盤面になる
+            rng = random.Random(width)
+            for _ in range(300):
+                action = rng.choice(ACTIONS)
+                for game in (engine, other):
+                    game.apply_action(action)
+                    game.tick()
+            self.assertEqual(other.rows, engine.rows)
+            self.assertEqual(other.snapshot().pack(), engine.snapshot().pack())
+
+
+class LoopbackTest(unittest.TestCase):
+    # localhost の TCP で2人対戦を行い、両側の盤面のハッシュが最後まで一致することを確かめる
+    def test_random_bot(self):
+        self.assertTrue(loopback_check(3, "random", DEFAULT_DELAY, 0, 20 * 60))
+
+    def test_search_bot(self):
+        self.assertTrue(loopback_check(2, "search", DEFAULT_DELAY, 1, 20 * 60))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import random
+import tempfile
+import unittest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+from engine import TetrisEngine, ACTION_LEFT, ACTION_RIGHT, ACTION_ROTATE, ACTION_HARD_DROP
+from export import Clip, run
+from replay import InputLog
+
+
+# 書き出した画像がワーカー数や区間の配り方に左右されないことを確かめる
+
+def record_game(path, seed, width, height, max_ticks=40 * 60):
+    rng = random.Random(seed)
+    engine = TetrisEngine(clock=lambda: 0, width=width, height=height, seed=seed)
+    log = InputLog(seed, width, height)
+    while not engine.game_over and engine.ticks < max_ticks:
+        if rng.random() < 0.2:
+            action = rng.choice((ACTION_LEFT, ACTION_RIGHT, ACTION_ROTATE, ACTION_HARD_DROP))
+            log.record(engine.ticks, action)
+            engine.apply_action(action)
+        engine.tick()
+    log.finish(engine)
+    log.save(path)
+    return log
+
+
+def export_frames(paths, output_dir, workers):
+    # クリップをすべて書き出し、{(クリップ名, ファイル名): 中身} を返す
+    clips = [Clip(path, InputLog.load(path), 10, 0.5, None, output_dir) for path in paths]
+    run(clips, 10, "bmp", workers=workers, segment=7)
+    frames = {}
+    for clip in clips:
+        for name in os.listdir(clip.frame_dir):
+            with open(os.path.join(clip.frame_dir, name), "rb") as f:
+                frames[(clip.name, name)] = f.read()
+    return frames
+
+
+class ExportTest(unittest.TestCase):
+    def test_frames_do_not_depend_on_workers(self):
+        # スクロールする大きな盤面を2つ。ワーカーは盤面の大きさごとに Tetris を使い回すので、
+        # 前に描いた区間やゲームの視界が残っていると区間の始めの絵が変わる
+        with tempfile.TemporaryDirectory() as directory:
+            paths = []
+            for seed, (width, height) in enumerate(((30, 200), (30, 200), (120, 80))):
+                path = os.path.join(directory, f"game{seed}.ttr")
+                record_game(path, seed, width, height)
+                paths.append(path)
+
+            single = export_frames(paths, os.path.join(directory, "single"), workers=1)
+            parallel = export_frames(paths, os.path.join(directory, "parallel"), workers=3)
+            self.assertTrue(single)
+            self.assertEqual(sorted(single), sorted(parallel))
+            for key in sorted(single):
+                self.assertTrue(single[key] == parallel[key], f"{key} differs")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,602 @@
+import argparse
+import random
+import socket
+import struct
+import sys
+import time
+import zlib
+from collections import deque
+
+from ai import PlacementSearch
+from controls import DEFAULT_DAS, DEFAULT_ARR
+from engine import (TetrisEngine, FixedTimestep, TICK_MS, TICK_RATE, ACTION_LEFT, ACTION_RIGHT, ACTION_DOWN,
+                    ACTION_ROTATE, ACTION_HARD_DROP)
+from profiler import percentile
+
+
+# 2人対戦（ロックステップ）
+# 両方のプロセスが同じシードで2人分の TetrisEngine を動かし、交換した入力だけで同じ結果を再現する
+# 各プレイヤーの入力は delay ティック先のティックに予約して相手に送り、
+# 両者の入力がそろったティックだけシミュレーションを進める（盤面そのものは送らない）
+VERSUS_MAGIC = b"TTVS"
+VERSUS_VERSION = 1
+DEFAULT_PORT = 7470
+DEFAULT_DELAY = 3  # 入力を適用するまでのティック数（相手に届くまでの猶予）
+CHECK_INTERVAL = 60  # 盤面のハッシュを交換して食い違いを調べる間隔（ティック）
+ATTACK = [0, 0, 1, 2, 4]  # 一度に消したライン数ごとに相手へ送るおじゃまライン数
+
+# 通信形式（リトルエンディアン。1バイト目がメッセージの種類）
+MSG_HELLO = 1
+MSG_INPUTS = 2
+MSG_CHECK = 3
+MSG_BYE = 4
+HELLO = struct.Struct("<B4sBHQ")  # 種類, マジック, バージョン, 遅延ティック, シード
+INPUTS = struct.Struct("<BIH")  # 種類, このティックまでの入力は確定, 入力の数（このあとに EVENT が続く）
+EVENT = struct.Struct("<IBQ")  # ティック, アクション, 入力した時刻（monotonic のナノ秒）
+CHECK = struct.Struct("<BII")  # 種類, ティック, 2人分の盤面のハッシュ
+BYE = struct.Struct("<B")
+FIXED_MESSAGES = {MSG_HELLO: HELLO, MSG_CHECK: CHECK, MSG_BYE: BYE}
+
+DIGEST = struct.Struct("<IIIIBBhhB")
+
+
+class VersusError(Exception):
+    pass
+
+
+def digest(games):
+    # 2人分のゲームの状態（盤面・テトリミノ・スコア）の CRC32
+    crc = 0
+    for game in games:
+        crc = zlib.crc32(DIGEST.pack(game.ticks, game.score, game.lines_cleared, game.pieces_placed,
+                                     game.tetromino_type, game.tetromino_rotation, game.tetromino_x,
+                                     game.tetromino_y, game.game_over), crc)
+        size = (game.width + 7) // 8
+        crc = zlib.crc32(b"".join(row.to_bytes(size, "little") for row in game.rows), crc)
+    return crc
+
+
+# --- 通信 ---
+
+def recv_exact(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise VersusError("connection closed during handshake")
+        data += chunk
+    return bytes(data)
+
+
+def send_hello(sock, seed, delay):
+    sock.sendall(HELLO.pack(MSG_HELLO, VERSUS_MAGIC, VERSUS_VERSION, delay, seed))
+
+
+def recv_hello(sock):
+    # 相手の HELLO を読み、(シード, 遅延ティック) を返す
+    kind, magic, version, delay, seed = HELLO.unpack(recv_exact(sock, HELLO.size))
+    if kind != MSG_HELLO or magic != VERSUS_MAGIC:
+        raise VersusError("the peer is not a versus client")
+    if version != VERSUS_VERSION:
+        raise VersusError(f"unsupported versus protocol version {version}")
+    return seed, delay
+
+
+# ノンブロッキングのソケットで、送受信したバイト数を数えながらメッセージをやりとりする
+# ゲームループから毎フレーム receive() と flush() を呼ぶ
+class Link:
+    def __init__(self, sock):
+        sock.setblocking(False)
+        if sock.family in (socket.AF_INET, socket.AF_INET6):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock = sock
+        self.inbox = bytearray()
+        self.outbox = bytearray()
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.closed = False
+
+    def send(self, data):
+        self.outbox += data
+
+    def flush(self):
+        while self.outbox and not self.closed:
+            try:
+                sent = self.sock.send(self.outbox)
+            except BlockingIOError:
+                return
+            except OSError:
+                self.closed = True
+                return
+            del self.outbox[:sent]
+            self.bytes_sent += sent
+
+    def receive(self):
+        # 届いているデータをすべて読み、そろったメッセージのリストを返す
+        while not self.closed:
+            try:
+                data = self.sock.recv(65536)
+            except BlockingIOError:
+                break
+            except OSError:
+                self.closed = True
+                break
+            if not data:
+                self.closed = True
+                break
+            self.inbox += data
+            self.bytes_received += len(data)
+        return self.parse()
+
+    def parse(self):
+        inbox = self.inbox
+        messages = []
+        offset = 0
+        while offset < len(inbox):
+            kind = inbox[offset]
+            if kind == MSG_INPUTS:
+                if len(inbox) - offset < INPUTS.size:
+                    break
+                _, tick, count = INPUTS.unpack_from(inbox, offset)
+                size = INPUTS.size + count * EVENT.size
+                if len(inbox) - offset < size:
+                    break
+                events = list(EVENT.iter_unpack(inbox[offset + INPUTS.size:offset + size]))
+                messages.append((kind, tick, events))
+            elif kind in FIXED_MESSAGES:
+                message = FIXED_MESSAGES[kind]
+                size = message.size
+                if len(inbox) - offset < size:
+                    break
+                messages.append(message.unpack_from(inbox, offset))
+            else:
+                raise VersusError(f"unknown message type {kind}")
+            offset += size
+        del inbox[:offset]
+        return messages
+
+    def close(self):
+        self.sock.close()
+        self.closed = True
+
+
+# --- 対戦のルール ---
+
+# 2人分のゲームを、両者の入力がそろったティックだけ進める（どちらのプロセスでも同じ結果になる）
+class Match:
+    def __init__(self, games, seed, delay=DEFAULT_DELAY):
+        self.games = games  # [プレイヤー0（待ち受けた側）, プレイヤー1（接続した側）]
+        self.seed = seed
+        self.delay = delay
+        for game in games:
+            game.reset(seed)
+        self.garbage_rng = random.Random(seed)  # おじゃまラインの穴の位置
+        self.ticks = 0
+        self.inputs = ({}, {})  # プレイヤーごとの {ティック: [(アクション, 入力した時刻)]}
+        # 入力が確定しているティック（最初の delay ティックは誰も入力できない）
+        self.confirmed = [delay - 1, delay - 1]
+        self.lines = [0, 0]
+        self.garbage_sent = [0, 0]
+        self.finished = False
+        self.winner = None  # 勝ったプレイヤー（引き分けなら None）
+
+    def add_inputs(self, player, tick, events):
+        # tick までのプレイヤーの入力が確定した。events は (ティック, アクション, 入力した時刻)
+        inputs = self.inputs[player]
+        for event_tick, action, pressed in events:
+            inputs.setdefault(event_tick, []).append((action, pressed))
+        self.confirmed[player] = tick
+
+    def ready(self):
+        return not self.finished and self.ticks <= min(self.confirmed)
+
+    def step(self):
+        # 1ティック進め、適用した (プレイヤー, 入力した時刻) のリストを返す
+        tick = self.ticks
+        applied = []
+        for player, game in enumerate(self.games):
+            for action, pressed in self.inputs[player].pop(tick, ()):
+                if not game.game_over:
+                    game.apply_action(action)
+                applied.append((player, pressed))
+        for game in self.games:
+            # Tetris のキーリピートやオートプレイを通さず、エンジンの自然落下だけを進める
+            TetrisEngine.tick(game)
+
+        # 消したライン数に応じて相手の盤面におじゃまラインを送る
+        for player, game in enumerate(self.games):
+            cleared = game.lines_cleared - self.lines[player]
+            if cleared:
+                self.lines[player] = game.lines_cleared
+                attack = ATTACK[min(cleared, len(ATTACK) - 1)]
+                if attack:
+                    self.garbage_sent[player] += attack
+                    target = self.games[1 - player]
+                    target.add_garbage(attack, self.garbage_rng.randrange(target.width))
+
+        self.ticks += 1
+        over = [game.game_over for game in self.games]
+        if any(over):
+            self.finished = True
+            self.winner = None if all(over) else over.index(False)
+        return applied
+
+
+# Controls やボットに渡すゲームの代わり。アクションはその場で適用せず、入力ティックと一緒にためる
+class InputCollector:
+    def __init__(self, game):
+        self.game = game
+        self.ticks = 0
+        self.events = []
+
+    @property
+    def game_over(self):
+        return self.game.game_over
+
+    @property
+    def width(self):
+        return self.game.width
+
+    @property
+    def height(self):
+        return self.game.height
+
+    def input_action(self, action):
+        self.events.append((self.ticks, action, time.monotonic_ns()))
+
+    def slide_distance(self, direction):
+        # 適用されるときの盤面はまだ分からないので、壁際でも移動を送る
+        return self.game.width
+
+
+# PlacementSearch で置き場所を決め、interval ティックごとに1アクションずつ入力する
+class SearchBot:
+    def __init__(self, interval=3):
+        self.search = PlacementSearch()
+        self.interval = interval
+        self.plan = None
+        self.piece = -1
+        self.last_tick = 0
+
+    def act(self, collector):
+        game = collector.game
+        if game.game_over:
+            return
+        # ハードドロップが適用されて次のテトリミノになってから、次の置き場所を考える
+        if self.plan is None and self.piece != game.pieces_placed:
+            self.piece = game.pieces_placed
+            self.plan = self.search(game) + [ACTION_HARD_DROP]
+        if self.plan and collector.ticks - self.last_tick >= self.interval:
+            self.last_tick = collector.ticks
+            collector.input_action(self.plan.pop(0))
+            if not self.plan:
+                self.plan = None
+
+
+# ランダムに入力するボット（ロックステップの確認用）
+class RandomBot:
+    ACTIONS = [ACTION_LEFT, ACTION_RIGHT, ACTION_ROTATE, ACTION_DOWN] * 2 + [ACTION_HARD_DROP]
+
+    def __init__(self, rng, rate=0.3):
+        self.rng = rng
+        self.rate = rate
+
+    def act(self, collector):
+        if not collector.game_over and self.rng.random() < self.rate:
+            collector.input_action(self.rng.choice(self.ACTIONS))
+
+
+# 対戦の片側。自分の入力を集めて送り、相手の入力を受け取ってシミュレーションを進める
+class Side:
+    def __init__(self, link, match, player, controls=None, bot=None):
+        self.link = link
+        self.match = match
+        self.player = player
+        self.opponent = 1 - player
+        self.controls = controls
+        self.bot = bot
+        self.collector = InputCollector(match.games[player])
+        self.input_tick = match.delay  # 次に入力を集めるティック
+
+        self.digests = {}  # {ティック: 自分のハッシュ}（相手のハッシュが届くまで）
+        self.peer_digests = {}
+        self.checks = 0
+        self.desync = None  # 食い違いが見つかったティック
+        self.peer_left = False
+
+        # 相手の入力が自分の画面に出るまでの時間と、送受信の帯域
+        self.shown = []
+        self.latencies = deque(maxlen=300)
+        self.rate_start = time.perf_counter()
+        self.rate_bytes = (0, 0)
+        self.bandwidth = (0.0, 0.0)
+
+    def sample(self, count, tick_time=0.0):
+        # 入力ティックを最大 count 進めて自分の入力を集め、相手に送る
+        # tick_time は最初のティックが始まった時計の時刻（Controls がキー入力をティックに割り当てるのに使う）
+        # 相手の入力が届かずシミュレーションが delay ティック以上遅れたら、追いつくまで先へは進めない
+        match = self.match
+        collector = self.collector
+        start = self.input_tick
+        for _ in range(count):
+            if match.finished or self.input_tick > match.ticks + match.delay:
+                break
+            collector.ticks = self.input_tick
+            tick_end = tick_time + TICK_MS
+            if self.controls is not None:
+                self.controls.apply(collector, tick_time, tick_end)
+                self.controls.repeat(collector, (self.input_tick + 1) * TICK_MS)
+            if self.bot is not None:
+                self.bot.act(collector)
+            tick_time = tick_end
+            self.input_tick += 1
+        if self.input_tick == start:
+            return
+
+        events = collector.events
+        collector.events = []
+        match.add_inputs(self.player, self.input_tick - 1, events)
+        self.link.send(INPUTS.pack(MSG_INPUTS, self.input_tick - 1, len(events))
+                       + b"".join(EVENT.pack(*event) for event in events))
+
+    def pump(self):
+        # 受信した入力でそろったティックまで進め、ハッシュを交換して送信する
+        for message in self.link.receive():
+            kind = message[0]
+            if kind == MSG_INPUTS:
+                self.match.add_inputs(self.opponent, message[1], message[2])
+            elif kind == MSG_CHECK:
+                self.peer_digests[message[1]] = message[2]
+            elif kind == MSG_BYE:
+                self.peer_left = True
+        if self.link.closed:
+            self.peer_left = True
+
+        match = self.match
+        while match.ready():
+            for player, pressed in match.step():
+                if player == self.opponent:
+                    self.shown.append(pressed)
+            if match.ticks % CHECK_INTERVAL == 0 or match.finished:
+                value = digest(match.games)
+                self.digests[match.ticks] = value
+                self.link.send(CHECK.pack(MSG_CHECK, match.ticks, value))
+
+        for tick in [tick for tick in self.peer_digests if tick in self.digests]:
+            self.checks += 1
+            if self.peer_digests.pop(tick) != self.digests.pop(tick) and self.desync is None:
+                self.desync = tick
+        self.link.flush()
+
+    def frame_shown(self, now_ns=None):
+        # 画面に反映したあとに呼ぶ。このフレームで適用した相手の入力の遅延を記録する
+        now_ns = now_ns or time.monotonic_ns()
+        for pressed in self.shown:
+            self.latencies.append((now_ns - pressed) / 1e6)
+        self.shown = []
+
+        now = time.perf_counter()
+        if now - self.rate_start >= 1.0:
+            sent, received = self.link.bytes_sent, self.link.bytes_received
+            elapsed = now - self.rate_start
+            self.bandwidth = ((sent - self.rate_bytes[0]) / elapsed, (received - self.rate_bytes[1]) / elapsed)
+            self.rate_bytes = (sent, received)
+            self.rate_start = now
+
+    def result(self):
+        if self.match.finished:
+            if self.match.winner is None:
+                return "DRAW"
+            return "YOU WIN" if self.match.winner == self.player else "YOU LOSE"
+        if self.peer_left:
+            return "opponent left"
+        return "playing"
+
+    def status_lines(self):
+        latencies = sorted(self.latencies)
+        return [
+            f"up {self.bandwidth[0]:.0f} B/s  down {self.bandwidth[1]:.0f} B/s",
+            f"opponent input p50 {percentile(latencies, 0.5):.0f} ms",
+            f"p95 {percentile(latencies, 0.95):.0f} ms  delay {self.match.delay} ticks",
+            f"garbage sent {self.match.garbage_sent[self.player]}  got {self.match.garbage_sent[self.opponent]}",
+            f"checks {self.checks}  " + ("in sync" if self.desync is None else f"DESYNC @{self.desync}"),
+            self.result(),
+        ]
+
+    def close(self):
+        self.link.send(BYE.pack(MSG_BYE))
+        self.link.flush()
+        self.link.close()
+
+
+# --- 1台での確認 ---
+
+def loopback_check(matches, bot, delay, seed, max_ticks):
+    # localhost の TCP で2つの Side をつなぎ、ボット同士で対戦させて最後まで食い違わないことを確かめる
+    # 1ループで各側が進めるティック数をランダムにして、入力の届き方をばらつかせる
+    rng = random.Random(seed)
+    listener = socket.create_server(("127.0.0.1", 0))
+    port = listener.getsockname()[1]
+    failures = 0
+    total_checks = 0
+    total_bytes = 0
+    total_ticks = 0
+    start = time.perf_counter()
+    for index in range(matches):
+        guest_sock = socket.create_connection(("127.0.0.1", port))
+        host_sock, _ = listener.accept()
+        send_hello(host_sock, rng.getrandbits(64), delay)
+        guest_seed, guest_delay = recv_hello(guest_sock)
+        send_hello(guest_sock, guest_seed, guest_delay)
+        host_seed, host_delay = recv_hello(host_sock)
+
+        sides = []
+        for player, (sock, match_seed, match_delay) in enumerate(
+                ((host_sock, host_seed, host_delay), (guest_sock, guest_seed, guest_delay))):
+            bot_rng = random.Random(rng.getrandbits(64))
+            player_bot = SearchBot(interval=bot_rng.randrange(1, 6)) if bot == "search" else RandomBot(bot_rng)
+            match = Match([TetrisEngine(clock=lambda: 0), TetrisEngine(clock=lambda: 0)], match_seed, match_delay)
+            sides.append(Side(Link(sock), match, player, bot=player_bot))
+
+        while not all(side.match.finished for side in sides) and sides[0].match.ticks < max_ticks:
+            for side in rng.sample(sides, 2):
+                side.sample(rng.randrange(3))
+                side.pump()
+        # 両側が同じティックまで進み、最後のハッシュが届くまで受信を続ける
+        for _ in range(1000):
+            if sides[0].match.ticks == sides[1].match.ticks and not any(side.digests for side in sides):
+                break
+            time.sleep(0.001)
+            for side in sides:
+                side.pump()
+
+        host, guest = sides
+        ok = (host.desync is None and guest.desync is None and not host.digests and not guest.digests
+              and host.match.ticks == guest.match.ticks
+              and digest(host.match.games) == digest(guest.match.games))
+        failures += not ok
+        total_checks += host.checks + guest.checks
+        total_bytes += host.link.bytes_sent + guest.link.bytes_sent
+        total_ticks += host.match.ticks
+        games = host.match.games
+        print(f"{'OK  ' if ok else 'DESYNC'} match {index}: {host.match.ticks} ticks  "
+              f"pieces {games[0].pieces_placed}/{games[1].pieces_placed}  "
+              f"garbage {host.match.garbage_sent[0]}/{host.match.garbage_sent[1]}  "
+              f"winner {host.match.winner if host.match.finished else '-'}  checks {host.checks + guest.checks}")
+        for side in sides:
+            side.close()
+    listener.close()
+
+    elapsed = time.perf_counter() - start
+    per_second = total_bytes / 2 / max(total_ticks / TICK_RATE, 1e-9)
+    print(f"{matches} matches  {total_checks} checks  {failures} desynced  "
+          f"{per_second:.0f} B/s per player of game time  {elapsed:.2f}s")
+    return failures == 0
+
+
+# --- 対戦画面 ---
+
+def connect(args):
+    # 待ち受け側はシードと遅延を決めて送り、接続側はそれを受け取って返す
+    if args.host:
+        with socket.create_server(("", args.port)) as listener:
+            print(f"waiting for an opponent on port {args.port}", flush=True)
+            sock, address = listener.accept()
+        seed = args.seed if args.seed is not None else random.getrandbits(64)
+        send_hello(sock, seed, args.delay)
+        if recv_hello(sock) != (seed, args.delay):
+            raise VersusError("the opponent did not accept the match settings")
+        return sock, 0, seed, args.delay
+    sock = socket.create_connection((args.connect, args.port))
+    seed, delay = recv_hello(sock)
+    send_hello(sock, seed, delay)
+    return sock, 1, seed, delay
+
+
+def run_ui(args):
+    import pygame
+    from main import Tetris, KEY_BINDINGS, FRAME_MS, stamp_events, wait_for_input
+    from rankings import RankingStore
+    from renderer import SCREEN_WIDTH, SCREEN_HEIGHT, HUD_RECT, HUD_INTERVAL
+
+    sock, player, seed, delay = connect(args)
+
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH * 2, SCREEN_HEIGHT))
+    pygame.display.set_caption("Tetris Versus")
+
+    # 左に自分、右に相手の盤面を描く
+    surfaces = [screen.subsurface((0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)),
+                screen.subsurface((SCREEN_WIDTH, 0, SCREEN_WIDTH, SCREEN_HEIGHT))]
+    local, remote = [Tetris(surface, record_dir=None, rankings_store=RankingStore(log_path=None, index_path=None))
+                     for surface in surfaces]
+    local.controls.das = args.das
+    local.controls.arr = args.arr
+    games = [local, remote] if player == 0 else [remote, local]
+    side = Side(Link(sock), Match(games, seed, delay), player,
+                controls=None if args.autoplay else local.controls,
+                bot=SearchBot() if args.autoplay else None)
+
+    timestep = FixedTimestep(pygame.time.get_ticks, max_ticks=10)
+    panel = pygame.Rect(HUD_RECT)
+    panel_time = None
+    pending = []
+    frame_deadline = pygame.time.get_ticks()
+    running = True
+    while running:
+        now = pygame.time.get_ticks()
+        if now >= frame_deadline:
+            frame_deadline = max(frame_deadline + FRAME_MS, now)
+
+        for event in pending + stamp_events(pygame.event.get()):
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                running = False
+            elif event.type == pygame.VIDEOEXPOSE:
+                local.renderer.invalidate()
+                remote.renderer.invalidate()
+            elif event.type in (pygame.KEYDOWN, pygame.KEYUP) and event.key in KEY_BINDINGS and not args.autoplay:
+                local.controls.push(event.time, KEY_BINDINGS[event.key], event.type == pygame.KEYDOWN)
+
+        # 経過したティック数だけ自分の入力を集めて送り、そろったところまで進める
+        ticks = timestep.advance()
+        side.sample(ticks, timestep.last_time - timestep.accumulator - ticks * TICK_MS)
+        side.pump()
+
+        rects = local.draw()
+        rects += [rect.move(SCREEN_WIDTH, 0) for rect in remote.draw()]
+        now = pygame.time.get_ticks()
+        if panel_time is None or now - panel_time >= HUD_INTERVAL or panel.collidelist(rects) != -1:
+            panel_time = now
+            local.renderer.draw_panel(panel, side.status_lines())
+            rects.append(panel)
+        if rects:
+            pygame.display.update(rects)
+        side.frame_shown()
+
+        pending = wait_for_input(frame_deadline)
+
+    latencies = sorted(side.latencies)
+    print(f"{side.result()}  checks {side.checks}  "
+          + ("in sync" if side.desync is None else f"DESYNC at tick {side.desync}"))
+    print(f"sent {side.link.bytes_sent} B  received {side.link.bytes_received} B  "
+          f"opponent input p50 {percentile(latencies, 0.5):.1f} ms  p95 {percentile(latencies, 0.95):.1f} ms")
+    side.close()
+    pygame.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="2人対戦（ロックステップ）")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--host", action="store_true", help="対戦相手の接続を待つ")
+    mode.add_argument("--connect", metavar="HOST", help="待ち受けている相手に接続する")
+    mode.add_argument("--loopback-check", type=int, metavar="MATCHES",
+                      help="1台の localhost でボット同士を対戦させ、食い違いがないか確かめる")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--seed", type=int, help="対戦のシード（待ち受け側）")
+    parser.add_argument("--delay", type=int, default=DEFAULT_DELAY, help="入力を適用するまでのティック数（待ち受け側）")
+    parser.add_argument("--autoplay", action="store_true", help="AI に操作させる")
+    parser.add_argument("--das", type=int, default=DEFAULT_DAS, help=f"キーリピートが始まるまでのミリ秒（既定 {DEFAULT_DAS}）")
+    parser.add_argument("--arr", type=int, default=DEFAULT_ARR,
+                        help=f"キーリピートの間隔のミリ秒（既定 {DEFAULT_ARR}。0 なら壁まで一気に移動）")
+    parser.add_argument("--bot", choices=("random", "search"), default="random", help="--loopback-check のボット")
+    parser.add_argument("--max-ticks", type=int, default=60 * TICK_RATE, help="--loopback-check の1試合の上限")
+    args = parser.parse_args()
+    if args.seed is not None and not 0 <= args.seed < 2 ** 64:
+        parser.error("--seed は 0 以上 2**64 未満で指定してください")
+    if not 1 <= args.delay <= 0xFFFF:
+        parser.error("--delay は 1 以上で指定してください")
+
+    if args.loopback_check is not None:
+        ok = loopback_check(args.loopback_check, args.bot, args.delay,
+                            args.seed if args.seed is not None else 0, args.max_ticks)
+        sys.exit(0 if ok else 1)
+    try:
+        run_ui(args)
+    except (OSError, VersusError) as e:
+        print(f"versus: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()